@@ -0,0 +1,96 @@
+import streamlit as st
+import altair as alt
+
+from rilsa.coords import DEFAULT_COORDS_CSV_PATH, CoordinateStore
+from rilsa.emaildata import iter_report_chunks
+from rilsa.ingest import content_hash, load_workbook_snapshot, read_source_bytes
+from rilsa.preprocess import preprocess
+from rilsa.workload import OVERLOAD_INDEX, email_stats, portfolio_stats, workload
+
+# =========================
+# 기본 데이터 경로(원하는 경로로 바꿔도 됨)
+# =========================
+DEFAULT_XLSX_PATH = "KPI_-_Repartition_portefeuille-20250716.xlsx"        # 기본 엑셀
+DEFAULT_CSV_PATH = "EmailActivityUserDetail9_11_2025 3_44_29 PM.csv"      # 기본 CSV
+
+st.set_page_config(page_title="RILSA Charge", layout="wide")
+st.title("RILSA Charge par gérant")
+
+# =========================
+# 사이드바 - 파일 업로드
+# =========================
+st.sidebar.header("Sources")
+uploaded_xlsx = st.sidebar.file_uploader("Portefeuille (.xlsx)", type=["xlsx"])
+uploaded_csv = st.sidebar.file_uploader("Activité e-mail (.csv)", type=["csv"])
+xlsx_source = uploaded_xlsx if uploaded_xlsx is not None else DEFAULT_XLSX_PATH
+csv_source = uploaded_csv.getvalue() if uploaded_csv is not None else DEFAULT_CSV_PATH
+overload_index = st.sidebar.slider("Seuil de surcharge (indice)", 1.0, 3.0, OVERLOAD_INDEX, 0.05)
+
+# =========================
+# 소스별 캐시 — 한쪽만 바뀌면 그쪽 통계만 다시 계산
+# =========================
+@st.cache_resource(show_spinner=False)
+def get_coord_store():
+    return CoordinateStore(DEFAULT_COORDS_CSV_PATH)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_portfolio_stats(dataset_key: str, store_version: int, _df):
+    df, _ = preprocess(_df)
+    return portfolio_stats(get_coord_store().fill(df))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_email_stats(source_hash: str, _source):
+    return email_stats(iter_report_chunks(_source))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_workload(dataset_key: str, store_version: int, source_hash: str, overload_index: float, _portfolio, _email):
+    return workload(_portfolio, _email, overload_index=overload_index)
+
+df, load_info = load_workbook_snapshot(xlsx_source)
+dataset_key = f"{load_info['hash']}:{load_info['sheet']}"
+coord_store = get_coord_store()
+coord_store.refresh()  # rebuild_coords 가 파일을 교체했으면 다시 읽음
+portfolio = cached_portfolio_stats(dataset_key, coord_store.version, df)
+
+csv_hash = content_hash(read_source_bytes(csv_source))
+email = cached_email_stats(csv_hash, csv_source)
+
+load = cached_workload(dataset_key, coord_store.version, csv_hash, overload_index, portfolio, email)
+
+# =========================
+# 결과
+# =========================
+overloaded = load[load["Surcharge"]]
+c1, c2, c3 = st.columns(3)
+c1.metric("Gérants", len(load))
+c2.metric("En surcharge", len(overloaded))
+c3.metric("Sans boîte e-mail appariée", int(load["Boîte e-mail"].isna().sum()))
+
+if not overloaded.empty:
+    st.warning("Surcharge : " + ", ".join(overloaded["Gérant"]))
+
+st.dataframe(
+    load.style.format(precision=1).apply(
+        lambda row: ["background-color: #f8d7da" if row["Surcharge"] else ""] * len(row), axis=1
+    ),
+    use_container_width=True,
+    hide_index=True,
+)
+
+chart = (
+    alt.Chart(load)
+    .mark_circle(opacity=0.8)
+    .encode(
+        x=alt.X("Unités gérées:Q", title="Unités gérées"),
+        y=alt.Y("reçu:Q", title="E-mails reçus"),
+        size=alt.Size("Étendue (km²):Q", title="Étendue (km²)"),
+        color=alt.Color("Surcharge:N", title="Surcharge", scale=alt.Scale(domain=[False, True], range=["#4c78a8", "#e45756"])),
+        tooltip=["Gérant", "Unités gérées", "Étendue (km²)", "Distance moyenne au centre (km)", "reçu", "envoyé", "Indice de charge"],
+    )
+    .properties(width=800, height=450)
+)
+st.altair_chart(chart, use_container_width=True)
+st.caption(
+    "Indice de charge : moyenne des rapports à la médiane (unités gérées, étendue, e-mails reçus et envoyés). "
+    "Les statistiques portefeuille et e-mail sont mises en cache séparément."
+)
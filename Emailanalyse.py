@@ -1,12 +1,24 @@
-from csv import excel
-import io
-from unittest.mock import DEFAULT
-import numpy as np
+import os
+
 import pandas as pd
 import streamlit as st
-import pydeck as pdk
 import altair as alt
 
+from rilsa.emaildata import (
+    DEFAULT_METRICS,
+    EmailCube,
+    iter_report_chunks,
+    load_grouped_report,
+    load_groups,
+    prepare_groups,
+    report_columns,
+    to_long,
+)
+from rilsa.history import DEFAULT_HISTORY_PATH, EmailHistory
+from rilsa.identity import DEFAULT_IDENTITY_PATH, IdentityMap, IdentityResolver
+from rilsa.ingest import content_hash, read_source_bytes
+from rilsa.tracing import Tracer, frame_bytes, recent_runs
+
 # =========================
 # 기본 데이터 경로(원하는 경로로 바꿔도 됨)
 # =========================
@@ -17,6 +29,28 @@ DEFAULT_SHEET_NAME = None  # None이면 첫 시트
 st.set_page_config(page_title="RILSA Email", layout="wide")
 st.title("RILSA Email Data Analyse")
 
+# 단계별 측정 (재실행마다 새로 만들고 끝에서 로그 파일에 기록)
+tracer = Tracer("Emailanalyse")
+debug_mode = st.sidebar.checkbox("🔧 Mode debug (temps par étape)", key="debug_trace")
+debug_box = st.sidebar.container()
+
+def finish_trace(**attrs):
+    # st.stop() 전에도 호출 → 중단된 실행도 기록
+    entry = tracer.finish(**attrs)
+    if not debug_mode or entry is None:
+        return
+    with debug_box:
+        spans = pd.DataFrame(entry["spans"])
+        spans["stage"] = ["· " * d + s for d, s in zip(spans["depth"], spans["stage"])]
+        first = [c for c in ["stage", "ms", "rows", "bytes", "cache"] if c in spans.columns]
+        spans = spans[first + [c for c in spans.columns if c not in first and c != "depth"]]
+        st.dataframe(spans, use_container_width=True, hide_index=True)
+        totals = pd.Series([r["total_ms"] for r in recent_runs(tracer.log_path, tracer.page)] or [entry["total_ms"]])
+        st.caption(
+            f"Exécution : {entry['total_ms']:.0f} ms · {len(totals)} dernières : "
+            f"p50 {totals.quantile(0.5):.0f} ms, p95 {totals.quantile(0.95):.0f} ms — journal : {tracer.log_path or 'désactivé'}"
+        )
+
 # =========================
 # 사이드바 - 파일 업로드
 # =========================
@@ -24,7 +58,7 @@ st.sidebar.header("1. Upload your CSV data")
 uploaded_file = st.sidebar.file_uploader("Upload your input CSV file", type=["csv"])
 if uploaded_file is not None:
     # 업로드된 파일이 있으면 해당 파일 사용
-    csv_data = uploaded_file
+    csv_data = uploaded_file.getvalue()
     sheet_name = None
 else:
     # 업로드된 파일이 없으면 기본 파일 사용
@@ -35,75 +69,97 @@ st.sidebar.markdown(f"Using default CSV file: `{DEFAULT_CSV_PATH}`")
 st.sidebar.markdown("---")
 
 # =========================
-# 데이터 로드
-# =========================
-# CSV
-data = pd.read_csv(csv_data, sep=',', encoding='utf-8')
-
-# Excel (첫 시트 선택 로직 포함)
-xls = pd.ExcelFile(DEFAULT_EXCEL_PATH, engine="openpyxl")
-if sheet_name is None:
-    sheet_to_use = xls.sheet_names[0]   # 첫 시트
-else:
-    sheet_to_use = sheet_name
-
-group_data = xls.parse(sheet_name=sheet_to_use)
-
+# 데이터 로드 (입력이 같으면 캐시 재사용)
 # =========================
-# 병합 전 정규화 (공백/대소문자)
-# =========================
-def _norm_key(series):
-    return series.astype(str).str.strip().str.casefold()
+@st.cache_data(show_spinner=False)
+def cached_report_columns(source):
+    tracer.miss()
+    return report_columns(source)
+
+@st.cache_data(show_spinner=False)
+def cached_groups(source, sheet_name):
+    tracer.miss()
+    return load_groups(source, sheet_name)
+
+with tracer.span("load", cached=True) as sp:
+    # CSV (헤더만 — 본문은 아래에서 청크 단위로 읽음)
+    report_cols = cached_report_columns(csv_data)
+
+    # Excel (첫 시트 선택 로직 포함)
+    group_data, sheet_to_use = cached_groups(DEFAULT_EXCEL_PATH, sheet_name)
+    sp.update(
+        rows=len(group_data),
+        bytes=len(csv_data) if isinstance(csv_data, bytes) else os.path.getsize(csv_data),
+    )
 
 # 컬럼 존재 확인 (없으면 명확한 에러 메시지)
-if "Display Name" not in data.columns:
+if "Display Name" not in report_cols:
     raise KeyError("CSV에 'Display Name' 컬럼이 없습니다.")
 if "Display Name" not in group_data.columns:
     raise KeyError(f"Excel 시트('{sheet_to_use}')에 'Display Name' 컬럼이 없습니다.")
 
-data["_key"] = _norm_key(data["Display Name"])
-group_data["_key"] = _norm_key(group_data["Display Name"])
-
-# 그룹 데이터에서 중복 키 제거(있다면 첫 번째만 사용)
-group_data = group_data.drop_duplicates(subset=["_key"], keep="first")
-
 # =========================
-# 병합
+# 병합 + 불필요한 데이터 제거 (청크 단위 스트리밍, 캐시)
 # =========================
-merged_data = pd.merge(
-    data,
-    group_data,
-    on="_key",
-    how="left",
-    suffixes=("_csv", "_xlsx")
-).drop(columns=["_key"])
+@st.cache_data(show_spinner=False)
+def cached_merged(source, sheet_name):
+    tracer.miss()
+    group_data = cached_groups(DEFAULT_EXCEL_PATH, sheet_name)[0]
+    resolver = IdentityResolver(group_data, get_identity_map())
+    merged = load_grouped_report(source, group_data, resolver=resolver)
+    return merged, resolver.unmatched_report(), dict(resolver.stats)
+
+@st.cache_resource(show_spinner=False)
+def get_identity_map():
+    return IdentityMap(DEFAULT_IDENTITY_PATH)
+
+with tracer.span("merge", cached=True) as sp:
+    merged_data, unmatched_users, match_stats = cached_merged(csv_data, sheet_name)
+    sp.update(rows=len(merged_data), bytes=frame_bytes(merged_data), unmatched=len(unmatched_users))
+if "Group" not in merged_data.columns:
+    st.warning("no 'Group' on the Excel file.")
+
+with st.sidebar.expander(f"Appariement CSV ↔ Group.xlsx ({len(unmatched_users)} non appariés)"):
+    st.write({k: v for k, v in match_stats.items()})
+    # 퍼지 제안은 확인 전까지 귀속하지 않음 → 여기서 검토 후 매핑 테이블에 기록
+    review = unmatched_users.assign(Confirmer=False)
+    edited = st.data_editor(
+        review, use_container_width=True, hide_index=True,
+        column_order=["Confirmer", "Display Name", "Statut", "Proposition", "Meilleur score", "User Principal Name"],
+        disabled=[c for c in review.columns if c != "Confirmer"], key="identity_review",
+    )
+    to_confirm = edited[edited["Confirmer"] & edited["group_key"].notna()]
+    if st.button(f"Confirmer {len(to_confirm)} proposition(s)", disabled=to_confirm.empty):
+        IdentityResolver(group_data, get_identity_map()).confirm(to_confirm)
+        cached_merged.clear()
+        cached_cube.clear()
+        st.rerun()
 
 # =========================
-# 병합 후 불필요한 데이터 제거
+# 집계 큐브 (사람 × 그룹 × 지표) — 이후 차트/필터는 슬라이스만 사용
 # =========================
-if "Group" in merged_data.columns:
-    merged_data = merged_data[
-        merged_data["Group"].notna() & (merged_data["Group"] != "Compta")
-    ]
-else:
-    st.warning("no 'Group' on the Excel file.")
+@st.cache_data(show_spinner=False)
+def cached_cube(source, sheet_name):
+    tracer.miss()
+    return EmailCube(cached_merged(source, sheet_name)[0])
+
+with tracer.span("preprocess", cached=True):
+    cube = cached_cube(csv_data, sheet_name)
+
+st.sidebar.header("2. Indicateurs")
+metrics = st.sidebar.multiselect("Indicateurs affichés", options=cube.metrics, default=DEFAULT_METRICS)
+if not metrics:
+    st.info("Aucun indicateur sélectionné.")
+    finish_trace()
+    st.stop()
 
 # =========================
 # 1. Personne별 차트 (envoyé / reçu)
 # =========================
 st.header("1. Charge e-mails par personne")
 
-# 1) 집계
-bar_data = (
-    merged_data
-    .groupby('Display Name_csv', as_index=False)
-    .agg({"Receive Count": "sum","Send Count": "sum"})
-    .rename(columns={"Receive Count": "reçu", "Send Count": "envoyé"})
-    .fillna({'reçu': 0, 'envoyé': 0})
-)
-
-# 2) 모든 이름 리스트
-all_names = bar_data['Display Name_csv'].unique().tolist()
+# 1) 모든 이름 리스트
+all_names = cube.persons()
 
 # 3) 전체 선택 버튼
 col1, col2 = st.columns([1,4])
@@ -124,17 +180,13 @@ with col2:
             options=all_names
         )
 
-# 5) 선택된 데이터만 필터링
-if selected_names:
-    bar_data = bar_data[bar_data['Display Name_csv'].isin(selected_names)]
+with tracer.span("filter") as sp:
+    # 5) 선택된 사람만 큐브에서 슬라이스 (선택 없음 → 전체)
+    bar_data = cube.by_person(selected_names or None, metrics)
 
-# 6) Long 변환
-bar_data_long = bar_data.melt(
-    id_vars='Display Name_csv',
-    value_vars=["reçu", "envoyé"],
-    var_name='Type',
-    value_name='Nombre'
-)
+    # 6) Long 변환
+    bar_data_long = to_long(bar_data, 'Display Name_csv', metrics)
+    sp.update(rows=len(bar_data_long), chart="personne")
 
 # 7) Altair grouped bar chart
 chart = (
@@ -146,14 +198,15 @@ chart = (
         color=alt.Color(
             'Type:N',
             title='Type',
-            scale=alt.Scale(domain=['reçu', 'envoyé'])  # ← 범례/색 순서 고정
+            scale=alt.Scale(domain=metrics)  # ← 범례/색 순서 고정
         ),
-        xOffset=alt.XOffset('Type:N', sort=['reçu', 'envoyé']),  # ← 막대 나란히 순서 고정
+        xOffset=alt.XOffset('Type:N', sort=metrics),  # ← 막대 나란히 순서 고정
         tooltip=['Display Name_csv', 'Type', 'Nombre']
     )
     .properties(width=800, height=500)
 )
-st.altair_chart(chart, use_container_width=True)
+with tracer.span("render", rows=len(bar_data_long), chart="personne"):
+    st.altair_chart(chart, use_container_width=True)
 
 
 # =========================
@@ -162,21 +215,8 @@ st.altair_chart(chart, use_container_width=True)
 st.header("2. Charge e-mails par groupe")
 
 if "Group" in merged_data.columns:
-    # 1) 집계 후 프랑스어 라벨로 변경
-    group_bar = (
-        merged_data
-        .groupby('Group', as_index=False)
-        .agg({"Send Count": "sum", "Receive Count": "sum"})
-        .rename(columns={"Send Count": "envoyé", "Receive Count": "reçu"})
-        .fillna({'envoyé': 0, 'reçu': 0})
-    )
-
-    # 2) 제외할 그룹 필터링
-    exclude_groups = ["Contentieux", "Direction", "Stagiaires", "marketing"]
-    group_bar = group_bar[~group_bar['Group'].isin(exclude_groups)]
-
-    # 3) 그룹 선택 위젯 + 전체 선택 체크박스
-    all_groups = group_bar['Group'].unique().tolist()
+    # 1) 제외 그룹을 뺀 그룹 목록 + 2) 그룹 선택 위젯 + 전체 선택 체크박스
+    all_groups = cube.groups()
 
     col1, col2 = st.columns([1, 4])
     with col1:
@@ -197,20 +237,18 @@ if "Group" in merged_data.columns:
                 key="group_multiselect"
             )
 
-    # 4) 선택된 그룹만 필터링
+    # 4) 선택된 그룹만 큐브에서 슬라이스
     if selected_groups:
-        group_bar = group_bar[group_bar['Group'].isin(selected_groups)]
+        with tracer.span("filter", chart="groupe") as sp:
+            group_bar = cube.by_group(selected_groups, metrics)
+            sp["rows"] = len(group_bar)
     else:
         st.info("Aucun groupe sélectionné.")
+        finish_trace()
         st.stop()
 
     # 5) Wide → Long 변환
-    group_bar_long = group_bar.melt(
-        id_vars='Group',
-        value_vars=["reçu", "envoyé"],
-        var_name='Type',
-        value_name='Nombre'
-    )
+    group_bar_long = to_long(group_bar, 'Group', metrics)
 
     # 6) Altair grouped bar chart
     chart_group = (
@@ -222,14 +260,15 @@ if "Group" in merged_data.columns:
         color=alt.Color(
             'Type:N',
             title='Type',
-            scale=alt.Scale(domain=['reçu', 'envoyé'])  # ← 순서 고정
+            scale=alt.Scale(domain=metrics)  # ← 순서 고정
         ),
-        xOffset=alt.XOffset('Type:N', sort=['reçu', 'envoyé']),  # ← 순서 고정
+        xOffset=alt.XOffset('Type:N', sort=metrics),  # ← 순서 고정
         tooltip=['Group', 'Type', 'Nombre']
     )
     .properties(width=800, height=500)
 )
-    st.altair_chart(chart_group, use_container_width=True)
+    with tracer.span("render", rows=len(group_bar_long), chart="groupe"):
+        st.altair_chart(chart_group, use_container_width=True)
 else:
     st.warning("⚠️ no 'Group' on the Excel file.")
 
@@ -238,19 +277,14 @@ else:
 # =========================
 
 # group_bar는 2번 차트에서 이미 집계·필터된 DataFrame이며,
-# 컬럼: ['Group', 'envoyé', 'reçu'] 형태라고 가정
+# 컬럼: ['Group', <선택된 지표>...] 형태라고 가정
 
 # 정렬을 위해 총합 컬럼 추가(표시는 안 함)
 group_bar = group_bar.copy()
-group_bar["Total"] = group_bar["envoyé"] + group_bar["reçu"]
+group_bar["Total"] = group_bar[metrics].sum(axis=1)
 
 # Long 형식으로 변환
-group_bar_long3 = group_bar.melt(
-    id_vars="Group",
-    value_vars=["reçu", "envoyé"],
-    var_name="Type",
-    value_name="Nombre"
-)
+group_bar_long3 = to_long(group_bar, "Group", metrics)
 
 # 스택형 바차트 (한 막대에 두 색상)
 chart_group_stacked = (
@@ -269,5 +303,79 @@ chart_group_stacked = (
     .properties(width=800, height=500)
 )
 
-st.altair_chart(chart_group_stacked, use_container_width=True)
+with tracer.span("render", chart="groupe empilé"):
+    st.altair_chart(chart_group_stacked, use_container_width=True)
+
+
+# =========================
+# 4. 주간 추이 (이력 저장소, 보고서는 한 번만 적재)
+# =========================
+st.header("4. Évolution hebdomadaire")
+
+@st.cache_resource(show_spinner=False)
+def get_history():
+    return EmailHistory(DEFAULT_HISTORY_PATH)
+
+@st.cache_data(show_spinner=False)
+def ingest_report(source):
+    tracer.miss()
+    return get_history().ingest(iter_report_chunks(source), content_hash(read_source_bytes(source)))
+
+@st.cache_data(show_spinner=False)
+def cached_attribution(history_version: int, sheet_name, confirmed: int):
+    # UPN → Group (그룹 추이 집계용) — 바뀐 경우에만 집계 테이블 재계산
+    # 막대 차트와 같은 IdentityResolver (UPN / 토큰 순서 / 확인된 퍼지) 로 귀속
+    tracer.miss()
+    history = get_history()
+    people = history.people()
+    group_data = cached_groups(DEFAULT_EXCEL_PATH, sheet_name)[0]
+    resolver = IdentityResolver(group_data, get_identity_map())
+    keys = resolver.keys_for(people.rename(columns={"upn": "User Principal Name"}))
+    groups = prepare_groups(group_data)[["_key", "Group"]]
+    assigned = people.assign(_key=keys).merge(groups, on="_key", how="inner")
+    return history.set_attribution(assigned[["upn", "Group"]])
+
+@st.cache_data(show_spinner=False)
+def cached_trend(history_version: int, by: str):
+    tracer.miss()
+    return get_history().trend(by)
+
+if {"Report Refresh Date", "User Principal Name"}.issubset(report_cols):
+    with tracer.span("history", cached=True) as sp:
+        ingest_report(csv_data)
+        history = get_history()
+        cached_attribution(history.version, sheet_name, get_identity_map().confirmed())
+        weeks = history.weeks()
+        sp["weeks"] = len(weeks)
+    if len(weeks) < 2:
+        st.info("Une seule semaine en historique — téléversez d'autres exports pour suivre l'évolution.")
+
+    trend_by = st.radio("Regrouper par", ["Groupe", "Personne"], horizontal=True, key="trend_by")
+    trend_metric = st.selectbox("Indicateur", metrics, key="trend_metric")
+    with tracer.span("trend", cached=True):
+        if trend_by == "Groupe":
+            trend = cached_trend(history.version, "group")
+            trend = trend[trend["Group"].isin(selected_groups)] if "Group" in merged_data.columns else trend
+            trend_key = "Group"
+        else:
+            trend = cached_trend(history.version, "person")
+            trend = trend[trend["Display Name"].isin(selected_names)] if selected_names else trend
+            trend_key = "Display Name"
+
+    chart_trend = (
+        alt.Chart(trend)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("week:N", title="Semaine"),
+            y=alt.Y(f"{trend_metric}:Q", title=f"{trend_metric} (moyenne / 7 jours)"),
+            color=alt.Color(f"{trend_key}:N", title=trend_by),
+            tooltip=[trend_key, "week", trend_metric, f"{trend_metric} Δ%"]
+        )
+        .properties(width=800, height=400)
+    )
+    with tracer.span("render", rows=len(trend), chart="évolution"):
+        st.altair_chart(chart_trend, use_container_width=True)
+else:
+    st.info("Colonnes 'Report Refresh Date' / 'User Principal Name' absentes — historique désactivé.")
 
+finish_trace(rows=len(merged_data))
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from rilsa.coords import CoordinateStore
+from rilsa.emaildata import EmailCube, drop_ungrouped, load_grouped_report, merge_groups
+from rilsa.filters import FilterEngine
+from rilsa.identity import IdentityResolver
+from rilsa.ingest import load_portfolio
+from rilsa.maplayers import assign_colors, build_cmap, point_payload
+from rilsa.preprocess import SUPPORT_USER, build_address, preprocess
+from rilsa.spatial import SpatialIndex
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+XLSX_MAX_ROWS = 50_000  # 이보다 크면 XLSX 생성/파싱 단계는 건너뜀 (openpyxl 쓰기가 너무 느림)
+
+GERANTS = [
+    "NIGGLI Lucy", "BENISTANT Audrey", "CURCHOD Merry", "DE PREUX Joanna",
+    "D'AMORE Diego", "IANNALFO Massimo", "HUBER Rodolph", "VANEY Marie-Ange",
+    SUPPORT_USER,
+]
+LOCALITIES = [
+    ("1004", "Lausanne", "VD", 46.52, 6.63), ("1009", "Pully", "VD", 46.51, 6.66),
+    ("1020", "Renens", "VD", 46.54, 6.59), ("1260", "Nyon", "VD", 46.38, 6.24),
+    ("1820", "Montreux", "VD", 46.43, 6.91), ("1201", "Genève", "GE", 46.21, 6.14),
+    ("1950", "Sion", "VS", 46.23, 7.36), ("2000", "Neuchâtel", "NE", 46.99, 6.93),
+]
+STREETS = ["Avenue Vinet", "Rue du Lac", "Chemin des Bluets", "Route de Genève", "Place de la Gare"]
+GROUPS = ["SHO", "Nyon", "Montreux", "Compta", "Direction", "Contentieux", "Stagiaires", "Technique"]
+
+
+# =========================
+# 합성 데이터 생성
+# =========================
+def synth_portfolio(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    loc = rng.integers(0, len(LOCALITIES), n)
+    ref_base = rng.choice([100000, 500000, 800000, 600000], n, p=[0.3, 0.4, 0.25, 0.05])
+    return pd.DataFrame({
+        "Référence": (ref_base + rng.integers(0, 99000, n)).astype(str),
+        "Désignation": [f"{STREETS[i % len(STREETS)]} {i % 200 + 1}" for i in range(n)],
+        "NPA": [LOCALITIES[i][0] for i in loc],
+        "Lieu": [LOCALITIES[i][1] for i in loc],
+        "Canton": [LOCALITIES[i][2] for i in loc],
+        "Propriétaire": [f"Propriétaire {i % 997}" for i in range(n)],
+        "Gérant": rng.choice(GERANTS, n),
+        "Nombre total d'appartements": rng.integers(0, 40, n),
+        "Nombre total d'entreprises": rng.integers(0, 5, n),
+    })
+
+def synth_coords(portfolio: pd.DataFrame, seed: int = 0, coverage: float = 0.9) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    base = portfolio.drop_duplicates(subset=["Désignation", "NPA"])
+    base = base[rng.random(len(base)) < coverage]
+    lat0 = base["NPA"].map({l[0]: l[3] for l in LOCALITIES}).to_numpy(dtype=float)
+    lon0 = base["NPA"].map({l[0]: l[4] for l in LOCALITIES}).to_numpy(dtype=float)
+    return pd.DataFrame({
+        "Référence": pd.to_numeric(base["Référence"]),
+        "adresse": build_address(base),
+        "latitude": lat0 + rng.normal(0, 0.01, len(base)),
+        "longitude": lon0 + rng.normal(0, 0.01, len(base)),
+    })
+
+def synth_mailboxes(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    names = [f"USER{i:07d} Prénom" for i in range(n)]
+    report = pd.DataFrame({
+        "Report Refresh Date": "2025-09-09",
+        "User Principal Name": [f"user{i}@rilsa.ch" for i in range(n)],
+        "Display Name": names,
+        "Is Deleted": False,
+        "Deleted Date": np.nan,
+        "Last Activity Date": "2025-09-08",
+        "Send Count": rng.poisson(300, n),
+        "Receive Count": rng.poisson(1500, n),
+        "Read Count": rng.poisson(1400, n),
+        "Meeting Created Count": rng.poisson(5, n),
+        "Meeting Interacted Count": rng.poisson(10, n),
+        "Assigned Products": "MICROSOFT 365 BUSINESS STANDARD",
+        "Report Period": 90,
+    })
+    grouped = rng.random(n) < 0.9
+    groups = pd.DataFrame({
+        "Display Name": [nm.upper() if i % 7 == 0 else nm for i, nm in enumerate(names)],
+        "Group": np.where(grouped, rng.choice(GROUPS, n), None),
+    })
+    return report, groups
+
+
+# =========================
+# 측정
+# =========================
+def measure(results: list, pipeline: str, n: int, stage: str, fn, *args, track_memory: bool = True):
+    if track_memory:
+        tracemalloc.start()
+    t = time.perf_counter()
+    out = fn(*args)
+    seconds = time.perf_counter() - t
+    peak = 0
+    if track_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    results.append({"pipeline": pipeline, "rows": n, "stage": stage, "seconds": seconds, "peak_mb": peak / 1e6})
+    return out
+
+
+def bench_map(n: int, workdir: str, results: list, track_memory: bool = True):
+    raw = synth_portfolio(n)
+    m = lambda stage, fn, *a: measure(results, "map", n, stage, fn, *a, track_memory=track_memory)
+
+    if n <= XLSX_MAX_ROWS:
+        xlsx = os.path.join(workdir, f"portfolio_{n}.xlsx")
+        raw.to_excel(xlsx, index=False, startrow=4, engine="openpyxl")
+        cache_dir = os.path.join(workdir, "snapshots")
+        # 앱과 같은 경로: 머리글 자동 감지 + 프로세스 풀 변환 + 스냅샷 (변환 메모리는 하위 프로세스 → peak 에 포함 안 됨)
+        load = lambda: load_portfolio([(xlsx, xlsx)], cache_dir=cache_dir)
+        m("excel_load (xlsx→parquet)", load)
+        raw, _ = m("excel_load (snapshot)", load)
+
+    df, _ = m("preprocess", preprocess, raw)
+    engine = m("filter_build", FilterEngine, df)
+    selection = {"Gérant": GERANTS[:4], "Type": ["Immeuble", "PPE"]}
+    m("filter_query", lambda: df[engine.mask(selection)])
+
+    coords_csv = os.path.join(workdir, f"coords_{n}.csv")
+    synth_coords(raw).to_csv(coords_csv, index=False)
+    store = m("coords_load", CoordinateStore, coords_csv)
+    df = m("coords_fill", store.fill, df)
+
+    points = df.dropna(subset=["latitude", "longitude"]).copy()
+    cmap = build_cmap(sorted(df["Gérant group"].dropna().astype(str).unique()))
+    m("colors", assign_colors, points, "Gérant group", cmap)
+    m("point_payload (json)", lambda: json.dumps(point_payload(points)[0].to_dict("records")))
+
+    index = m("spatial_build", SpatialIndex, df["latitude"], df["longitude"])
+    m("spatial_query", lambda: (index.radius(46.52, 6.63, 2.0), index.nearest(46.52, 6.63, 50)))
+
+
+def bench_email(n: int, workdir: str, results: list, track_memory: bool = True):
+    report, groups = synth_mailboxes(n)
+    m = lambda stage, fn, *a: measure(results, "email", n, stage, fn, *a, track_memory=track_memory)
+
+    csv_path = os.path.join(workdir, f"mailboxes_{n}.csv")
+    report.to_csv(csv_path, index=False)
+    data = m("csv_load", pd.read_csv, csv_path)
+    m("merge", lambda: drop_ungrouped(merge_groups(data, groups)))
+    merged = m("csv_load+merge (chunked)", lambda: load_grouped_report(csv_path, groups, resolver=IdentityResolver(groups)))
+    cube = m("cube_build", EmailCube, merged)
+    m("cube_slice", lambda: (cube.by_person(cube.persons()[: n // 2]), cube.by_group(cube.groups()[:3])))
+
+
+PIPELINES = {"map": bench_map, "email": bench_email}
+
+
+# =========================
+# 보고 / 기준선 비교
+# =========================
+def print_table(results: list):
+    print(f"{'pipeline':<8} {'rows':>9}  {'stage':<28} {'time (ms)':>10} {'peak (MB)':>10}")
+    for r in results:
+        print(f"{r['pipeline']:<8} {r['rows']:>9}  {r['stage']:<28} {r['seconds']*1000:>10.1f} {r['peak_mb']:>10.1f}")
+
+def find_regressions(results: list, baseline: list, tolerance: float) -> list:
+    ref = {(b["pipeline"], b["rows"], b["stage"]): b for b in baseline}
+    out = []
+    for r in results:
+        b = ref.get((r["pipeline"], r["rows"], r["stage"]))
+        if b is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            # 아주 작은 값은 잡음이 커서 비교하지 않음
+            if b[metric] > 1e-3 and r[metric] > b[metric] * (1 + tolerance):
+                out.append((r, metric, b[metric]))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless des pipelines carte / e-mail.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--json", help="Écrire les résultats dans ce fichier JSON")
+    parser.add_argument("--baseline", help="Comparer à un JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Régression tolérée (0.5 = +50 %%)")
+    parser.add_argument("--no-memory", action="store_true", help="Désactiver tracemalloc (timings plus précis)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            for name in args.pipelines:
+                PIPELINES[name](n, workdir, results, track_memory=not args.no_memory)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for r, metric, before in regressions:
+            print(f"RÉGRESSION {r['pipeline']}/{r['rows']}/{r['stage']}: {metric} {before:.4g} → {r[metric]:.4g}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
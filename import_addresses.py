@@ -0,0 +1,38 @@
+import argparse
+import sys
+import time
+
+from rilsa.localgeo import DEFAULT_LOCAL_INDEX_PATH, REGISTER_FORMATS, LocalGeocoder
+
+
+def log(msg: str, quiet: bool = False):
+    if not quiet:
+        print(f"[{time.strftime('%H:%M:%S')}] {msg}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Importe un registre d'adresses (GWR, CSV générique) dans l'index de géocodage local."
+    )
+    parser.add_argument("files", nargs="+", help="Fichiers CSV / TSV du registre")
+    parser.add_argument("--format", choices=sorted(REGISTER_FORMATS), default="gwr")
+    parser.add_argument("--sep", help="Séparateur (défaut : celui du format)")
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--index", default=DEFAULT_LOCAL_INDEX_PATH, help="Index SQLite à créer / compléter")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    index = LocalGeocoder(args.index)
+    for path in args.files:
+        n = index.import_csv(
+            path, args.format, sep=args.sep, encoding=args.encoding,
+            progress=lambda total: log(f"{path} : {total} adresses", args.quiet),
+        )
+        log(f"{path} : {n} adresses importées", args.quiet)
+    log(f"Terminé en {time.perf_counter() - t0:.1f} s — {len(index)} adresses dans {args.index}", args.quiet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
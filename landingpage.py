@@ -11,5 +11,6 @@ st.markdown(
     """
     - [RILSA map](https://rilsamap.streamlit.app/)
     - [RILSA Email data analyse](https://rilsaemail.streamlit.app/)
+    - RILSA Charge par gérant (`streamlit run Chargeanalyse.py`)
 """
 )
\ No newline at end of file
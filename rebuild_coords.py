@@ -0,0 +1,178 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from rilsa.coords import (
+    DEFAULT_COORDS_CSV_PATH,
+    EXPORT_COLUMNS,
+    LOCK_SUFFIX,
+    PRECISION_COLUMN,
+    CoordinateStore,
+    RunLock,
+    write_coords_csv,
+)
+from rilsa.address import address_key_series, lookup_stats
+from rilsa.geocoding import DEFAULT_GEOCODE_CACHE_PATH, GOOGLE_GEOCODE_URL, GeocodeCache, Geocoder, requery_mask
+from rilsa.ingest import load_portfolio
+from rilsa.localgeo import DEFAULT_LOCAL_INDEX_PATH, PRECISION_ADDRESS, PRECISION_LEVELS, PRECISION_NPA, LocalGeocoder
+from rilsa.preprocess import preprocess
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_BATCH_SIZE = 500
+
+# 종료 코드 (cron 에서 구분 가능하도록)
+EXIT_OK, EXIT_FAILED, EXIT_LOCKED = 0, 1, 2
+
+
+def log(msg: str, quiet: bool = False):
+    if not quiet:
+        print(f"[{time.strftime('%H:%M:%S')}] {msg}", file=sys.stderr, flush=True)
+
+
+# =========================
+# 단계
+# =========================
+def load_portfolios(paths, sheet=None, quiet: bool = False) -> pd.DataFrame:
+    # 변환되지 않은 문서는 프로세스 풀에서 병렬 변환
+    sheets = [(path, sheet) for path in paths] if sheet else None
+    raw, info = load_portfolio([(path, path) for path in paths], sheets=sheets)
+    for part in info["parts"]:
+        log(f"{part['source']} : {part['rows']} lignes ({'snapshot' if part['cache_hit'] else 'XLSX'})", quiet)
+    df, warnings = preprocess(raw)
+    for w in warnings:
+        log(w, quiet)
+    return df
+
+def geocode_in_batches(geocoder: Geocoder, addresses: list, batch_size: int, on_batch=None, quiet: bool = False):
+    # 배치마다 SQLite 캐시에 기록 → 중단 후 재실행하면 완료된 배치는 캐시 적중으로 건너뜀
+    results = {}
+    n_batches = (len(addresses) + batch_size - 1) // batch_size
+    totals = {"addresses": 0, "cache_hits": 0, "local": 0, "api_calls": 0, "seconds": 0.0}
+    for b in range(n_batches):
+        batch = addresses[b * batch_size:(b + 1) * batch_size]
+        results.update(geocoder.geocode_many(batch, flush_every=batch_size))
+        run = geocoder.last_run
+        for k in totals:
+            totals[k] += run[k]
+        rate = run["addresses"] / run["seconds"] if run["seconds"] else float("inf")
+        log(
+            f"lot {b + 1}/{n_batches} : {run['addresses']} adresses — {run['cache_hits']} en cache, "
+            f"{run['local']} index local, {run['api_calls']} appels API, {rate:.0f} adr/s",
+            quiet,
+        )
+        if on_batch is not None:
+            on_batch(results)
+    return results, totals
+
+def build_output(df: pd.DataFrame, existing: pd.DataFrame, prune: bool) -> pd.DataFrame:
+    rows = df.dropna(subset=["latitude", "longitude"])
+    rows = rows[[c for c in EXPORT_COLUMNS if c in rows.columns]]
+    if existing is not None and not prune and "adresse" in existing.columns:
+        # 이번 포트폴리오에 없는 기존 좌표는 유지 (다른 통합 문서용)
+        keep = ~address_key_series(existing["adresse"]).isin(set(address_key_series(rows["adresse"])))
+        rows = pd.concat([existing[keep], rows], ignore_index=True)
+    return rows.drop_duplicates(ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconstruit rilsa_coords.csv à partir d'un ou plusieurs classeurs KPI.")
+    parser.add_argument("workbooks", nargs="+", help="Classeurs KPI (.xlsx)")
+    parser.add_argument("--sheet", help="Feuille (défaut : première de chaque classeur)")
+    parser.add_argument("--output", default=DEFAULT_COORDS_CSV_PATH)
+    parser.add_argument("--cache", default=DEFAULT_GEOCODE_CACHE_PATH, help="Cache SQLite du géocodeur (sert de point de reprise)")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_MAPS_API_KEY", ""))
+    parser.add_argument("--geocode-url", default=GOOGLE_GEOCODE_URL, help="URL du service (ex. stub local pour les tests)")
+    parser.add_argument("--local-index", default=DEFAULT_LOCAL_INDEX_PATH, help="Index d'adresses local (import_addresses.py)")
+    parser.add_argument(
+        "--min-precision", choices=PRECISION_LEVELS,
+        help="Appeler Google si l'index local est moins précis (défaut : adresse avec clé API, sinon npa)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=40.0, help="Requêtes / seconde")
+    parser.add_argument("--limit", type=int, help="Nombre maximal d'adresses à géocoder")
+    parser.add_argument("--prune", action="store_true", help="Supprimer les adresses absentes des classeurs")
+    parser.add_argument("--dry-run", action="store_true", help="Compter les adresses sans géocoder ni écrire")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        # 동시 실행 방지 (cron 중복 실행 시 두 번째는 바로 종료, 앱의 증분 추가는 끝날 때까지 대기)
+        with RunLock(args.output + LOCK_SUFFIX):
+            return run(args)
+    except BlockingIOError:
+        log(f"Une autre exécution est en cours ({args.output}{LOCK_SUFFIX}).")
+        return EXIT_LOCKED
+
+def run(args) -> int:
+    t0 = time.perf_counter()
+    df = load_portfolios(args.workbooks, args.sheet, args.quiet)
+    store = CoordinateStore(args.output)
+    df = store.fill(df)
+    existing = pd.read_csv(args.output) if store.exists else None
+
+    # 중심 좌표(도로/NPA)로만 알려진 행도 키가 있으면 다시 조회 — 단, 아직 Google 에 보내지 않은 키만
+    min_precision = args.min_precision or (PRECISION_ADDRESS if args.api_key else PRECISION_NPA)
+    cache = GeocodeCache(args.cache)
+    requery = requery_mask(df, cache, min_precision) if args.api_key else pd.Series(False, index=df.index)
+    missing = (df["latitude"].isna() | requery) & df["adresse"].notna()
+    # 정규 키 기준 중복 제거 → 유료 조회 수 최소화
+    keys = address_key_series(df["adresse"])
+    pending = df.loc[missing, "adresse"]
+    addresses = pending[~keys[missing].duplicated()].tolist()[:args.limit]
+    stats = lookup_stats(pending)
+    log(
+        f"{len(df)} lignes, {int((~missing).sum())} déjà géocodées, {int(requery.sum())} à préciser, {len(addresses)} adresses à géocoder "
+        f"({stats['distinctes (brutes)']} variantes → {stats['distinctes (clés)']} clés)",
+        args.quiet,
+    )
+    if args.dry_run:
+        return EXIT_OK
+    local = LocalGeocoder(args.local_index) if os.path.exists(args.local_index) else None
+    if addresses and not args.api_key and local is None:
+        log("Clé API manquante (--api-key ou GOOGLE_MAPS_API_KEY) et pas d'index local.")
+        return EXIT_FAILED
+    if local is not None:
+        log(f"Index local : {len(local)} adresses ({args.local_index})", args.quiet)
+
+    def write(results):
+        # 배치마다 원자적으로 기록 → 중단되어도 파일은 항상 완전한 상태
+        # 정규 키로 병합 → 대표 주소만 조회했어도 같은 키의 변형 주소 행까지 채움
+        by_key = dict(zip(address_key_series(pd.Series(list(results), dtype=object)), results.values()))
+        coords = keys.map(by_key)
+        # 다시 조회한 행은 새 결과가 있을 때만 교체
+        had = df["latitude"].notna() & ~(requery & coords.str[0].notna())
+        out = df.assign(
+            latitude=df["latitude"].where(had, coords.str[0]),
+            longitude=df["longitude"].where(had, coords.str[1]),
+            **{PRECISION_COLUMN: df[PRECISION_COLUMN].where(had, coords.str[2])},
+        )
+        write_coords_csv(build_output(out, existing, args.prune), args.output)
+
+    totals = {"api_calls": 0}
+    if addresses:
+        geocoder = Geocoder(
+            args.api_key, cache, local=local, min_precision=min_precision,
+            url=args.geocode_url, max_workers=args.workers, rate=args.rate,
+        )
+        results, totals = geocode_in_batches(geocoder, addresses, args.batch_size, on_batch=write, quiet=args.quiet)
+        failed = sum(1 for lat, _, _ in results.values() if lat is None)
+    else:
+        write({})
+        failed = 0
+
+    log(
+        f"Terminé en {time.perf_counter() - t0:.1f} s — {totals.get('local', 0)} index local, {totals['api_calls']} appels API, "
+        f"{failed} adresses sans résultat → {args.output}",
+        args.quiet,
+    )
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
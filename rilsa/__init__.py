@@ -0,0 +1,16 @@
+# =========================
+# RILSA 공통 라이브러리 (로더 / 전처리 / 집계 / 지오코더)
+# 페이지 시작을 빠르게 하기 위해 하위 모듈은 처음 접근할 때 로드
+# =========================
+import importlib
+
+__all__ = [
+    "address", "coords", "diff", "emaildata", "export", "filters", "geocoding", "history", "identity",
+    "ingest", "jobs", "localgeo", "maplayers", "preprocess", "spatial", "tours", "tracing", "workload",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,124 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# 기본 설정
+# =========================
+# 도로 유형 약어 → 정식 명칭 (소문자 키, 마침표는 선택)
+STREET_TYPES = {
+    "av": "Avenue", "ave": "Avenue", "avenue": "Avenue",
+    "ch": "Chemin", "chem": "Chemin", "chemin": "Chemin",
+    "rte": "Route", "rt": "Route", "route": "Route",
+    "r": "Rue", "rue": "Rue",
+    "bd": "Boulevard", "bld": "Boulevard", "boulevard": "Boulevard",
+    "pl": "Place", "place": "Place",
+    "imp": "Impasse", "impasse": "Impasse",
+    "all": "Allée", "allée": "Allée",
+    "sent": "Sentier", "sentier": "Sentier",
+    "prom": "Promenade", "promenade": "Promenade",
+    "qu": "Quai", "quai": "Quai",
+    "str": "Strasse", "strasse": "Strasse",
+}
+# 키에서 빼는 단어: 관사만 ("Avenue de la Gare 1" == "Avenue la Gare 1")
+# 도로 유형은 유지 — "Rue de Lausanne 10" 과 "Avenue de Lausanne 10" 은 다른 건물
+KEY_STOPWORDS = ["de", "du", "des", "la", "le", "les", "l", "d", "ppe"]
+NPA_RANGE = (1000, 9699)  # 스위스 우편번호
+
+# 주소가 아닌 메모: "- perte au 31.12.2023", "Bât 1", "lot 20", "Lot isolé"
+_NOISE_RE = re.compile(
+    r"(?:-\s*)?\bperte\s+au\b.*$"
+    r"|(?:-\s*)?\bb[âa]t(?:iment)?\.?\s*\w+"
+    r"|(?:-\s*)?\blot\s+(?:isol[ée]|\d+)\b",
+    flags=re.IGNORECASE,
+)
+_ABBR_RE = re.compile(
+    r"^(?P<abbr>" + "|".join(sorted(map(re.escape, STREET_TYPES), key=len, reverse=True)) + r")\.?(?=\s)",
+    flags=re.IGNORECASE,
+)
+# 날짜 도로명 ("Avenue du 14-Avril", "14 Avril", "Rue du 1er-Mars"): 앞의 숫자는 번지가 아님
+_LEAD_WORDS = "|".join(sorted({v.casefold() for v in STREET_TYPES.values()}) + KEY_STOPWORDS)
+_NUMERIC_STREET_RE = r"(?i:(?:(?:" + _LEAD_WORDS + r")['\s]+)*)\d{1,2}(?:er)?[\s-]+[A-Za-zÀ-ÿ]{2}[A-Za-zÀ-ÿ-]*"
+_NUMBER_RE = (
+    r"^(?P<street>(?:" + _NUMERIC_STREET_RE + r")?.*?)\s*(?P<number>\d{1,4})\s*(?P<suffix>(?i:bis|ter)(?![a-zA-Z])|[a-zA-Z](?![a-zA-Z]))?(?P<rest>.*)$"
+)
+_SPLIT_RE = r"^(?P<designation>.*?),\s*(?P<npa>[^\s,]+)\s+(?P<lieu>[^,]+)"
+_STOP_RE = r"\b(?:" + "|".join(KEY_STOPWORDS) + r")\b"
+
+
+# =========================
+# 벡터화 정규화 단계
+# =========================
+def _on_uniques(series: pd.Series, fn) -> pd.Series:
+    # 고유값에만 정규식 적용 후 코드로 펼침 (포트폴리오는 같은 주소가 반복됨)
+    codes, uniques = pd.factorize(series)
+    if not len(uniques):
+        return pd.Series(np.nan, index=series.index, dtype=object)
+    out = fn(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    out = np.append(out, np.nan)  # 코드 -1(NaN) → NaN
+    return pd.Series(out[codes], index=series.index, dtype=object)
+
+def fold(series: pd.Series) -> pd.Series:
+    # 악센트 제거 + casefold + 영숫자 외 문자는 공백
+    s = series.astype(str).str.normalize("NFKD").str.replace("[\u0300-\u036f]", "", regex=True).str.casefold()
+    return s.str.replace(r"[^0-9a-z]+", " ", regex=True).str.strip()
+
+def clean_designation(designation: pd.Series) -> pd.Series:
+    return _on_uniques(designation, _clean_designation)
+
+def _clean_designation(designation: pd.Series) -> pd.Series:
+    s = designation.astype(str).str.normalize("NFKC")
+    s = s.str.replace(_NOISE_RE, " ", regex=True)
+    s = s.str.replace(r"\s+", " ", regex=True).str.strip(" ,-&")
+    return s.str.replace(_ABBR_RE, lambda m: STREET_TYPES[m.group("abbr").casefold()], regex=True)
+
+def valid_npa(npa: pd.Series) -> pd.Series:
+    # "1004", 1004, 1004.0 → "1004" / 그 외 → NaN
+    digits = npa.astype(str).str.extract(r"^\s*(\d{4})(?:\.0+)?\s*$", expand=False)
+    value = pd.to_numeric(digits, errors="coerce")
+    return digits.where(value.between(*NPA_RANGE))
+
+def parse_designation(designation: pd.Series) -> pd.DataFrame:
+    # "Dapples 44-46" → Dapples / 44 / "" ; "Vignes 13 D" → Vignes / 13 / d ; "14 Avril 27" → 14 Avril / 27
+    parts = clean_designation(designation).str.extract(_NUMBER_RE)
+    no_number = parts["number"].isna()
+    parts.loc[no_number, "street"] = clean_designation(designation)[no_number]
+    parts["suffix"] = parts["suffix"].fillna("").str.casefold()
+    return parts[["street", "number", "suffix"]]
+
+def split_address(addresses: pd.Series) -> pd.DataFrame:
+    # build_address 형식 "Désignation, NPA Lieu, Canton, Suisse" → 구성 요소
+    parts = addresses.astype(str).str.extract(_SPLIT_RE)
+    unmatched = parts["designation"].isna()
+    parts.loc[unmatched, "designation"] = addresses[unmatched].astype(str)
+    return parts.fillna({"npa": "", "lieu": ""})
+
+
+# =========================
+# 정규 키 (좌표 저장소 / 지오코더 캐시 공용)
+# =========================
+def component_keys(designation: pd.Series, npa: pd.Series, lieu: pd.Series) -> pd.Series:
+    parts = parse_designation(designation)
+    core = fold(parts["street"]).str.replace(_STOP_RE, " ", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+    number = parts["number"].fillna("").str.lstrip("0") + parts["suffix"]
+    # NPA 가 유효하지 않으면 지명으로 대체
+    place = valid_npa(npa).fillna(fold(lieu).where(lieu.notna(), ""))
+    return (core + " " + number).str.strip() + "|" + place.astype(str)
+
+def address_key_series(addresses: pd.Series) -> pd.Series:
+    return _on_uniques(pd.Series(addresses), _address_keys).fillna("")
+
+def _address_keys(addresses: pd.Series) -> pd.Series:
+    parts = split_address(addresses)
+    keys = component_keys(parts["designation"], parts["npa"], parts["lieu"])
+    return keys.where(addresses.notna() & (addresses.astype(str).str.strip() != ""), "")
+
+def lookup_stats(addresses: pd.Series) -> dict:
+    # 정규화 전/후 고유 조회 수 (지오코딩 호출 절감 측정)
+    addresses = pd.Series(addresses).dropna()
+    return {
+        "adresses": len(addresses),
+        "distinctes (brutes)": addresses.nunique(),
+        "distinctes (clés)": address_key_series(addresses).nunique(),
+    }
@@ -0,0 +1,202 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .address import address_key_series
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_COORDS_CSV_PATH = "rilsa_coords.csv"
+COORD_COLUMNS = ["latitude", "longitude"]
+PRECISION_COLUMN = "précision"  # adresse / rue / npa (vide = inconnue, anciens fichiers)
+EXPORT_COLUMNS = [
+    "Référence", "Gérant", "Gérant group", "Type",
+    "Désignation", "NPA", "Lieu", "Canton",
+    "adresse", "latitude", "longitude", PRECISION_COLUMN,
+    "Nombre total d'appartements", "Nombre total d'entreprises", "Propriétaire",
+]
+LOCK_SUFFIX = ".lock"  # rebuild_coords 와 앱이 같은 잠금 파일 사용
+
+
+# =========================
+# 프로세스 간 잠금 (flock) — rebuild_coords 의 os.replace 와 앱의 증분 추가가 겹치지 않도록
+# =========================
+class RunLock:
+    def __init__(self, path: str, blocking: bool = False):
+        self.path = path
+        self.blocking = blocking
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            import fcntl
+        except ImportError:  # Windows: 잠금 없이 실행
+            return self
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB))
+        except OSError:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            os.close(self._fd)  # 닫으면 flock 도 해제됨
+
+
+# =========================
+# 좌표 저장소 (정규 주소 키 / Référence 인덱스)
+# =========================
+class CoordinateStore:
+    def __init__(self, path: str = DEFAULT_COORDS_CSV_PATH):
+        self.path = path
+        self.version = 0  # 좌표가 추가될 때마다 증가 → 캐시 키로 사용
+        self._lock = threading.Lock()
+        self._load()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        self.columns = None
+        self.by_address = _empty_index()
+        self.by_ref = _empty_index()
+        if os.path.exists(self.path):
+            coords = pd.read_csv(self.path)
+            self.columns = coords.columns.tolist()
+            self._index(coords)
+        self._stamp = self._file_stamp()
+
+    def refresh(self) -> bool:
+        # rebuild_coords 가 파일을 교체했으면 다시 읽음 (stat 한 번 — 재실행마다 호출해도 됨)
+        if self._file_stamp() == self._stamp:
+            return False
+        with self._lock:
+            if self._file_stamp() == self._stamp:
+                return False
+            self._load()
+            self.version += 1
+        return True
+
+    @property
+    def stamp(self):
+        # 마지막으로 읽은/쓴 파일 상태 (inode, mtime, 크기) — 재시작해도 같은 파일이면 같은 값
+        return self._stamp
+
+    @property
+    def exists(self) -> bool:
+        return self.columns is not None
+
+    def __len__(self):
+        return len(self.by_address)
+
+    def _index(self, coords: pd.DataFrame):
+        if not set(COORD_COLUMNS).issubset(coords.columns):
+            return
+        coords = coords.dropna(subset=COORD_COLUMNS)
+        values = coords.reindex(columns=COORD_COLUMNS + [PRECISION_COLUMN])
+        if "adresse" in coords.columns:
+            add = values.set_axis(address_key_series(coords["adresse"]), axis=0)
+            self.by_address = _upsert(self.by_address, add)
+        if "Référence" in coords.columns:
+            refs = pd.to_numeric(coords["Référence"], errors="coerce")
+            add = values[refs.notna().to_numpy()].set_axis(refs.dropna(), axis=0)
+            self.by_ref = _upsert(self.by_ref, add)
+
+    # ---------- 조회 ----------
+    def lookup(self, df: pd.DataFrame):
+        lat = np.full(len(df), np.nan)
+        lon = np.full(len(df), np.nan)
+        precision = np.full(len(df), None, dtype=object)
+        if "Référence" in df.columns and len(self.by_ref):
+            # 같은 Référence 가 우선 — 같은 정규 주소의 다른 건물(주차장, 상가 등) 좌표를 쓰지 않도록
+            _take(self.by_ref, pd.to_numeric(df["Référence"], errors="coerce"), lat, lon, precision)
+        if "adresse" in df.columns and len(self.by_address):
+            # Référence 로 못 찾은 행만 정규 주소 키로 보완
+            _take(self.by_address, address_key_series(df["adresse"]), lat, lon, precision)
+        return lat, lon, precision
+
+    def fill(self, df: pd.DataFrame) -> pd.DataFrame:
+        lat, lon, precision = self.lookup(df)
+        df = df.copy()
+        if "latitude" in df.columns and "longitude" in df.columns:
+            had = df["latitude"].notna() & df["longitude"].notna()
+            df["latitude"] = df["latitude"].fillna(pd.Series(lat, index=df.index))
+            df["longitude"] = df["longitude"].fillna(pd.Series(lon, index=df.index))
+            precision = np.where(had, df.get(PRECISION_COLUMN), precision)
+        else:
+            df["latitude"] = lat
+            df["longitude"] = lon
+        df[PRECISION_COLUMN] = pd.Series(precision, index=df.index, dtype=object)
+        return df
+
+    # ---------- 증분 저장 ----------
+    def add(self, rows: pd.DataFrame) -> int:
+        rows = rows.dropna(subset=COORD_COLUMNS)
+        if rows.empty:
+            return 0
+        # rebuild_coords 실행 중이면 끝날 때까지 대기 (백그라운드 작업 스레드에서 호출)
+        with self._lock, RunLock(self.path + LOCK_SUFFIX, blocking=True):
+            if self._file_stamp() != self._stamp:
+                # 다른 프로세스가 파일을 바꿈 → 다시 읽은 뒤 추가 (이전 추가분이 사라지지 않도록)
+                self._load()
+            if self.columns is None:
+                self.columns = rows.columns.tolist()
+                rows.to_csv(self.path, index=False)
+            else:
+                if PRECISION_COLUMN in rows.columns and PRECISION_COLUMN not in self.columns:
+                    # 이전 형식 파일: 정밀도 컬럼을 한 번 추가해 다시 씀
+                    self.columns.append(PRECISION_COLUMN)
+                    write_coords_csv(pd.read_csv(self.path).reindex(columns=self.columns), self.path)
+                rows.reindex(columns=self.columns).to_csv(self.path, mode="a", header=False, index=False)
+            self._index(rows)
+            self._stamp = self._file_stamp()
+            self.version += 1
+        return len(rows)
+
+
+# =========================
+# 원자적 쓰기 (임시 파일 → os.replace, 중간에 끊겨도 기존 파일 유지)
+# =========================
+def write_coords_csv(df: pd.DataFrame, path: str = DEFAULT_COORDS_CSV_PATH):
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        df.to_csv(tmp, index=False)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# =========================
+# 내부 유틸
+# =========================
+def _empty_index() -> pd.DataFrame:
+    return pd.DataFrame({
+        "latitude": pd.Series(dtype=float),
+        "longitude": pd.Series(dtype=float),
+        PRECISION_COLUMN: pd.Series(dtype=object),
+    })
+
+def _upsert(index_df: pd.DataFrame, add: pd.DataFrame) -> pd.DataFrame:
+    out = pd.concat([index_df, add]) if len(index_df) else add
+    return out[~out.index.duplicated(keep="last")]
+
+def _take(index_df: pd.DataFrame, keys: pd.Series, lat: np.ndarray, lon: np.ndarray, precision: np.ndarray):
+    pos = index_df.index.get_indexer(keys)
+    hit = (pos >= 0) & np.isnan(lat)
+    lat[hit] = index_df["latitude"].to_numpy()[pos[hit]]
+    lon[hit] = index_df["longitude"].to_numpy()[pos[hit]]
+    precision[hit] = index_df[PRECISION_COLUMN].to_numpy(dtype=object)[pos[hit]]
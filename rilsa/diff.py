@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from .maplayers import COLOR_COLUMNS
+from .preprocess import UNIT_COLUMNS
+
+# =========================
+# 기본 설정
+# =========================
+DIFF_KEY = "Référence"
+ADDED, REMOVED, REASSIGNED, UNITS_CHANGED = "Ajouté", "Supprimé", "Réattribué", "Unités modifiées"
+CHANGE_TYPES = [ADDED, REMOVED, REASSIGNED, UNITS_CHANGED]
+CHANGE_COLORS = {
+    ADDED: [46, 160, 67, 230],
+    REMOVED: [215, 48, 39, 230],
+    REASSIGNED: [255, 140, 0, 230],
+    UNITS_CHANGED: [117, 80, 186, 230],
+}
+CARRY_COLUMNS = ["adresse", "latitude", "longitude"]
+
+
+# =========================
+# 키 기준 정렬 (Référence 중복은 마지막 행 유지)
+# =========================
+def _keyed(df: pd.DataFrame, key: str, columns: list) -> pd.DataFrame:
+    out = df[df[key].notna()].drop_duplicates(key, keep="last").set_index(key)
+    return out[[c for c in columns if c in out.columns]]
+
+def _row_hash(df: pd.DataFrame, units: list) -> np.ndarray:
+    # 비교 컬럼 전체를 행당 64비트 해시 하나로 → 변경 행만 상세 비교
+    # 세대 수는 float 로 통일 (스냅샷마다 int/float 가 다를 수 있음)
+    norm = {c: _units(df, c) if c in units else df[c].astype(str) for c in df.columns}
+    return pd.util.hash_pandas_object(pd.DataFrame(norm), index=False).to_numpy()
+
+def _units(df: pd.DataFrame, c: str) -> np.ndarray:
+    return pd.to_numeric(df[c], errors="coerce").fillna(0).to_numpy(float)
+
+
+# =========================
+# 두 스냅샷 비교 (해시 조인, 반복문 없음)
+# =========================
+def diff_portfolios(old: pd.DataFrame, new: pd.DataFrame, key: str = DIFF_KEY, manager_col: str = "Gérant", unit_cols=UNIT_COLUMNS):
+    compare = [manager_col, *unit_cols]
+    a = _keyed(old, key, compare + CARRY_COLUMNS)
+    b = _keyed(new, key, compare + CARRY_COLUMNS)
+    compare = [c for c in compare if c in a.columns and c in b.columns]
+    units = [c for c in unit_cols if c in compare]
+
+    # 인덱스 해시 테이블로 위치 조회 (−1 = 상대편에 없음)
+    pos_in_old = a.index.get_indexer(b.index)
+    added = pos_in_old < 0
+    removed = np.setdiff1d(np.arange(len(a)), pos_in_old[~added], assume_unique=True)
+
+    common_new = b[~added]
+    common_old = a.iloc[pos_in_old[~added]]
+    changed = _row_hash(common_old[compare], units) != _row_hash(common_new[compare], units)
+    before, after = common_old[changed], common_new[changed]
+
+    reassigned = np.zeros(len(after), dtype=bool)
+    if manager_col in compare:
+        reassigned = before[manager_col].astype(str).to_numpy() != after[manager_col].astype(str).to_numpy()
+    units_changed = np.zeros(len(after), dtype=bool)
+    for c in units:
+        units_changed |= _units(before, c) != _units(after, c)
+    # 담당자 변경이 우선, 같은 담당자면 세대 수 변경 (요약 수치와 표의 행이 일치하도록)
+    units_only = ~reassigned & units_changed
+
+    def frame(rows, change, old_rows=None):
+        out = rows.reset_index()
+        out.insert(1, "Changement", change)
+        if old_rows is not None:
+            out[f"{manager_col} (avant)"] = old_rows[manager_col].to_numpy() if manager_col in old_rows else None
+            for c in units:
+                out[f"{c} (avant)"] = old_rows[c].to_numpy()
+        return out
+
+    changes = pd.concat(
+        [
+            frame(b[added], ADDED),
+            frame(a.iloc[removed], REMOVED),
+            frame(after[reassigned], REASSIGNED, before[reassigned]),
+            frame(after[units_only], UNITS_CHANGED, before[units_only]),
+        ],
+        ignore_index=True,
+    )
+    changes["Changement"] = pd.Categorical(changes["Changement"], categories=CHANGE_TYPES)
+    summary = {
+        ADDED: int(added.sum()),
+        REMOVED: len(removed),
+        REASSIGNED: int(reassigned.sum()),
+        UNITS_CHANGED: int(units_only.sum()),
+        "inchangés": len(common_new) - int((reassigned | units_changed).sum()),
+    }
+    return changes, summary
+
+def assign_change_colors(changes: pd.DataFrame):
+    # 변경 유형 코드 → uint8 LUT (assign_colors 와 같은 컬럼)
+    lookup = np.array([CHANGE_COLORS[c] for c in CHANGE_TYPES], dtype=np.uint8)
+    rgba = lookup[changes["Changement"].cat.codes.to_numpy()]
+    for i, c in enumerate(COLOR_COLUMNS):
+        changes[c] = rgba[:, i]
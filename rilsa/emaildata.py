@@ -0,0 +1,142 @@
+import io
+
+import pandas as pd
+
+# =========================
+# 기본 설정
+# =========================
+EXCLUDED_GROUPS = ["Contentieux", "Direction", "Stagiaires", "marketing"]  # 그룹 차트 제외
+DROPPED_GROUPS = ["Compta"]                                              # 병합 후 제거
+DEFAULT_CHUNKSIZE = 100_000                                              # CSV 청크 크기(행)
+
+PERSON_COL = "Display Name_csv"
+METRICS = {
+    "Send Count": "envoyé",
+    "Receive Count": "reçu",
+    "Read Count": "lu",
+    "Meeting Created Count": "réunions créées",
+    "Meeting Interacted Count": "réunions (interactions)",
+}
+DEFAULT_METRICS = ["reçu", "envoyé"]
+REPORT_COLUMNS = ["Report Refresh Date", "User Principal Name", "Display Name", "Report Period", *METRICS]
+
+
+# =========================
+# 로더 (경로 또는 업로드 바이트)
+# =========================
+def _as_source(source):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+def report_columns(source) -> list:
+    return pd.read_csv(_as_source(source), sep=',', encoding='utf-8', nrows=0).columns.tolist()
+
+def iter_report_chunks(source, chunksize: int = DEFAULT_CHUNKSIZE):
+    # 차트/이력에 쓰는 컬럼만 읽고, 카운트는 int32 로 축소
+    cols = [c for c in report_columns(source) if c in REPORT_COLUMNS]
+    counts = [c for c in METRICS if c in cols]
+    reader = pd.read_csv(
+        _as_source(source), sep=',', encoding='utf-8',
+        usecols=cols, dtype={c: "float32" for c in counts}, chunksize=chunksize,
+    )
+    for chunk in reader:
+        for c in counts:
+            chunk[c] = chunk[c].fillna(0).astype("int32")
+        yield chunk
+
+def load_groups(source, sheet_name=None):
+    # sheet_name 이 None 이면 첫 시트
+    xls = pd.ExcelFile(_as_source(source), engine="openpyxl")
+    sheet_to_use = xls.sheet_names[0] if sheet_name is None else sheet_name
+    return xls.parse(sheet_name=sheet_to_use), sheet_to_use
+
+
+# =========================
+# 병합 전 정규화 (공백/대소문자)
+# =========================
+def norm_key(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.strip().str.casefold()
+
+
+# =========================
+# CSV ↔ Group.xlsx 병합
+# =========================
+def prepare_groups(group_data: pd.DataFrame) -> pd.DataFrame:
+    group_data = group_data.assign(_key=norm_key(group_data["Display Name"]))
+
+    # 그룹 데이터에서 중복 키 제거(있다면 첫 번째만 사용)
+    return group_data.drop_duplicates(subset=["_key"], keep="first")
+
+def merge_groups(data: pd.DataFrame, group_data: pd.DataFrame, resolver=None) -> pd.DataFrame:
+    # resolver(IdentityResolver)가 있으면 UPN/퍼지 매칭 결과 키로 병합
+    keys = resolver.keys_for(data) if resolver is not None else norm_key(data["Display Name"])
+    data = data.assign(_key=keys)
+    if "_key" not in group_data.columns:
+        group_data = prepare_groups(group_data)
+
+    return pd.merge(
+        data,
+        group_data,
+        on="_key",
+        how="left",
+        suffixes=("_csv", "_xlsx")
+    ).drop(columns=["_key"])
+
+def drop_ungrouped(merged: pd.DataFrame) -> pd.DataFrame:
+    return merged[merged["Group"].notna() & ~merged["Group"].isin(DROPPED_GROUPS)]
+
+def load_grouped_report(source, group_data: pd.DataFrame, chunksize: int = DEFAULT_CHUNKSIZE, resolver=None) -> pd.DataFrame:
+    # 청크마다 병합 + 'Compta'/그룹 없음 제거 → 최대 메모리는 청크 크기에 비례
+    group_data = prepare_groups(group_data)
+    parts = []
+    for chunk in iter_report_chunks(source, chunksize):
+        merged = merge_groups(chunk, group_data, resolver)
+        parts.append(drop_ungrouped(merged) if "Group" in merged.columns else merged)
+    merged = pd.concat(parts, ignore_index=True)
+    for c in ("Display Name_csv", "Display Name_xlsx", "Group"):
+        if c in merged.columns:
+            merged[c] = merged[c].astype("category")
+    return merged
+
+
+# =========================
+# 집계 큐브 (사람 × 그룹 × 지표) — 보고서당 1회 생성, 차트는 슬라이스만
+# =========================
+class EmailCube:
+    def __init__(self, merged: pd.DataFrame):
+        cells = pd.DataFrame({
+            "person": merged[PERSON_COL],
+            "group": merged["Group"] if "Group" in merged.columns else "",
+        })
+        for col, label in METRICS.items():
+            if col in merged.columns:
+                cells[label] = pd.to_numeric(merged[col], errors="coerce").fillna(0)
+        self.metrics = [label for col, label in METRICS.items() if col in merged.columns]
+        cells = cells.groupby(["person", "group"], as_index=False, sort=True)[self.metrics].sum()
+        cells["person"] = cells["person"].astype("category")
+        cells["group"] = cells["group"].astype("category")
+        self.cells = cells
+
+    def persons(self) -> list:
+        return sorted(self.cells["person"].unique().tolist())
+
+    def groups(self, exclude=EXCLUDED_GROUPS) -> list:
+        return sorted(g for g in self.cells["group"].unique().tolist() if g not in exclude)
+
+    def by_person(self, persons=None, metrics=DEFAULT_METRICS) -> pd.DataFrame:
+        cells = self.cells if persons is None else self.cells[self.cells["person"].isin(persons)]
+        return (
+            cells.groupby("person", as_index=False, observed=True)[list(metrics)].sum()
+            .rename(columns={"person": PERSON_COL})
+        )
+
+    def by_group(self, groups=None, metrics=DEFAULT_METRICS, exclude=EXCLUDED_GROUPS) -> pd.DataFrame:
+        cells = self.cells[~self.cells["group"].isin(exclude)]
+        if groups is not None:
+            cells = cells[cells["group"].isin(groups)]
+        return (
+            cells.groupby("group", as_index=False, observed=True)[list(metrics)].sum()
+            .rename(columns={"group": "Group"})
+        )
+
+def to_long(wide: pd.DataFrame, id_col: str, metrics=DEFAULT_METRICS) -> pd.DataFrame:
+    return wide.melt(id_vars=id_col, value_vars=list(metrics), var_name='Type', value_name='Nombre')
@@ -0,0 +1,129 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .coords import EXPORT_COLUMNS
+from .ingest import arrow_safe
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_EXPORT_DIR = os.path.join(".cache", "exports")  # 필터 상태별 내보내기 파일
+EXPORT_CHUNK_ROWS = 50_000   # 청크 단위로 기록 → 전체 문자열을 메모리에 만들지 않음
+MAX_CACHED_EXPORTS = 8       # 오래된 파일부터 삭제
+
+GEOCODE_STATUS_COLUMN = "statut géocodage"
+STATUS_GEOCODED, STATUS_MISSING, STATUS_NO_ADDRESS = "géocodé", "sans coordonnées", "sans adresse"
+
+# 형식 → (확장자, MIME)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "GeoJSON": ("geojson", "application/geo+json"),
+}
+
+
+def geocode_status(df: pd.DataFrame) -> pd.Series:
+    has_coords = df["latitude"].notna() & df["longitude"].notna()
+    status = np.where(has_coords, STATUS_GEOCODED, np.where(df["adresse"].notna(), STATUS_MISSING, STATUS_NO_ADDRESS))
+    return pd.Series(status, index=df.index, dtype="category")
+
+def export_frame(df: pd.DataFrame, columns=EXPORT_COLUMNS) -> pd.DataFrame:
+    # 좌표 없는 행도 포함, 상태 컬럼은 좌표 바로 뒤
+    out = df[[c for c in columns if c in df.columns]]
+    out.insert(out.columns.get_loc("longitude") + 1, GEOCODE_STATUS_COLUMN, geocode_status(df))
+    return out
+
+def export_key(dataset_key: str, coords_stamp, index: pd.Index, fmt: str) -> str:
+    # 필터 상태 = 데이터셋 + 좌표 파일 상태 + 선택된 행
+    # (메모리의 저장소 버전은 재시작 시 0 으로 돌아가므로 디스크 캐시 키로 쓰지 않음 — 야간 rebuild_coords 후에도 새 키)
+    h = hashlib.sha1(f"{dataset_key}:{coords_stamp}:{fmt}".encode("utf-8"))
+    h.update(np.ascontiguousarray(index.to_numpy(dtype=np.int64)).tobytes())
+    return h.hexdigest()[:20]
+
+
+# =========================
+# 형식별 기록 (청크 단위)
+# =========================
+def _chunks(df: pd.DataFrame, rows: int = EXPORT_CHUNK_ROWS):
+    for i in range(0, len(df), rows):
+        yield df.iloc[i:i + rows]
+
+def write_csv(df: pd.DataFrame, path: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        df.iloc[:0].to_csv(f, index=False)
+        for chunk in _chunks(df):
+            chunk.to_csv(f, index=False, header=False)
+
+def write_parquet(df: pd.DataFrame, path: str):
+    arrow_safe(df).to_parquet(path, engine="pyarrow", index=False, row_group_size=EXPORT_CHUNK_ROWS)
+
+def write_geojson(df: pd.DataFrame, path: str):
+    # 좌표 없는 행은 geometry null (RFC 7946 허용)
+    props = [c for c in df.columns if c not in ("latitude", "longitude")]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        first = True
+        for chunk in _chunks(df):
+            values = chunk[props].astype(object).where(chunk[props].notna(), None).to_numpy()
+            lon = chunk["longitude"].to_numpy(dtype=float)
+            lat = chunk["latitude"].to_numpy(dtype=float)
+            lines = []
+            for row, x, y in zip(values, lon, lat):
+                geometry = {"type": "Point", "coordinates": [x, y]} if np.isfinite(x) and np.isfinite(y) else None
+                lines.append(json.dumps(
+                    {"type": "Feature", "geometry": geometry, "properties": dict(zip(props, row))},
+                    ensure_ascii=False, default=str,
+                ))
+            if lines:
+                f.write(("" if first else ",\n") + ",\n".join(lines))
+                first = False
+        f.write("\n]}\n")
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "GeoJSON": write_geojson}
+
+
+# =========================
+# 내보내기 파일 (키별 디스크 캐시, 임시 파일 → os.replace)
+# =========================
+def build_export(df: pd.DataFrame, fmt: str, key: str, export_dir: str = DEFAULT_EXPORT_DIR) -> str:
+    ext, _ = EXPORT_FORMATS[fmt]
+    path = os.path.join(export_dir, f"{key}.{ext}")
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    os.makedirs(export_dir, exist_ok=True)
+    started = time.time()
+    # 세션(스레드)마다 고유한 임시 파일 — 같은 프로세스에서 동시에 내보내도 겹치지 않음
+    with tempfile.NamedTemporaryFile(dir=export_dir, prefix=f".{key}.", suffix=".tmp", delete=False) as f:
+        tmp = f.name
+    try:
+        WRITERS[fmt](export_frame(df), tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _prune(export_dir, started)
+    return path
+
+def _prune(export_dir: str, started: float, keep: int = MAX_CACHED_EXPORTS):
+    # 이번 내보내기 시작 이후 파일(다른 스레드가 막 만든/읽을 파일)은 건드리지 않음
+    files = []
+    for p in glob.glob(os.path.join(export_dir, "*")):
+        try:
+            if not p.endswith(".tmp"):
+                files.append((os.path.getmtime(p), p))
+        except OSError:  # 다른 스레드가 방금 삭제
+            pass
+    for mtime, p in sorted(files, reverse=True)[keep:]:
+        if mtime < started:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# 기본 필터 차원
+# =========================
+FILTER_DIMENSIONS = ["Gérant", "Gérant group", "Type", "Canton", "Lieu"]
+
+
+# =========================
+# 필터 엔진 (차원별 카테고리 → 정렬된 행 번호 구간, 선택 시 bool 마스크)
+# =========================
+class FilterEngine:
+    def __init__(self, df: pd.DataFrame, dimensions=FILTER_DIMENSIONS):
+        self.n = len(df)
+        self._options = {}   # dim -> 정렬된 라벨 목록
+        self._groups = {}   # dim -> (라벨 → 코드, 코드순 행 번호 int[n], 코드별 구간 경계 int[k+1])
+        for dim in dimensions:
+            if dim in df.columns:
+                self._build(dim, df[dim])
+
+    def _build(self, dim: str, col: pd.Series):
+        cat = col.astype(str).where(col.notna()).astype("category")
+        codes = cat.cat.codes.to_numpy()
+        labels = [str(c) for c in cat.cat.categories]
+        # 라벨마다 비트맵을 미리 만들면 O(n·k) (라벨 1000개 × 100만 행 ≈ 125 MB) → 정렬 한 번, 마스크는 선택 시에만
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))  # 결측(-1)은 bounds[0] 앞
+        self._options[dim] = sorted(labels)
+        self._groups[dim] = ({label: i for i, label in enumerate(labels)}, order, bounds)
+
+    def __contains__(self, dim):
+        return dim in self._groups
+
+    @property
+    def dimensions(self):
+        return list(self._groups)
+
+    def options(self, dim: str) -> list:
+        return self._options[dim]
+
+    def mask(self, selections: dict) -> np.ndarray:
+        # 차원 내부는 OR, 차원 간에는 AND. None/전체 선택은 건너뜀 (bool 배열을 바로 AND — 압축/해제 왕복 없음)
+        out = np.ones(self.n, dtype=bool)
+        for dim, selected in selections.items():
+            if selected is None or dim not in self._groups:
+                continue
+            index, order, bounds = self._groups[dim]
+            if len(selected) >= len(index) and set(selected) >= set(index):
+                continue
+            hit = np.zeros(self.n, dtype=bool)
+            for s in selected:
+                if s in index:
+                    i = index[s]
+                    hit[order[bounds[i]:bounds[i + 1]]] = True
+            out &= hit
+        return out
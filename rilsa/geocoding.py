@@ -0,0 +1,271 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from .address import address_key_series
+from .coords import PRECISION_COLUMN
+from .localgeo import PRECISION_ADDRESS, PRECISION_NPA, PRECISION_STREET, LocalGeocoder, coarser_than, precision_rank
+
+# =========================
+# 기본 설정
+# =========================
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+DEFAULT_GEOCODE_CACHE_PATH = "geocode_cache.sqlite"  # 디스크 캐시(SQLite)
+
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}  # 재시도 대상
+NEGATIVE_STATUSES = {"ZERO_RESULTS"}                   # 음성 캐시 대상(결과 없음)
+NEGATIVE_TTL = 30 * 24 * 3600                          # 음성 캐시 유효기간(초)
+CACHE_KEY_VERSION = 2                                  # 키 형식이 바뀌면 증가 → 기존 행 재키잉
+# Google location_type → 정밀도
+LOCATION_TYPE_PRECISION = {
+    "ROOFTOP": PRECISION_ADDRESS,
+    "RANGE_INTERPOLATED": PRECISION_ADDRESS,
+    "GEOMETRIC_CENTER": PRECISION_STREET,
+    "APPROXIMATE": PRECISION_NPA,
+}
+
+
+# =========================
+# SQLite 캐시 (정규 주소 키 → 좌표/상태)
+# =========================
+class GeocodeCache:
+    def __init__(self, path: str = DEFAULT_GEOCODE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS geocode (
+                key TEXT PRIMARY KEY,
+                address TEXT,
+                status TEXT NOT NULL,
+                lat REAL,
+                lon REAL,
+                updated_at REAL NOT NULL,
+                precision TEXT
+            )"""
+        )
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(geocode)")]
+        if "precision" not in columns:  # 이전 형식 캐시
+            self._conn.execute("ALTER TABLE geocode ADD COLUMN precision TEXT")
+        self._conn.commit()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < CACHE_KEY_VERSION:
+            self._rekey()
+
+    def _rekey(self):
+        # 원래 주소가 저장되어 있으므로 새 키 형식으로 다시 계산 (유료 재조회 방지)
+        rows = pd.read_sql_query("SELECT key, address, status, lat, lon, updated_at, precision FROM geocode", self._conn)
+        if len(rows):
+            rows["key"] = address_key_series(rows["address"])
+            rows = rows.sort_values("updated_at").drop_duplicates("key", keep="last")
+            self._conn.execute("DELETE FROM geocode")
+            self._conn.executemany(
+                "INSERT INTO geocode (key, address, status, lat, lon, updated_at, precision) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows.itertuples(index=False, name=None),
+            )
+        self._conn.execute(f"PRAGMA user_version = {CACHE_KEY_VERSION}")
+        self._conn.commit()
+
+    def get_many(self, keys, negative_ttl: float = NEGATIVE_TTL) -> dict:
+        keys = list(keys)
+        out = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite 파라미터 개수 제한
+                chunk = keys[i:i + 500]
+                q = (
+                    "SELECT key, status, lat, lon, updated_at, precision FROM geocode "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})"
+                )
+                for k, status, lat, lon, updated_at, precision in self._conn.execute(q, chunk):
+                    # 오래된 음성 캐시는 다시 조회
+                    if status in NEGATIVE_STATUSES and now - updated_at > negative_ttl:
+                        continue
+                    out[k] = (status, lat, lon, precision)
+        return out
+
+    def put_many(self, rows):
+        # rows: (key, address, status, lat, lon, precision)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocode (key, address, status, lat, lon, precision, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*r, now) for r in rows],
+            )
+            self._conn.commit()
+
+    def answered(self, keys) -> set:
+        # Google 이 이미 답한 키 (좌표 또는 유효한 음성 캐시)
+        return set(self.get_many(keys))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+
+def requery_mask(df: pd.DataFrame, cache: GeocodeCache, min_precision: str) -> pd.Series:
+    # 중심 좌표(도로/NPA)로만 알려진 행 중 아직 Google 에 보내지 않은 키만 다시 조회
+    # (이미 답을 받은 키는 다시 보내도 같은 중심 좌표가 캐시에서 돌아옴)
+    coarse = coarser_than(df[PRECISION_COLUMN], min_precision) & df["adresse"].notna()
+    if not coarse.any():
+        return coarse
+    keys = address_key_series(df.loc[coarse, "adresse"])
+    answered = cache.answered(keys.unique())
+    return coarse & ~keys.isin(answered).reindex(df.index, fill_value=False)
+
+
+# =========================
+# 요청 속도 제한 (스레드 공유)
+# =========================
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# =========================
+# 병렬 지오코더 (Google 캐시 → 로컬 색인 → Google)
+# =========================
+class Geocoder:
+    def __init__(
+        self,
+        key: str,
+        cache: GeocodeCache = None,
+        local: LocalGeocoder = None,
+        min_precision: str = None,
+        url: str = GOOGLE_GEOCODE_URL,
+        max_workers: int = 8,
+        rate: float = 40.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+    ):
+        self.key = key
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.local = local
+        # 로컬 결과가 이보다 대략적이면 Google 호출 (키가 있으면 기본은 주소 수준)
+        self.min_precision = min_precision or (PRECISION_ADDRESS if key else PRECISION_NPA)
+        self.url = url
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate)
+        self.api_calls = 0
+        self.last_run = {}
+        self._stats_lock = threading.Lock()
+
+        # 워커 수만큼 커넥션 풀 유지 (requests 는 지오코딩 시에만 로드)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, address: str):
+        import requests
+
+        params = {"address": address, "key": self.key, "region": "ch", "language": "fr"}
+        status = "ERROR"
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            self.limiter.wait()
+            with self._stats_lock:
+                self.api_calls += 1
+            try:
+                r = self.session.get(self.url, params=params, timeout=self.timeout)
+                if r.status_code == 429 or r.status_code >= 500:
+                    status = f"HTTP_{r.status_code}"
+                    continue
+                data = r.json()
+            except (requests.RequestException, ValueError):
+                status = "ERROR"
+                continue
+            status = data.get("status", "ERROR")
+            if status == "OK" and data.get("results"):
+                geometry = data["results"][0]["geometry"]
+                loc = geometry["location"]
+                return status, loc["lat"], loc["lng"], LOCATION_TYPE_PRECISION.get(geometry.get("location_type"))
+            if status not in RETRY_STATUSES:
+                break
+        return status, None, None, None
+
+    def geocode_many(self, addresses, progress=None, flush_every: int = 100) -> dict:
+        t0 = time.perf_counter()
+        calls0 = self.api_calls
+
+        # 정규 주소 키 기준 중복 제거 ("Av. Vinet 33" == "Avenue  Vinet 33" → "avenue vinet 33|1004")
+        # 도로 유형은 키에 남음: "Vinet 33" 은 별도 키 "vinet 33|1004" (로컬 색인의 별칭 조회로만 연결)
+        addresses = pd.Series([a for a in addresses if a], dtype=object)
+        keys = address_key_series(addresses)
+        by_key = {}
+        for k, a in zip(keys, addresses):
+            by_key.setdefault(k, a)
+
+        hits = self.cache.get_many(by_key)
+        results = {k: (lat, lon, precision) for k, (status, lat, lon, precision) in hits.items() if status == "OK"}
+
+        # 로컬 색인 (네트워크 없음): Google 캐시에 좌표가 없는 키만
+        local = {}
+        if self.local is not None:
+            local = self.local.resolve_keys([k for k in by_key if k not in results])
+            results.update(local)
+
+        # Google 은 로컬로 풀지 못했거나 min_precision 보다 대략적인 키만
+        limit = precision_rank(self.min_precision)
+        misses = []
+        if self.key:
+            misses = [k for k in by_key if k not in hits and precision_rank(results.get(k, (None,) * 3)[2]) > limit]
+
+        pending = []
+        if misses:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+                futures = {ex.submit(self.fetch, by_key[k]): k for k in misses}
+                for done, fut in enumerate(as_completed(futures), start=1):
+                    k = futures[fut]
+                    status, lat, lon, precision = fut.result()
+                    # 로컬 결과보다 정밀할 때만 교체
+                    if status == "OK" and precision_rank(precision) <= precision_rank(results.get(k, (None,) * 3)[2]):
+                        results[k] = (lat, lon, precision)
+                    # 성공/ZERO_RESULTS만 저장 (일시 오류·키 오류는 다음에 재시도)
+                    if status == "OK" or status in NEGATIVE_STATUSES:
+                        pending.append((k, by_key[k], status, lat, lon, precision))
+                    if len(pending) >= flush_every:
+                        self.cache.put_many(pending)
+                        pending = []
+                    if progress is not None:
+                        progress(done, len(misses))
+        if pending:
+            self.cache.put_many(pending)
+
+        precisions = pd.Series(
+            [(results[k][2] or "inconnue") if k in results else "aucune" for k in by_key], dtype=object
+        )
+        self.last_run = {
+            "inputs": addresses.nunique(),
+            "addresses": len(by_key),
+            "cache_hits": len(hits),
+            "local": len(local),
+            "api_calls": self.api_calls - calls0,
+            "seconds": time.perf_counter() - t0,
+            "precision": precisions.value_counts().to_dict(),
+        }
+        return {a: results.get(k, (None, None, None)) for k, a in zip(keys, addresses)}
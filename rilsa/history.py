@@ -0,0 +1,212 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from .emaildata import METRICS
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_HISTORY_PATH = "email_history.sqlite"
+DEFAULT_REPORT_PERIOD = 90  # 'Report Period' 컬럼이 없을 때
+
+# CSV 컬럼 → 테이블 컬럼
+_METRIC_FIELDS = {
+    "Send Count": "send",
+    "Receive Count": "receive",
+    "Read Count": "read",
+    "Meeting Created Count": "meeting_created",
+    "Meeting Interacted Count": "meeting_interacted",
+}
+FIELD_LABELS = {field: METRICS[col] for col, field in _METRIC_FIELDS.items()}
+TREND_KINDS = {"person": "Display Name", "group": "Group"}
+
+
+# =========================
+# 이력 저장소 (주 단위 파티션 × User Principal Name, 추이는 적재 시 미리 집계)
+# =========================
+class EmailHistory:
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS activity (
+                week TEXT NOT NULL,
+                upn TEXT NOT NULL,
+                refresh_date TEXT NOT NULL,
+                display_name TEXT,
+                report_period INTEGER,
+                {", ".join(f"{f} INTEGER" for f in _METRIC_FIELDS.values())},
+                PRIMARY KEY (week, upn)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ingested (
+                source_hash TEXT PRIMARY KEY,
+                refresh_dates TEXT,
+                rows INTEGER,
+                ingested_at REAL
+            )"""
+        )
+        # 사람/그룹별 주간 집계 (7일 평균 환산) — 추이 차트는 이 테이블만 읽음
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS weekly_agg (
+                week TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                name TEXT NOT NULL,
+                {", ".join(f"{f} REAL" for f in _METRIC_FIELDS.values())},
+                PRIMARY KEY (kind, name, week)
+            )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS attribution (upn TEXT PRIMARY KEY, grp TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        # 집계 테이블이 생기기 전에 적재된 이력
+        with self._lock:
+            stale = self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM activity) AND NOT EXISTS (SELECT 1 FROM weekly_agg)"
+            ).fetchone()[0]
+        if stale:
+            self._aggregate()
+
+    # ---------- 적재 ----------
+    def ingest(self, report, source_hash: str = None) -> dict:
+        # report: DataFrame 또는 DataFrame 청크 이터러블
+        with self._lock:
+            if source_hash and self._conn.execute(
+                "SELECT 1 FROM ingested WHERE source_hash = ?", (source_hash,)
+            ).fetchone():
+                return {"status": "déjà importé", "rows": 0}
+
+        chunks = [report] if isinstance(report, pd.DataFrame) else report
+        fields = ["week", "upn", "refresh_date", "display_name", "report_period", *_METRIC_FIELDS.values()]
+        updates = ", ".join(f"{f} = excluded.{f}" for f in fields[2:])
+        n_rows, refresh_dates, weeks = 0, set(), set()
+        for chunk in chunks:
+            rows = self._rows(chunk)
+            with self._lock:
+                # 같은 주에 여러 보고서가 겹치면 Refresh Date 가 가장 최근인 것만 유지
+                self._conn.executemany(
+                    f"""INSERT INTO activity ({", ".join(fields)})
+                        VALUES ({", ".join("?" * len(fields))})
+                        ON CONFLICT (week, upn) DO UPDATE SET {updates}
+                        WHERE excluded.refresh_date >= activity.refresh_date""",
+                    rows[fields].itertuples(index=False, name=None),
+                )
+                self._conn.commit()
+            n_rows += len(rows)
+            refresh_dates.update(rows["refresh_date"].unique())
+            weeks.update(rows["week"].unique())
+        if weeks:
+            self._aggregate(sorted(weeks))
+
+        if source_hash:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO ingested VALUES (?, ?, ?, ?)",
+                    (source_hash, ",".join(sorted(refresh_dates)), n_rows, time.time()),
+                )
+                self._conn.commit()
+        return {"status": "importé", "rows": n_rows}
+
+    @staticmethod
+    def _rows(report: pd.DataFrame) -> pd.DataFrame:
+        refresh = pd.to_datetime(report["Report Refresh Date"])
+        iso = refresh.dt.isocalendar()
+        rows = pd.DataFrame({
+            "week": iso["year"].astype(str) + "-W" + iso["week"].astype(str).str.zfill(2),
+            "upn": report["User Principal Name"].astype(str).str.strip().str.casefold(),
+            "refresh_date": refresh.dt.strftime("%Y-%m-%d"),
+            "display_name": report["Display Name"].astype(str),
+        })
+        rows["report_period"] = (
+            pd.to_numeric(report["Report Period"], errors="coerce").to_numpy()
+            if "Report Period" in report.columns else DEFAULT_REPORT_PERIOD
+        )
+        for col, field in _METRIC_FIELDS.items():
+            rows[field] = pd.to_numeric(report[col], errors="coerce").fillna(0).astype("int64") if col in report.columns else 0
+        rows["report_period"] = rows["report_period"].fillna(DEFAULT_REPORT_PERIOD).astype("int64")
+        # 한 파일 안의 중복 UPN 은 최신 Refresh Date 만
+        return rows.sort_values("refresh_date").drop_duplicates(["week", "upn"], keep="last")
+
+    # ---------- 집계 ----------
+    def _aggregate(self, weeks=None):
+        # 지정한 주(없으면 전체)만 다시 집계
+        where, params = "", []
+        if weeks is not None:
+            where, params = f"WHERE a.week IN ({','.join('?' * len(weeks))})", list(weeks)
+        sums = ", ".join(f"SUM(CAST(a.{f} AS REAL) * 7 / NULLIF(a.report_period, 0))" for f in _METRIC_FIELDS.values())
+        with self._lock:
+            self._conn.execute(f"DELETE FROM weekly_agg AS a {where}", params)
+            self._conn.execute(
+                f"INSERT INTO weekly_agg SELECT a.week, 'person', a.display_name, {sums} FROM activity a {where} GROUP BY a.week, a.display_name",
+                params,
+            )
+            self._conn.execute(
+                f"""INSERT INTO weekly_agg SELECT a.week, 'group', t.grp, {sums}
+                    FROM activity a JOIN attribution t ON t.upn = a.upn {where} GROUP BY a.week, t.grp""",
+                params,
+            )
+            self._conn.execute(
+                "INSERT INTO meta VALUES ('version', '1') ON CONFLICT (name) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            self._conn.commit()
+
+    def set_attribution(self, assignments: pd.DataFrame) -> bool:
+        # assignments: upn → Group — 바뀌었을 때만 그룹 집계를 다시 계산
+        pairs = assignments.dropna().drop_duplicates("upn").sort_values("upn")
+        digest = hashlib.sha1(pd.util.hash_pandas_object(pairs[["upn", "Group"]], index=False).to_numpy().tobytes()).hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'attribution'").fetchone()
+            if row is not None and row[0] == digest:
+                return False
+            self._conn.execute("DELETE FROM attribution")
+            self._conn.executemany(
+                "INSERT INTO attribution VALUES (?, ?)", pairs[["upn", "Group"]].astype(str).itertuples(index=False, name=None)
+            )
+            self._conn.execute(
+                "INSERT INTO meta VALUES ('attribution', ?) ON CONFLICT (name) DO UPDATE SET value = excluded.value", (digest,)
+            )
+            self._conn.commit()
+        self._aggregate()
+        return True
+
+    # ---------- 조회 ----------
+    def weeks(self) -> list:
+        with self._lock:
+            return [w for (w,) in self._conn.execute("SELECT DISTINCT week FROM activity ORDER BY week")]
+
+    @property
+    def version(self) -> int:
+        # 집계가 바뀔 때마다 증가 → 캐시 키로 사용
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def people(self) -> pd.DataFrame:
+        # UPN 별 최근 표시 이름 (그룹 귀속 계산용)
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT upn, display_name AS \"Display Name\", MAX(refresh_date) AS refresh_date FROM activity GROUP BY upn",
+                self._conn,
+            ).drop(columns="refresh_date")
+
+    def trend(self, by: str = "person") -> pd.DataFrame:
+        labels = list(FIELD_LABELS.values())
+        with self._lock:
+            out = pd.read_sql_query(
+                f"SELECT week, name, {', '.join(_METRIC_FIELDS.values())} FROM weekly_agg WHERE kind = ? ORDER BY name, week",
+                self._conn, params=(by,),
+            )
+        out = out.rename(columns={"name": TREND_KINDS[by], **FIELD_LABELS})
+        key = TREND_KINDS[by]
+        # 주간 변화율 (week-over-week)
+        for label in labels:
+            prev = out.groupby(key)[label].shift()
+            out[f"{label} Δ%"] = (out[label] - prev) / prev.where(prev != 0) * 100
+        return out
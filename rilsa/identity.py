@@ -0,0 +1,259 @@
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_IDENTITY_PATH = "identity_map.sqlite"  # 퍼지 매칭 결과 영구 저장
+MIN_SCORE = 0.7                                # 퍼지 제안 최소 점수 (Dice, 3-gram) — 자동 적용 안 함, 검토 후 확인
+SURNAME_MIN_SCORE = 0.6                        # 성 토큰 유사도 하한 (Dice, 3-gram) — 성 오타("DUPOND"/"DUPONT")는 제안
+MAX_CANDIDATES = 20                            # 블로킹 후 점수를 계산할 후보 수
+UPN_COLUMNS = ["User Principal Name", "UPN", "E-mail", "Email"]
+APPLIED_METHODS = {"tokens", "confirmed"}      # 매핑 테이블에서 그대로 적용하는 방법 (퍼지는 검토 후 confirmed)
+PENDING, UNMATCHED = "à vérifier", "non apparié"
+
+
+# =========================
+# 이름 정규화
+# =========================
+def fold_name(name) -> str:
+    # 악센트 제거 + casefold + 영숫자 외 문자는 공백
+    s = unicodedata.normalize("NFKD", str(name))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).casefold()
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in s).split())
+
+def token_key(name) -> str:
+    # "AOURIK Sara" 와 "Sara Aourik" 가 같은 키가 되도록 토큰 정렬
+    return " ".join(sorted(fold_name(name).split()))
+
+def surname_tokens(name) -> frozenset:
+    # "MARTIN Anne" → {"martin"}: 대문자로 쓴 토큰이 성 (Group.xlsx 관례)
+    return frozenset(fold_name(w) for w in str(name).split() if len(w) > 1 and w.isupper())
+
+def trigrams(key: str) -> set:
+    s = f" {key} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+def dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if (a or b) else 0.0
+
+def _norm_key(series: pd.Series) -> pd.Series:
+    return series.astype(str).str.strip().str.casefold()
+
+
+# =========================
+# 매핑 테이블 (SQLite)
+# =========================
+class IdentityMap:
+    def __init__(self, path: str = DEFAULT_IDENTITY_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS identity_map (
+                source_key TEXT PRIMARY KEY,
+                group_key TEXT NOT NULL,
+                method TEXT NOT NULL,
+                score REAL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        out = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                q = f"SELECT source_key, group_key, method, score FROM identity_map WHERE source_key IN ({','.join('?' * len(chunk))})"
+                for k, g, method, score in self._conn.execute(q, chunk):
+                    out[k] = (g, method, score)
+        return out
+
+    def confirmed(self) -> int:
+        # 검토로 확인된 매칭 수 (바뀌면 귀속 캐시 무효화)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM identity_map WHERE method = 'confirmed'").fetchone()[0]
+
+    def put_many(self, rows):
+        # rows: (source_key, group_key, method, score)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO identity_map VALUES (?, ?, ?, ?, ?)",
+                [(*r, now) for r in rows],
+            )
+            self._conn.commit()
+
+
+# =========================
+# 신원 매칭 (UPN → 정확 일치 → 토큰 정렬 → 3-gram 퍼지)
+# =========================
+class IdentityResolver:
+    def __init__(self, group_data: pd.DataFrame, mapping: IdentityMap = None, min_score: float = MIN_SCORE):
+        self.mapping = mapping
+        self.min_score = min_score
+        names = group_data["Display Name"].astype(str)
+        keys = _norm_key(names)
+
+        # 먼저 나온 행 우선 (drop_duplicates keep="first" 와 동일)
+        first = ~keys.duplicated()
+        self.names = dict(zip(keys[first].tolist(), names[first].tolist()))  # 그룹 키 → 표시 이름 (키 집합 겸용)
+        self.by_upn = {}
+        upn_col = next((c for c in UPN_COLUMNS if c in group_data.columns), None)
+        if upn_col:
+            upns = group_data[upn_col]
+            upns = upns[upns.notna()].astype(str).str.strip().str.casefold()
+            first = ~upns.duplicated()
+            self.by_upn = dict(zip(upns[first].tolist(), keys[upns.index[first]].tolist()))
+
+        # 토큰 / 3-gram 색인은 UPN·정확 일치로 풀리지 않는 이름이 있을 때만 만듦
+        self._by_token = None
+        self._surnames = None
+        self._grams = None
+        self._index = None
+
+        self.stats = Counter()
+        self._resolved = {}   # source_key → group_key (청크 간 공유 — 같은 사람은 한 번만 매칭)
+        self._unmatched = {}  # 처리했지만 풀지 못한 source_key
+
+    @property
+    def by_token(self) -> dict:
+        if self._by_token is None:
+            self._by_token, self._surnames = {}, {}
+            for k, n in self.names.items():
+                tok = token_key(n)
+                if tok not in self._by_token:
+                    self._by_token[tok] = k
+                    self._surnames[tok] = surname_tokens(n)
+        return self._by_token
+
+    def _build_index(self):
+        # 3-gram 역색인 (블로킹)
+        self._grams = {}
+        self._index = defaultdict(list)
+        for tok in self.by_token:
+            g = trigrams(tok)
+            self._grams[tok] = g
+            for gram in g:
+                self._index[gram].append(tok)
+
+    def _surname_score(self, name, tok: str, cand: str) -> float:
+        # 성 토큰마다 상대 성 토큰과의 최고 Dice 중 최솟값 (한쪽만 성을 알면 상대 이름의 모든 토큰과 비교)
+        mine, theirs = surname_tokens(name), self._surnames[cand]
+        if not mine and not theirs:
+            return 1.0
+        if mine and theirs:
+            ref, other = mine, theirs
+        elif mine:
+            ref, other = mine, set(cand.split())
+        else:
+            ref, other = theirs, set(tok.split())
+        return min(max(dice(trigrams(a), trigrams(b)) for b in other) for a in ref)
+
+    def _fuzzy(self, name, tok: str):
+        if self._index is None:
+            self._build_index()
+        grams = trigrams(tok)
+        # 블로킹: 가장 드문 3-gram 절반만으로 후보 수집 (흔한 3-gram 은 후보를 폭증시킴)
+        ranked = sorted(grams, key=lambda g: len(self._index.get(g, ())))
+        block = ranked[:max(3, len(ranked) // 2)]
+        hits = Counter(t for gram in block for t in self._index.get(gram, ()))
+        best, best_score = None, 0.0
+        for cand, _ in hits.most_common(MAX_CANDIDATES):
+            # 성이 비슷한 후보만 점수 계산 ("BERNARD Anne" ↛ "MARTIN Anne"), 성 오타는 통과
+            if self._surname_score(name, tok, cand) < SURNAME_MIN_SCORE:
+                continue
+            score = dice(grams, self._grams[cand])
+            if score > best_score:
+                best, best_score = cand, score
+        if best is not None and best_score >= self.min_score:
+            return self.by_token[best], best_score
+        return None, best_score
+
+    def keys_for(self, data: pd.DataFrame) -> pd.Series:
+        # 고유 (표시 이름, UPN) 조합만 처리 — 청크의 행마다 문자열 정규화/매칭을 하지 않음
+        cols = [c for c in ("Display Name", "User Principal Name") if c in data.columns]
+        codes = data.groupby(cols, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+        pairs = data[cols].drop_duplicates()
+        names = pairs["Display Name"].astype(str)
+        name_keys = _norm_key(names)
+        if "User Principal Name" in pairs.columns:
+            upns = pairs["User Principal Name"].astype(str).str.strip().str.casefold()
+            source_keys = upns.where(pairs["User Principal Name"].notna(), "name:" + name_keys)
+        else:
+            upns = pd.Series(None, index=pairs.index, dtype=object)
+            source_keys = "name:" + name_keys
+
+        # 이전 청크에서 이미 매칭한 사람은 건너뜀 (Arrow 문자열 반복은 느리므로 리스트로)
+        sources = source_keys.tolist()
+        todo = {}
+        for src, name, nk, upn in zip(sources, names.tolist(), name_keys.tolist(), upns.tolist()):
+            if src not in self._resolved and src not in self._unmatched and src not in todo:
+                todo[src] = (name, nk, upn)
+        resolved = self._resolved
+
+        # 1) UPN  2) 정확 일치 — 사전 조회
+        for src, (_, nk, upn) in todo.items():
+            if upn in self.by_upn:
+                resolved[src] = self.by_upn[upn]
+                self.stats["upn"] += 1
+            elif nk in self.names:
+                resolved[src] = nk
+                self.stats["exact"] += 1
+
+        # 3) 매핑 테이블(이전 퍼지 결과)
+        rest = [src for src in todo if src not in resolved]
+        cached = self.mapping.get_many(rest) if (self.mapping is not None and rest) else {}
+        for src, (g, method, _) in cached.items():
+            # 이전 버전이 자동 적용한 퍼지 결과는 다시 검토 대상
+            if g in self.names and method in APPLIED_METHODS:
+                resolved[src] = g
+                self.stats["cache"] += 1
+
+        # 4) 토큰 정렬 / 5) 3-gram 퍼지
+        new_rows = []
+        for src in rest:
+            if src in resolved:
+                continue
+            name = todo[src][0]
+            tok = token_key(name)
+            upn = None if src.startswith("name:") else src
+            if tok not in self.by_token:
+                # 퍼지 결과는 제안만 — 확인(confirm)되기 전에는 이메일을 귀속하지 않음
+                g, score = self._fuzzy(name, tok)
+                self.stats["pending" if g is not None else "unmatched"] += 1
+                self._unmatched[src] = (name, upn, g, score)
+                continue
+            g, method, score = self.by_token[tok], "tokens", 1.0
+            resolved[src] = g
+            self.stats[method] += 1
+            new_rows.append((src, g, method, score))
+        if new_rows and self.mapping is not None:
+            self.mapping.put_many(new_rows)
+
+        keys = pd.Series([resolved.get(src) for src in sources], dtype=object).to_numpy()
+        return pd.Series(keys[codes], index=data.index, dtype=object)
+
+    def unmatched_report(self) -> pd.DataFrame:
+        rows = [
+            (n, u, PENDING if g is not None else UNMATCHED, self.names.get(g), s, src, g)
+            for src, (n, u, g, s) in self._unmatched.items()
+        ]
+        return pd.DataFrame(
+            rows,
+            columns=["Display Name", "User Principal Name", "Statut", "Proposition", "Meilleur score", "source_key", "group_key"],
+        ).sort_values(["Statut", "Display Name"], ascending=[False, True], ignore_index=True)
+
+    def confirm(self, report: pd.DataFrame):
+        # 검토한 제안(unmatched_report 행)을 매핑 테이블에 기록 → 다음 실행부터 적용
+        rows = report[report["group_key"].notna()]
+        if self.mapping is not None and len(rows):
+            self.mapping.put_many(
+                (src, g, "confirmed", score) for src, g, score in zip(rows["source_key"], rows["group_key"], rows["Meilleur score"])
+            )
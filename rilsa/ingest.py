@@ -0,0 +1,283 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_SNAPSHOT_DIR = os.path.join(".cache", "snapshots")  # Parquet 스냅샷 위치
+DEFAULT_SKIPROWS = 4                  # 헤더를 찾지 못했을 때
+AUTO_SKIPROWS = "auto"                # 헤더 행 자동 감지
+HEADER_HINTS = ["Référence", "Désignation", "NPA", "Lieu", "Gérant"]
+HEADER_SCAN_ROWS = 30
+SOURCE_COLUMN = "Source"
+PARALLEL_MIN_BYTES = 2_000_000        # 이보다 작으면 프로세스 시작 비용이 더 큼
+
+
+# =========================
+# 원본 바이트 / 해시
+# =========================
+def read_source_bytes(source) -> bytes:
+    # 경로(str), 바이트 또는 업로드 파일(UploadedFile/BytesIO)
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    return source.getvalue()
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+# =========================
+# Arrow 호환 변환 (혼합 타입 object 컬럼 → 문자열)
+# =========================
+def arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for c in df.columns:
+        if df[c].dtype == object:
+            kind = pd.api.types.infer_dtype(df[c], skipna=True)
+            if kind not in ("string", "empty", "floating", "integer", "boolean"):
+                df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+    return df
+
+
+# =========================
+# 헤더 행 감지 (알려진 컬럼명이 2개 이상 있는 첫 행)
+# =========================
+def detect_header_row(raw: pd.DataFrame, hints=HEADER_HINTS) -> int:
+    hints = {h.casefold() for h in hints}
+    for i, row in enumerate(raw.head(HEADER_SCAN_ROWS).itertuples(index=False)):
+        cells = {str(v).strip().casefold() for v in row if pd.notna(v)}
+        if len(cells & hints) >= 2:
+            return i
+    return DEFAULT_SKIPROWS
+
+def _read_sheet(xls, name, skiprows):
+    if skiprows == AUTO_SKIPROWS:
+        # 앞부분만 읽어 헤더 행을 찾은 뒤 pandas 기본 파싱 그대로 사용
+        head = pd.read_excel(xls, sheet_name=name, engine="openpyxl", header=None, nrows=HEADER_SCAN_ROWS)
+        skiprows = detect_header_row(head)
+    return pd.read_excel(xls, sheet_name=name, engine="openpyxl", skiprows=skiprows), skiprows
+
+
+# =========================
+# 스냅샷 경로
+# =========================
+def _meta_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}.json")
+
+def _sheet_path(cache_dir, digest, sheet_idx, skiprows):
+    return os.path.join(cache_dir, f"{digest}__{sheet_idx}__skip{skiprows}.parquet")
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, "index.json")
+
+def _atomic_write_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# =========================
+# XLSX → Parquet 변환 (해시당 1회, 모든 시트)
+# =========================
+def build_snapshot(data: bytes, digest: str, skiprows=AUTO_SKIPROWS, cache_dir: str = DEFAULT_SNAPSHOT_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    xls = pd.ExcelFile(io.BytesIO(data), engine="openpyxl")
+    header_rows = []
+    for i, name in enumerate(xls.sheet_names):
+        df, header = _read_sheet(xls, name, skiprows)
+        header_rows.append(header)
+        path = _sheet_path(cache_dir, digest, i, skiprows)
+        tmp = f"{path}.tmp"
+        arrow_safe(df).to_parquet(tmp, engine="pyarrow", index=False)
+        os.replace(tmp, path)
+    # 메타 파일은 마지막에 기록 → 존재하면 스냅샷이 완전함
+    meta = {}
+    if os.path.exists(_meta_path(cache_dir, digest)):
+        with open(_meta_path(cache_dir, digest), encoding="utf-8") as f:
+            meta = json.load(f)
+    known = [str(k) for k in meta.get("skiprows", [])]
+    _atomic_write_json(
+        _meta_path(cache_dir, digest),
+        {
+            "sheet_names": xls.sheet_names,
+            "skiprows": sorted(set(known) | {str(skiprows)}),
+            "header_rows": {**meta.get("header_rows", {}), str(skiprows): header_rows},
+        },
+    )
+    return xls.sheet_names
+
+def snapshot_sheet_names(digest: str, skiprows=AUTO_SKIPROWS, cache_dir: str = DEFAULT_SNAPSHOT_DIR):
+    path = _meta_path(cache_dir, digest)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if str(skiprows) not in [str(k) for k in meta.get("skiprows", [])]:
+        return None
+    return meta["sheet_names"]
+
+
+# =========================
+# 스냅샷 목록 (원본 파일명 / 날짜 → 해시, 비교 모드용)
+# =========================
+def snapshot_date(name: str):
+    # "...-20250716.xlsx" → "2025-07-16"
+    m = re.search(r"(20\d{2})(\d{2})(\d{2})", os.path.basename(str(name)))
+    return f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else None
+
+def register_snapshot(digest: str, name: str, cache_dir: str = DEFAULT_SNAPSHOT_DIR):
+    path = _index_path(cache_dir)
+    index = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    entry = index.get(digest, {})
+    if entry.get("name") == os.path.basename(str(name)):
+        return  # 재실행마다 쓰지 않음
+    index[digest] = {
+        "name": os.path.basename(str(name)),
+        "date": snapshot_date(name),
+        "registered_at": entry.get("registered_at", time.time()),
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    _atomic_write_json(path, index)
+
+def list_snapshots(cache_dir: str = DEFAULT_SNAPSHOT_DIR) -> list:
+    # 최신순 (파일명 날짜, 없으면 등록 시각)
+    path = _index_path(cache_dir)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        index = json.load(f)
+    out = [
+        {"hash": digest, **entry}
+        for digest, entry in index.items()
+        if os.path.exists(_meta_path(cache_dir, digest))
+    ]
+    return sorted(out, key=lambda e: (e["date"] or "", e["registered_at"]), reverse=True)
+
+def read_snapshot(digest: str, sheet=None, skiprows=AUTO_SKIPROWS, cache_dir: str = DEFAULT_SNAPSHOT_DIR):
+    # 원본 없이 캐시된 스냅샷만으로 읽기 (이전 달 통합 문서 등)
+    names = snapshot_sheet_names(digest, skiprows, cache_dir)
+    if names is None:
+        raise FileNotFoundError(f"snapshot {digest} ({skiprows}) introuvable dans {cache_dir}")
+    sheet = sheet if sheet in names else names[0]
+    path = _sheet_path(cache_dir, digest, names.index(sheet), skiprows)
+    return pd.read_parquet(path, engine="pyarrow", memory_map=True), sheet
+
+
+# =========================
+# 로드 (해시 → 스냅샷 memory-map, 없으면 변환)
+# =========================
+def load_workbook_snapshot(source, sheet=None, skiprows=AUTO_SKIPROWS, cache_dir: str = DEFAULT_SNAPSHOT_DIR):
+    timings = {}
+    t = time.perf_counter()
+    data = read_source_bytes(source)
+    digest = content_hash(data)
+    timings["hash"] = time.perf_counter() - t
+
+    sheet_names = snapshot_sheet_names(digest, skiprows, cache_dir)
+    cache_hit = sheet_names is not None
+    if not cache_hit:
+        t = time.perf_counter()
+        sheet_names = build_snapshot(data, digest, skiprows, cache_dir)
+        timings["parse_xlsx"] = time.perf_counter() - t
+
+    sheet = sheet if sheet in sheet_names else sheet_names[0]
+    t = time.perf_counter()
+    df = pd.read_parquet(
+        _sheet_path(cache_dir, digest, sheet_names.index(sheet), skiprows),
+        engine="pyarrow",
+        memory_map=True,
+    )
+    timings["read_snapshot"] = time.perf_counter() - t
+
+    info = {
+        "hash": digest,
+        "sheet": sheet,
+        "sheet_names": sheet_names,
+        "cache_hit": cache_hit,
+        "timings": timings,
+    }
+    return df, info
+
+
+# =========================
+# 여러 통합 문서 / 시트 (미변환 문서는 프로세스 풀에서 병렬 변환)
+# =========================
+def _parse_parallel(pending: dict, skiprows, cache_dir: str, max_workers: int = None):
+    # pending: {digest: bytes}
+    if len(pending) == 1 or sum(len(d) for d in pending.values()) < PARALLEL_MIN_BYTES:
+        for digest, data in pending.items():
+            build_snapshot(data, digest, skiprows, cache_dir)
+        return
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    ctx = multiprocessing.get_context("spawn")  # Streamlit 스레드와 fork 충돌 방지
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        futures = [ex.submit(build_snapshot, data, digest, skiprows, cache_dir) for digest, data in pending.items()]
+        for fut in futures:
+            fut.result()
+
+def load_portfolio(sources, sheets=None, skiprows=AUTO_SKIPROWS, cache_dir: str = DEFAULT_SNAPSHOT_DIR, max_workers: int = None):
+    # sources: [(이름, 경로 | 바이트 | 업로드 파일)]
+    # sheets: None → 문서별 첫 시트, "all" → 전체, 또는 [(이름, 시트)]
+    timings = {}
+    t = time.perf_counter()
+    items = []
+    for name, source in sources:
+        data = read_source_bytes(source)
+        items.append((name, content_hash(data), data))
+    timings["hash"] = time.perf_counter() - t
+
+    pending = {d: data for _, d, data in items if snapshot_sheet_names(d, skiprows, cache_dir) is None}
+    if pending:
+        t = time.perf_counter()
+        _parse_parallel(pending, skiprows, cache_dir, max_workers)
+        timings["parse_xlsx"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    frames, parts, sheet_names = [], [], {}
+    for name, digest, _ in items:
+        register_snapshot(digest, name, cache_dir)
+        names = snapshot_sheet_names(digest, skiprows, cache_dir)
+        sheet_names[name] = names
+        if sheets is None:
+            wanted = names[:1]
+        elif sheets == "all":
+            wanted = names
+        else:
+            wanted = [s for n, s in sheets if n == name and s in names]
+        for sheet in wanted:
+            df = pd.read_parquet(
+                _sheet_path(cache_dir, digest, names.index(sheet), skiprows), engine="pyarrow", memory_map=True
+            )
+            label = f"{name} / {sheet}"
+            frames.append(df.assign(**{SOURCE_COLUMN: label}))
+            parts.append({"source": label, "hash": digest, "sheet": sheet, "rows": len(df), "cache_hit": digest not in pending})
+    timings["read_snapshot"] = time.perf_counter() - t
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[SOURCE_COLUMN])
+    df[SOURCE_COLUMN] = pd.Categorical(df[SOURCE_COLUMN], categories=[p["source"] for p in parts])
+    info = {
+        "hash": content_hash("|".join(f"{p['hash']}:{p['sheet']}" for p in parts).encode()),
+        "sheet": " + ".join(p["sheet"] for p in parts),
+        "sheet_names": sheet_names,
+        "parts": parts,
+        "bytes": sum(len(data) for _, _, data in items),
+        "cache_hit": not pending,
+        "timings": timings,
+    }
+    return df, info
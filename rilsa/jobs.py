@@ -0,0 +1,147 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .address import address_key_series
+from .coords import PRECISION_COLUMN, CoordinateStore
+from .geocoding import Geocoder
+from .localgeo import precision_rank
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_JOB_BATCH = 50   # 취소 반응 시간 = 한 배치
+PENDING, RUNNING, CANCELLED, DONE, FAILED = "en attente", "en cours", "annulé", "terminé", "échec"
+
+
+def rows_from_results(rows: pd.DataFrame, positions: dict, results: dict) -> pd.DataFrame:
+    # {주소: (lat, lon, 정밀도)} → 같은 정규 키의 모든 행에 좌표 채움 (positions: 키 → 행 위치, 작업 시작 시 한 번 계산)
+    by_key = dict(zip(address_key_series(pd.Series(list(results), dtype=object)), results.values()))
+    hits = [(p, v) for k, v in by_key.items() for p in positions.get(k, ())]
+    if not hits:
+        return rows.iloc[:0]
+    pos, found = zip(*hits)
+    out = rows.iloc[list(pos)].copy()
+    lat = np.array([v[0] for v in found], dtype=float)
+    lon = np.array([v[1] for v in found], dtype=float)
+    precision = pd.Series([v[2] for v in found], index=out.index, dtype=object)
+    # 저장된 좌표보다 정밀하거나 좌표가 바뀐 결과만 → 같은 중심 좌표를 CSV 에 다시 추가하지 않음
+    keep = np.ones(len(out), dtype=bool)
+    if "latitude" in out.columns and "longitude" in out.columns:
+        old_lat = out["latitude"].to_numpy(dtype=float)
+        old_lon = out["longitude"].to_numpy(dtype=float)
+        old_precision = out[PRECISION_COLUMN] if PRECISION_COLUMN in out.columns else pd.Series(None, index=out.index, dtype=object)
+        finer = precision.map(precision_rank).to_numpy() < old_precision.map(precision_rank).to_numpy()
+        moved = ~(np.isclose(lat, old_lat, rtol=0, atol=1e-9) & np.isclose(lon, old_lon, rtol=0, atol=1e-9))
+        keep = np.isnan(old_lat) | np.isnan(old_lon) | finer | moved
+    out["latitude"] = lat
+    out["longitude"] = lon
+    out[PRECISION_COLUMN] = precision
+    return out[keep]
+
+
+# =========================
+# 백그라운드 지오코딩 (배치마다 좌표 저장소에 기록 → 지도는 다음 재실행에서 반영)
+# =========================
+class GeocodeJob:
+    def __init__(self, geocoder: Geocoder, store: CoordinateStore, rows: pd.DataFrame, batch_size: int = DEFAULT_JOB_BATCH, limit: int = None):
+        self.geocoder = geocoder
+        self.store = store
+        self.rows = rows[rows["adresse"].notna()]
+        # 정규 키는 한 번만 계산 — 배치마다 전체 행에 정규식을 다시 돌리지 않음
+        keys = address_key_series(self.rows["adresse"])
+        self.positions = pd.Series(range(len(keys))).groupby(keys.to_numpy()).agg(list).to_dict()
+        # 정규 키 기준 중복 제거 → 변형 주소마다 조회하지 않음
+        self.addresses = self.rows["adresse"][~keys.duplicated()].tolist()[:limit]
+        self.batch_size = batch_size
+        self.state = PENDING
+        self.error = None
+        self.stats = {"done": 0, "resolved": 0, "saved": 0, "cache_hits": 0, "local": 0, "api_calls": 0, "batches": 0}
+        self.precision = {}
+        self.started_at = self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def total(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def running(self) -> bool:
+        return self.state in (PENDING, RUNNING)
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="geocode-job", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        # 진행 중인 배치가 끝나면 멈춤 (완료된 배치는 저장소/캐시에 남아 재개 가능)
+        self._cancel.set()
+
+    def _run(self):
+        self.state = RUNNING
+        try:
+            for i in range(0, self.total, self.batch_size):
+                if self._cancel.is_set():
+                    self.state = CANCELLED
+                    break
+                batch = self.addresses[i:i + self.batch_size]
+                results = self.geocoder.geocode_many(batch, flush_every=self.batch_size)
+                resolved = {a: r for a, r in results.items() if r[0] is not None}
+                saved = self.store.add(rows_from_results(self.rows, self.positions, resolved)) if resolved else 0
+                run = self.geocoder.last_run
+                with self._lock:
+                    self.stats["done"] += len(batch)
+                    self.stats["resolved"] += len(resolved)
+                    self.stats["saved"] += saved
+                    self.stats["batches"] += 1
+                    for k in ("cache_hits", "local", "api_calls"):
+                        self.stats[k] += run.get(k, 0)
+                    for k, v in run.get("precision", {}).items():
+                        self.precision[k] = self.precision.get(k, 0) + v
+            else:
+                self.state = DONE
+        except Exception as e:  # 스레드 밖으로 전파되지 않으므로 상태로 보고
+            self.error = repr(e)
+            self.state = FAILED
+        finally:
+            self.finished_at = time.time()
+
+    def progress(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            precision = dict(self.precision)
+        elapsed = (self.finished_at or time.time()) - (self.started_at or time.time())
+        rate = stats["done"] / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - stats["done"]
+        return {
+            **stats,
+            "state": self.state,
+            "total": self.total,
+            "elapsed": elapsed,
+            "rate": rate,
+            "eta": remaining / rate if rate and self.running else None,
+            "precision": precision,
+            "error": self.error,
+        }
+
+
+# =========================
+# 작업 실행기 (프로세스당 하나, 동시에 한 작업만)
+# =========================
+class JobRunner:
+    def __init__(self):
+        self.job = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: GeocodeJob) -> bool:
+        with self._lock:
+            if self.job is not None and self.job.running:
+                return False
+            self.job = job
+            job.start()
+            return True
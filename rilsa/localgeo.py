@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .address import STREET_TYPES, component_keys, fold
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_LOCAL_INDEX_PATH = "address_index.sqlite"  # 주소 등록부에서 만든 로컬 색인
+
+# 정밀도 (정밀 → 대략), 지오코딩 결과마다 기록
+PRECISION_ADDRESS, PRECISION_STREET, PRECISION_NPA = "adresse", "rue", "npa"
+PRECISION_LEVELS = [PRECISION_ADDRESS, PRECISION_STREET, PRECISION_NPA]
+
+# 등록부 형식 → 컬럼 매핑 (좌표는 lat/lon 또는 LV95/LV03 e/n)
+REGISTER_FORMATS = {
+    # 연방 건물·주거 등록부(GWR) 입구 테이블
+    "gwr": {
+        "street": "STRNAME", "number": "DEINR", "npa": "DPLZ4", "lieu": "DPLZNAME",
+        "e": "DKODE", "n": "DKODN", "sep": "\t",
+    },
+    "generic": {
+        "street": "street", "number": "number", "npa": "npa", "lieu": "lieu",
+        "lat": "lat", "lon": "lon", "sep": ",",
+    },
+}
+IMPORT_CHUNK_ROWS = 200_000
+INDEX_KEY_VERSION = 2  # 주소 키 형식이 바뀌면 증가 → 기존 색인은 다시 가져와야 함
+
+
+def precision_rank(precision) -> int:
+    # 작을수록 정밀, 없으면 가장 큼
+    return PRECISION_LEVELS.index(precision) if precision in PRECISION_LEVELS else len(PRECISION_LEVELS)
+
+def coarser_than(precision: pd.Series, min_precision: str) -> pd.Series:
+    # 도로/NPA 중심 좌표처럼 기준보다 대략적인 결과 → 더 정밀한 조회 대상 (정밀도 미상은 제외)
+    return precision.isin(PRECISION_LEVELS[precision_rank(min_precision) + 1:])
+
+
+# =========================
+# 스위스 좌표 (LV95 / LV03 → WGS84, swisstopo 근사식 ±1 m)
+# =========================
+def swiss_to_wgs84(e, n):
+    e = np.asarray(e, dtype=float)
+    n = np.asarray(n, dtype=float)
+    e = np.where(e < 2_000_000, e + 2_000_000, e)  # LV03 → LV95
+    n = np.where(n < 1_000_000, n + 1_000_000, n)
+    y = (e - 2_600_000) / 1e6
+    x = (n - 1_200_000) / 1e6
+    lon = 2.6779094 + 4.728982 * y + 0.791484 * y * x + 0.1306 * y * x**2 - 0.0436 * y**3
+    lat = 16.9023892 + 3.238272 * x - 0.270978 * y**2 - 0.002528 * x**2 - 0.0447 * y**2 * x - 0.0140 * x**3
+    return lat * 100 / 36, lon * 100 / 36
+
+
+# =========================
+# 키 파생 ("vinet 33|1004" → 도로 "vinet|1004", NPA "1004")
+# =========================
+def street_keys(keys: pd.Series) -> pd.Series:
+    return keys.str.replace(r"\s*\d+(?:bis|ter|[a-z])?\|", "|", regex=True)
+
+# 도로 유형 없는 별칭 ("avenue vinet 33|1004" → "vinet 33|1004"): 포트폴리오는 유형을 자주 생략함
+_TYPE_RE = r"^(?:" + "|".join(fold(pd.Series(sorted(set(STREET_TYPES.values()))))) + r")\s+"
+
+def untyped_keys(keys: pd.Series) -> pd.Series:
+    return keys.str.replace(_TYPE_RE, "", regex=True)
+
+def npa_of_keys(keys: pd.Series) -> pd.Series:
+    return keys.str.extract(r"\|(\d{4})$", expand=False)
+
+
+# =========================
+# 로컬 지오코더 (SQLite 색인: 주소 → 도로 중심 → NPA 중심)
+# =========================
+class LocalGeocoder:
+    def __init__(self, path: str = DEFAULT_LOCAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS address (
+                key TEXT PRIMARY KEY, street_key TEXT, npa TEXT, lat REAL NOT NULL, lon REAL NOT NULL,
+                alias TEXT, street_alias TEXT
+            );
+            CREATE TABLE IF NOT EXISTS street (key TEXT PRIMARY KEY, lat REAL, lon REAL, n INTEGER, alias TEXT);
+            CREATE TABLE IF NOT EXISTS npa (npa TEXT PRIMARY KEY, lat REAL, lon REAL, n INTEGER);"""
+        )
+        for table, columns in (("address", ["alias", "street_alias"]), ("street", ["alias"])):
+            existing = [r[1] for r in self._conn.execute(f"PRAGMA table_info({table})")]
+            for c in columns:
+                if c not in existing:  # 이전 형식 색인
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {c} TEXT")
+        self._conn.commit()
+        # 이전 키 형식으로 만든 색인: 원본 주소가 없어 재키잉 불가 → 조회하지 않고 재가져오기 시 비움
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        self.stale = version < INDEX_KEY_VERSION and len(self) > 0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM address").fetchone()[0]
+
+    # ---------- 가져오기 ----------
+    def import_frame(self, df: pd.DataFrame, fmt: str = "generic") -> int:
+        cols = REGISTER_FORMATS[fmt]
+        number = df[cols["number"]].astype(str).str.strip().replace({"nan": "", "<NA>": ""})
+        designation = df[cols["street"]].astype(str).str.strip() + " " + number
+        npa = df[cols["npa"]].astype(str).str.strip().str[:4]
+        lieu = df[cols["lieu"]] if cols.get("lieu") in df.columns else pd.Series("", index=df.index)
+        if "lat" in cols:
+            lat = pd.to_numeric(df[cols["lat"]], errors="coerce").to_numpy(float)
+            lon = pd.to_numeric(df[cols["lon"]], errors="coerce").to_numpy(float)
+        else:
+            lat, lon = swiss_to_wgs84(
+                pd.to_numeric(df[cols["e"]], errors="coerce"), pd.to_numeric(df[cols["n"]], errors="coerce")
+            )
+        keys = component_keys(designation, npa, lieu)
+        aliases = untyped_keys(keys)
+        rows = pd.DataFrame({
+            "key": keys, "street_key": street_keys(keys), "npa": npa_of_keys(keys), "lat": lat, "lon": lon,
+            "alias": aliases, "street_alias": street_keys(aliases),
+        })
+        # 번호 없는 입구 / 좌표 없는 행은 주소 수준으로 쓰지 않음
+        rows = rows[number.ne("").to_numpy() & np.isfinite(lat) & np.isfinite(lon)]
+        rows = rows.drop_duplicates("key", keep="last")
+        with self._lock:
+            if self.stale:
+                self._conn.executescript("DELETE FROM address; DELETE FROM street; DELETE FROM npa;")
+                self.stale = False
+            self._conn.execute(f"PRAGMA user_version = {INDEX_KEY_VERSION}")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO address (key, street_key, npa, lat, lon, alias, street_alias) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows.itertuples(index=False, name=None),
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def import_csv(self, path: str, fmt: str = "generic", sep: str = None, encoding: str = "utf-8", progress=None) -> int:
+        cols = REGISTER_FORMATS[fmt]
+        wanted = [v for k, v in cols.items() if k != "sep"]
+        total = 0
+        reader = pd.read_csv(
+            path, sep=sep or cols["sep"], encoding=encoding, dtype=str,
+            usecols=lambda c: c in wanted, chunksize=IMPORT_CHUNK_ROWS,
+        )
+        for chunk in reader:
+            total += self.import_frame(chunk, fmt)
+            if progress is not None:
+                progress(total)
+        self.build_centroids()
+        return total
+
+    def build_centroids(self):
+        # 도로 / NPA 중심 = 해당 주소 좌표 평균 (가져오기 후 한 번)
+        with self._lock:
+            self._conn.executescript(
+                """CREATE INDEX IF NOT EXISTS address_street ON address (street_key);
+                CREATE INDEX IF NOT EXISTS address_npa ON address (npa);
+                CREATE INDEX IF NOT EXISTS address_alias ON address (alias);
+                DELETE FROM street;
+                INSERT INTO street (key, lat, lon, n, alias) SELECT street_key, AVG(lat), AVG(lon), COUNT(*), MIN(street_alias)
+                    FROM address WHERE street_key NOT LIKE '|%' GROUP BY street_key;
+                CREATE INDEX IF NOT EXISTS street_alias ON street (alias);
+                DELETE FROM npa;
+                INSERT INTO npa SELECT npa, AVG(lat), AVG(lon), COUNT(*) FROM address WHERE npa IS NOT NULL GROUP BY npa;"""
+            )
+            self._conn.commit()
+
+    # ---------- 조회 ----------
+    def _get_many(self, table: str, column: str, keys, unique: bool = False) -> dict:
+        # unique: 별칭 조회 — 같은 NPA 에 별칭이 하나뿐일 때만 (Rue/Avenue de Lausanne 모호성)
+        keys = [k for k in keys if isinstance(k, str) and k]
+        out = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite 파라미터 개수 제한
+                chunk = keys[i:i + 500]
+                q = f"SELECT {column}, lat, lon FROM {table} WHERE {column} IN ({','.join('?' * len(chunk))})"
+                if unique:
+                    q = f"SELECT {column}, MIN(lat), MIN(lon) FROM {table} WHERE {column} IN ({','.join('?' * len(chunk))}) GROUP BY {column} HAVING COUNT(*) = 1"
+                for k, lat, lon in self._conn.execute(q, chunk):
+                    out[k] = (lat, lon)
+        return out
+
+    def resolve_keys(self, keys) -> dict:
+        # {키: (lat, lon, 정밀도)} — 찾지 못한 키는 빠짐
+        if self.stale:
+            return {}
+        keys = pd.Series(pd.unique(pd.Series(list(keys), dtype=object)), dtype=object)
+        keys = keys[keys.ne("")]
+        out = {k: (*v, PRECISION_ADDRESS) for k, v in self._get_many("address", "key", keys).items()}
+        self._resolve_untyped(keys[~keys.isin(out)], "address", out, PRECISION_ADDRESS)
+        rest = keys[~keys.isin(out)]
+        if len(rest):
+            streets = street_keys(rest)
+            # 도로명 없는 키("|1004")는 도로 중심으로 풀지 않음
+            found = self._get_many("street", "key", streets[~streets.str.startswith("|")].unique())
+            for k, s in zip(rest, streets):
+                if s in found:
+                    out[k] = (*found[s], PRECISION_STREET)
+            rest = rest[~rest.isin(out)]
+            self._resolve_untyped(rest, "street", out, PRECISION_STREET)
+            rest = rest[~rest.isin(out)]
+        if len(rest):
+            npas = npa_of_keys(rest)
+            found = self._get_many("npa", "npa", npas.dropna().unique())
+            for k, n in zip(rest, npas):
+                if n in found:
+                    out[k] = (*found[n], PRECISION_NPA)
+        return out
+
+    def _resolve_untyped(self, keys: pd.Series, table: str, out: dict, precision: str):
+        # 유형 없는 키만 별칭으로 ("rue lausanne 10" 이 "avenue lausanne 10" 으로 풀리면 안 됨)
+        keys = keys[untyped_keys(keys) == keys]
+        if not len(keys):
+            return
+        lookup = keys if table == "address" else street_keys(keys)
+        found = self._get_many(table, "alias", lookup[~lookup.str.startswith("|")].unique(), unique=True)
+        for k, a in zip(keys, lookup):
+            if a in found:
+                out[k] = (*found[a], precision)
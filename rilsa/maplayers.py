@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# 기본 설정
+# =========================
+CLUSTER_PX = 60               # 화면상 격자 한 칸 크기(px)
+AUTO_POINT_LIMIT = 5000       # Auto 모드: 이 이하면 개별 점
+POINTS_ZOOM_THRESHOLD = 13    # 이 줌 이상이면 항상 개별 점
+METERS_PER_DEG = 111_320
+
+
+# =========================
+# 색상 팔레트 (uint8 RGB) + 색상 적용(반투명)
+# =========================
+PALETTE = np.array([
+    [230, 25, 75], [60, 180, 75], [0, 130, 200], [245, 130, 48], [145, 30, 180],
+    [70, 240, 240], [240, 50, 230], [210, 245, 60], [250, 190, 190], [170, 110, 40],
+], dtype=np.uint8)
+DEFAULT_COLOR = [0, 0, 200]     # 색상 키가 없을 때
+MISSING_COLOR = [160, 160, 160] # 값이 비어 있을 때
+COLOR_COLUMNS = ["color_r", "color_g", "color_b", "color_a"]
+FILL_COLOR_ACCESSOR = "[color_r, color_g, color_b, color_a]"
+
+def as_category(col: pd.Series) -> pd.Series:
+    return col if isinstance(col.dtype, pd.CategoricalDtype) else col.astype("category")
+
+def build_cmap(keys, palette=PALETTE, alpha=120) -> dict:
+    # 전체 데이터셋 기준으로 한 번 만들면 필터가 바뀌어도 색이 유지됨
+    return {k: palette[i % len(palette)].tolist() + [alpha] for i, k in enumerate(keys)}
+
+def assign_colors(df_points, color_key, cmap=None, palette=PALETTE, alpha=120):
+    if (not color_key) or (color_key not in df_points.columns):
+        for c, v in zip(COLOR_COLUMNS, DEFAULT_COLOR + [alpha]):
+            df_points[c] = np.full(len(df_points), v, dtype=np.uint8)
+        return [], {}
+
+    # 카테고리 코드 → uint8 LUT 조회 (행별 리스트 없음)
+    cat = as_category(df_points[color_key])
+    labels = [str(c) for c in cat.cat.categories]
+    if cmap is None:
+        cmap = build_cmap(sorted(labels), palette, alpha)
+    lut = np.array([cmap.get(k, MISSING_COLOR + [alpha]) for k in labels] + [MISSING_COLOR + [alpha]], dtype=np.uint8)
+    codes = cat.cat.codes.to_numpy()
+    rgba = lut[codes]  # 코드 -1(NaN) → 마지막 행
+    for i, c in enumerate(COLOR_COLUMNS):
+        df_points[c] = rgba[:, i]
+
+    present = np.unique(codes[codes >= 0])
+    keys = sorted(labels[i] for i in present)
+    return keys, cmap
+
+
+# =========================
+# 개별 점 페이로드 (id + 위치 + 색상만 전송, 상세는 id 로 서버에서 조회)
+# =========================
+POINT_POSITION_ACCESSOR = "[x, y]"
+COORD_DECIMALS = 5  # 약 1 m — JSON 숫자 길이 절감
+
+def point_payload(df_points: pd.DataFrame):
+    # assign_colors 이후 호출, id = 원본 프레임 인덱스
+    alpha = int(df_points["color_a"].iloc[0]) if len(df_points) else 120
+    out = pd.DataFrame({
+        "id": df_points.index.to_numpy(),
+        "x": df_points["longitude"].to_numpy(dtype=float).round(COORD_DECIMALS),
+        "y": df_points["latitude"].to_numpy(dtype=float).round(COORD_DECIMALS),
+        "r": df_points["color_r"].to_numpy(),
+        "g": df_points["color_g"].to_numpy(),
+        "b": df_points["color_b"].to_numpy(),
+    })
+    return out, f"[r, g, b, {alpha}]"
+
+def compact_details(df: pd.DataFrame, columns) -> pd.DataFrame:
+    # id → 상세 조회표, 반복되는 문자열(소유자·담당자 등)은 카테고리로 한 번만 저장
+    out = df.reindex(columns=columns)
+    for c in out.columns:
+        if not pd.api.types.is_numeric_dtype(out[c]) and not isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype("category")
+    return out
+
+
+# =========================
+# 줌 → 격자 크기
+# =========================
+def cell_size_for_zoom(zoom: float, cluster_px: int = CLUSTER_PX) -> float:
+    # Web Mercator: 줌 z 에서 1px ≈ 360 / (256·2^z) 도
+    return 360.0 / (256 * 2 ** zoom) * cluster_px
+
+def use_clusters(n_points: int, zoom: float, mode: str = "Auto") -> bool:
+    if mode == "Points" or zoom >= POINTS_ZOOM_THRESHOLD:
+        return False
+    if mode == "Agrégé":
+        return True
+    return n_points > AUTO_POINT_LIMIT
+
+
+# =========================
+# 격자 집계 (서버 측)
+# =========================
+def aggregate_points(df: pd.DataFrame, cell_deg: float, color_key: str = None, sum_cols=()) -> pd.DataFrame:
+    lat = df["latitude"].to_numpy(dtype=float)
+    lon = df["longitude"].to_numpy(dtype=float)
+    gy = np.floor(lat / cell_deg).astype(np.int64)
+    gx = np.floor(lon / cell_deg).astype(np.int64)
+    codes, uniq = pd.factorize((gy << 32) | (gx & 0xFFFFFFFF))
+    k = len(uniq)
+
+    count = np.bincount(codes, minlength=k)
+    out = pd.DataFrame({
+        "longitude": np.bincount(codes, weights=lon, minlength=k) / count,
+        "latitude": np.bincount(codes, weights=lat, minlength=k) / count,
+        "count": count,
+    })
+    for c in sum_cols:
+        if c in df.columns:
+            w = pd.to_numeric(df[c], errors="coerce").fillna(0).to_numpy(dtype=float)
+            out[c] = np.bincount(codes, weights=w, minlength=k).astype(np.int64)
+
+    # 칸마다 가장 많은 카테고리
+    if color_key and color_key in df.columns:
+        cat = as_category(df[color_key])
+        labels = np.append(cat.cat.categories.to_numpy(dtype=object), None)
+        ccodes = cat.cat.codes.to_numpy().astype(np.int64)
+        ccodes[ccodes < 0] = len(labels) - 1
+        counts = np.bincount(codes * len(labels) + ccodes, minlength=k * len(labels)).reshape(k, len(labels))
+        out[color_key] = labels[counts.argmax(axis=1)]
+
+    # 반경: 칸 크기 기준, 개수의 제곱근에 비례
+    cell_m = cell_deg * METERS_PER_DEG
+    out["radius"] = cell_m * np.clip(0.5 * np.sqrt(count / count.max()), 0.15, 0.5)
+    return out
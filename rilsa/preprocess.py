@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from .address import clean_designation, valid_npa
+
+# =========================
+# 분류/그룹 기준표
+# =========================
+SUPPORT_USER = "REM4you (Support User)"
+
+# Référence 구간 → Type (양 끝 포함)
+TYPE_RANGES = [
+    (100000, 499000, "Immeuble"),
+    (500000, 599000, "Lot isolé"),
+    (800000, 950000, "PPE"),
+]
+TYPE_CATEGORIES = [label for _, _, label in TYPE_RANGES] + ["Autre", "Inconnu"]
+
+# Gérant → Gérant group (없으면 본인 이름)
+GERANT_GROUPS = {
+    "NIGGLI Lucy": "Nyon",
+    "BENISTANT Audrey": "Nyon",
+    "CURCHOD Merry": "Montreux",
+    "DE PREUX Joanna": "Montreux",
+}
+
+ADDRESS_COLUMNS = ["Désignation", "NPA", "Lieu", "Canton"]
+CATEGORY_COLUMNS = ["Gérant", "Gérant group", "Type", "Canton", "Lieu"]
+UNIT_COLUMNS = ["Nombre total d'appartements", "Nombre total d'entreprises"]
+
+
+# =========================
+# 벡터화 변환
+# =========================
+def clean_reference(ref: pd.Series) -> pd.Series:
+    return pd.to_numeric(ref.astype(str).str.replace(r"[^\d]", "", regex=True), errors="coerce")
+
+def classify_type(ref: pd.Series) -> pd.Series:
+    conds = [(ref >= lo) & (ref <= hi) for lo, hi, _ in TYPE_RANGES]
+    labels = [label for _, _, label in TYPE_RANGES]
+    out = np.select(conds + [ref.isna()], labels + ["Inconnu"], default="Autre")
+    return pd.Series(pd.Categorical(out, categories=TYPE_CATEGORIES), index=ref.index)
+
+def gerant_group(gerant: pd.Series) -> pd.Series:
+    # 고유값(카테고리)만 조회 후 코드로 펼침
+    cat = gerant.astype("category")
+    lookup = [GERANT_GROUPS.get(str(c).strip(), str(c).strip()) for c in cat.cat.categories]
+    mapped = np.array(lookup + [None], dtype=object)[cat.cat.codes.to_numpy()]  # 코드 -1(NaN) → None
+    return pd.Series(pd.Categorical(mapped), index=gerant.index)
+
+def build_address(df: pd.DataFrame) -> pd.Series:
+    # 약어 풀기 / 메모 제거 / 공백 정리 후 조합, NPA 는 4자리로 통일
+    d = clean_designation(df["Désignation"])
+    npa = valid_npa(df["NPA"]).fillna(df["NPA"].astype(str).str.strip())
+    lieu, canton = (df[c].astype(str).str.strip() for c in ADDRESS_COLUMNS[2:])
+    return d + ", " + npa + " " + lieu + ", " + canton + ", Suisse"
+
+
+# =========================
+# 전처리 (데이터셋당 1회)
+# =========================
+def preprocess(df: pd.DataFrame):
+    warnings = []
+    df = df.copy()
+
+    # 1) Support User 제거
+    if "Gérant" in df.columns:
+        df["Gérant"] = df["Gérant"].astype(str)
+        df = df[df["Gérant"].str.strip() != SUPPORT_USER].reset_index(drop=True)
+
+    # 2) Référence → Type
+    if "Référence" in df.columns:
+        df["Référence"] = clean_reference(df["Référence"])
+        df["Type"] = classify_type(df["Référence"])
+    else:
+        warnings.append("⚠️ Colonne 'Référence' absente : 'Type' ne sera pas créé.")
+
+    # 3) Gérant group
+    if "Gérant" in df.columns:
+        df["Gérant group"] = gerant_group(df["Gérant"])
+    else:
+        warnings.append("⚠️ Colonne 'Gérant' introuvable — impossible de créer 'Gérant group'.")
+
+    # 4) 주소 (필터 전에 한 번만)
+    if all(c in df.columns for c in ADDRESS_COLUMNS):
+        df["adresse"] = build_address(df)
+        n_bad = int(valid_npa(df["NPA"]).isna().sum())
+        if n_bad:
+            warnings.append(f"⚠️ {n_bad} ligne(s) avec un NPA invalide — clé d'adresse basée sur le lieu.")
+
+    # 5) 범주형 컬럼
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+
+    return df, warnings
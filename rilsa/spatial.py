@@ -0,0 +1,143 @@
+import json
+import math
+
+import numpy as np
+
+# =========================
+# 기본 설정
+# =========================
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180  # 위도 1도 ≈ 111.2 km
+DEFAULT_CELL_KM = 1.0                         # 격자 한 칸 크기(km)
+
+
+# =========================
+# 거리 (벡터화 haversine)
+# =========================
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# =========================
+# GeoJSON 폴리곤 → 링 목록 [(lon, lat) 배열]
+# =========================
+def polygon_rings(geojson) -> list:
+    if isinstance(geojson, (str, bytes)):
+        geojson = json.loads(geojson)
+    kind = geojson.get("type")
+    if kind == "FeatureCollection":
+        return [r for f in geojson["features"] for r in polygon_rings(f)]
+    if kind == "Feature":
+        return polygon_rings(geojson["geometry"])
+    if kind == "Polygon":
+        return [np.asarray(r, dtype=float)[:, :2] for r in geojson["coordinates"]]
+    if kind == "MultiPolygon":
+        return [np.asarray(r, dtype=float)[:, :2] for poly in geojson["coordinates"] for r in poly]
+    raise ValueError(f"Géométrie non supportée : {kind}")
+
+def points_in_rings(lon, lat, rings) -> np.ndarray:
+    # even-odd 규칙 (구멍/멀티폴리곤 포함), 변마다 전체 점을 벡터 연산
+    inside = np.zeros(len(lon), dtype=bool)
+    for ring in rings:
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for xa, ya, xb, yb in zip(x1, y1, x2, y2):
+            if ya == yb:
+                continue
+            crosses = (ya > lat) != (yb > lat)
+            x_int = xa + (lat - ya) * (xb - xa) / (yb - ya)
+            inside ^= crosses & (lon < x_int)
+    return inside
+
+
+# =========================
+# 격자 공간 인덱스 (정렬된 셀 키 + searchsorted)
+# =========================
+class SpatialIndex:
+    def __init__(self, lat, lon, cell_km: float = DEFAULT_CELL_KM):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        self.n = len(lat)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        self.rows = np.flatnonzero(valid)  # 원래 프레임의 행 위치
+        self.lat = lat[valid]
+        self.lon = lon[valid]
+        self.cell_km = cell_km
+        self.lat0 = float(self.lat.mean()) if len(self.lat) else 46.8182
+        self.dlat = cell_km / KM_PER_DEG
+        self.dlon = cell_km / (KM_PER_DEG * math.cos(math.radians(self.lat0)))
+
+        if not len(self.lat):
+            self.iy0 = self.ix0 = 0
+            self.width = self.height = 0
+            self.keys = self.order = np.empty(0, dtype=np.int64)
+            return
+        iy = np.floor(self.lat / self.dlat).astype(np.int64)
+        ix = np.floor(self.lon / self.dlon).astype(np.int64)
+        self.iy0, self.ix0 = int(iy.min()), int(ix.min())
+        self.height = int(iy.max()) - self.iy0 + 1
+        self.width = int(ix.max()) - self.ix0 + 1
+        keys = (iy - self.iy0) * self.width + (ix - self.ix0)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _candidates(self, lat: float, lon: float, km: float) -> np.ndarray:
+        if not len(self.lat):
+            return np.empty(0, dtype=np.int64)
+        ry = math.ceil(km / self.cell_km) + 1
+        lon_scale = max(math.cos(math.radians(lat)), 1e-6) / math.cos(math.radians(self.lat0))
+        rx = math.ceil(km / (self.cell_km * lon_scale)) + 1
+        cy = math.floor(lat / self.dlat) - self.iy0
+        cx = math.floor(lon / self.dlon) - self.ix0
+        y_lo, y_hi = max(cy - ry, 0), min(cy + ry, self.height - 1)
+        x_lo, x_hi = max(cx - rx, 0), min(cx + rx, self.width - 1)
+        if y_lo > y_hi or x_lo > x_hi:
+            return np.empty(0, dtype=np.int64)
+        # 셀 행마다 키 구간이 연속 → searchsorted 두 번으로 범위 추출
+        ys = np.arange(y_lo, y_hi + 1, dtype=np.int64) * self.width
+        starts = np.searchsorted(self.keys, ys + x_lo, side="left")
+        ends = np.searchsorted(self.keys, ys + x_hi, side="right")
+        parts = [self.order[s:e] for s, e in zip(starts, ends) if e > s]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    # ---------- 질의 (반환값: 원래 프레임의 행 위치) ----------
+    def radius(self, lat: float, lon: float, km: float) -> np.ndarray:
+        idx = self._candidates(lat, lon, km)
+        d = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        return self.rows[idx[d <= km]]
+
+    def nearest(self, lat: float, lon: float, k: int) -> np.ndarray:
+        k = min(k, len(self.lat))
+        km = self.cell_km
+        while True:
+            idx = self._candidates(lat, lon, km)
+            d = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+            inside = d <= km
+            # 반경 안에 k 개 이상이면 확정 (반경 밖 점이 더 가까울 수 없음)
+            if inside.sum() >= k or len(idx) == len(self.lat):
+                best = np.argsort(d, kind="stable")[:k]
+                return self.rows[idx[best]]
+            km *= 2
+
+    def polygon(self, geojson) -> np.ndarray:
+        rings = polygon_rings(geojson)
+        if not rings or not len(self.lat):
+            return np.empty(0, dtype=np.int64)
+        pts = np.concatenate(rings)
+        lon_min, lat_min = pts.min(axis=0)
+        lon_max, lat_max = pts.max(axis=0)
+        bbox = np.flatnonzero(
+            (self.lat >= lat_min) & (self.lat <= lat_max) & (self.lon >= lon_min) & (self.lon <= lon_max)
+        )
+        inside = points_in_rings(self.lon[bbox], self.lat[bbox], rings)
+        return self.rows[bbox[inside]]
+
+    def mask(self, rows: np.ndarray) -> np.ndarray:
+        out = np.zeros(self.n, dtype=bool)
+        out[rows] = True
+        return out
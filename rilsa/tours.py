@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+
+from .spatial import haversine_km
+
+# =========================
+# 기본 설정
+# =========================
+MAX_TOUR_STOPS = 500      # 이보다 많으면 거리 행렬/2-opt 가 1초를 넘길 수 있음
+TWO_OPT_SECONDS = 1.0     # 2-opt 개선 시간 한도
+
+
+# =========================
+# 거리 행렬 (브로드캐스팅 haversine, km)
+# =========================
+def distance_matrix(lat, lon) -> np.ndarray:
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+def tour_length(dist: np.ndarray, order) -> float:
+    order = np.asarray(order)
+    return float(dist[order, np.roll(order, -1)].sum()) if len(order) > 1 else 0.0
+
+
+# =========================
+# 순회 순서 (최근접 이웃 → 2-opt, 출발점으로 돌아오는 폐쇄 경로)
+# =========================
+def nearest_neighbour(dist: np.ndarray, start: int = 0) -> np.ndarray:
+    n = len(dist)
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    order[0], visited[start] = start, True
+    for i in range(1, n):
+        row = np.where(visited, np.inf, dist[order[i - 1]])
+        order[i] = int(np.argmin(row))
+        visited[order[i]] = True
+    return order
+
+def two_opt(dist: np.ndarray, order: np.ndarray, max_seconds: float = TWO_OPT_SECONDS) -> np.ndarray:
+    # 간선 (a,b)-(c,d) 를 (a,c)-(b,d) 로 바꾸는 이득을 j 전체에 대해 한 번에 계산
+    route = np.asarray(order, dtype=np.int64).copy()
+    n = len(route)
+    if n < 4:
+        return route
+    deadline = time.perf_counter() + max_seconds
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            a, b = route[i], route[i + 1]
+            c = route[i + 2:]
+            d = np.roll(route, -1)[i + 2:]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            if i == 0:
+                delta[-1] = 0.0  # 마지막 간선은 (a,b) 와 맞닿아 있음
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                j += i + 2
+                route[i + 1:j + 1] = route[i + 1:j + 1][::-1]
+                improved = True
+    return route
+
+def plan_tour(lat, lon, start: int = 0, max_seconds: float = TWO_OPT_SECONDS) -> dict:
+    t = time.perf_counter()
+    dist = distance_matrix(lat, lon)
+    greedy = nearest_neighbour(dist, start)
+    order = two_opt(dist, greedy, max_seconds)
+    return {
+        "order": order,
+        "km": tour_length(dist, order),
+        "km_nearest_neighbour": tour_length(dist, greedy),
+        "seconds": time.perf_counter() - t,
+    }
+
+def tour_path(lat, lon, order) -> list:
+    # PathLayer 용 [[lon, lat], ...] (출발점으로 복귀)
+    order = np.append(order, order[:1])
+    return np.column_stack([np.asarray(lon, dtype=float)[order], np.asarray(lat, dtype=float)[order]]).tolist()
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# =========================
+# 기본 설정
+# =========================
+DEFAULT_TRACE_LOG_PATH = os.path.join(".cache", "rilsa_trace.jsonl")  # 실행(rerun)당 JSON 한 줄
+TRACE_LOG_ENV = "RILSA_TRACE_LOG"  # 경로 변경, 빈 문자열이면 기록하지 않음
+MAX_LOG_BYTES = 20_000_000         # 넘으면 .1 로 교체
+
+_write_lock = threading.Lock()
+
+
+def frame_bytes(df) -> int:
+    # 얕은 메모리 사용량 (deep=True 는 문자열 컬럼에서 느림)
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+# =========================
+# 단계별 측정 (span = 단계 이름 + 시간 + 행 수/바이트/캐시 적중)
+# =========================
+class Tracer:
+    def __init__(self, page: str, log_path: str = None):
+        self.page = page
+        self.log_path = os.environ.get(TRACE_LOG_ENV, DEFAULT_TRACE_LOG_PATH) if log_path is None else log_path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.spans = []
+        self.finished = False
+        self._open = []
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str, cached: bool = False, **attrs):
+        # cached=True → 기본값 "hit", 캐시 함수 본문에서 miss() 가 호출되면 "miss"
+        rec = {"stage": stage, "depth": len(self._open), **attrs}
+        if cached:
+            rec["cache"] = "hit"
+        self._open.append(rec)
+        t = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["ms"] = round((time.perf_counter() - t) * 1000, 2)
+            self._open.pop()
+            self.spans.append(rec)
+
+    def miss(self):
+        if self._open:
+            self._open[-1]["cache"] = "miss"
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def finish(self, **attrs) -> dict:
+        # 재실행마다 한 번 (st.stop 전에도 호출)
+        if self.finished:
+            return None
+        self.finished = True
+        entry = {
+            "ts": time.time(),
+            "page": self.page,
+            "run": self.run_id,
+            "total_ms": self.total_ms,
+            "spans": self.spans,
+            **attrs,
+        }
+        if self.log_path:
+            append_log(self.log_path, entry)
+        return entry
+
+
+# =========================
+# 구조화 로그 (JSON Lines)
+# =========================
+def append_log(path: str, entry: dict):
+    line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > MAX_LOG_BYTES:
+            os.replace(path, f"{path}.1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def recent_runs(path: str = DEFAULT_TRACE_LOG_PATH, page: str = None, limit: int = 50) -> list:
+    # 최근 실행의 총 시간 (디버그 패널의 p50/p95 용)
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()[-limit * 4:]
+    runs = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if page is None or entry.get("page") == page:
+            runs.append(entry)
+    return runs[-limit:]
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .emaildata import METRICS, norm_key
+from .identity import IdentityResolver
+from .preprocess import UNIT_COLUMNS
+from .spatial import KM_PER_DEG, haversine_km
+
+# =========================
+# 기본 설정
+# =========================
+LOAD_COLUMNS = ["Unités gérées", "Étendue (km²)", "reçu", "envoyé"]  # 부하 지수에 쓰는 지표
+OVERLOAD_INDEX = 1.3  # 중앙값 대비 평균 비율이 이 이상이면 과부하
+
+
+# =========================
+# 볼록 껍질 면적 (monotone chain, 로컬 평면 km)
+# =========================
+def _cross(o, a, b) -> float:
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def hull_area_km2(lat, lon) -> float:
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) < 3:
+        return 0.0
+    scale = math.cos(math.radians(float(lat.mean())))
+    pts = np.unique(np.column_stack([lon * scale * KM_PER_DEG, lat * KM_PER_DEG]), axis=0)  # x 정렬 포함
+    if len(pts) < 3:
+        return 0.0
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and _cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in pts[::-1]:
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    hull = np.array(lower[:-1] + upper[:-1])
+    x, y = hull[:, 0], hull[:, 1]
+    return float(abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2)
+
+
+# =========================
+# 포트폴리오 측 (Gérant 단위)
+# =========================
+def portfolio_stats(df: pd.DataFrame, manager_col: str = "Gérant") -> pd.DataFrame:
+    managers = df[manager_col].astype("category")
+    codes = managers.cat.codes.to_numpy()
+    names = [str(c) for c in managers.cat.categories]
+    k = len(names)
+    valid = codes >= 0
+    out = pd.DataFrame({manager_col: names})
+    out["Immeubles"] = np.bincount(codes[valid], minlength=k)
+    units = np.zeros(len(df))
+    for c in UNIT_COLUMNS:
+        if c in df.columns:
+            values = pd.to_numeric(df[c], errors="coerce").fillna(0).to_numpy(float)
+            out[c] = np.bincount(codes[valid], weights=values[valid], minlength=k).astype(np.int64)
+            units += values
+    out["Unités gérées"] = np.bincount(codes[valid], weights=units[valid], minlength=k).astype(np.int64)
+
+    # 위치: 중심점 거리(bincount) + 그룹별 볼록 껍질
+    lat = df["latitude"].to_numpy(float) if "latitude" in df.columns else np.full(len(df), np.nan)
+    lon = df["longitude"].to_numpy(float) if "longitude" in df.columns else np.full(len(df), np.nan)
+    geo = valid & ~(np.isnan(lat) | np.isnan(lon))
+    g, glat, glon = codes[geo], lat[geo], lon[geo]
+    n_geo = np.bincount(g, minlength=k)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c_lat = np.bincount(g, weights=glat, minlength=k) / n_geo
+        c_lon = np.bincount(g, weights=glon, minlength=k) / n_geo
+        dist = haversine_km(glat, glon, c_lat[g], c_lon[g])
+        out["Distance moyenne au centre (km)"] = np.bincount(g, weights=dist, minlength=k) / n_geo
+    out["Géocodés"] = n_geo
+
+    order = np.argsort(g, kind="stable")
+    bounds = np.searchsorted(g[order], np.arange(k + 1))
+    out["Étendue (km²)"] = [
+        hull_area_km2(glat[order[s:e]], glon[order[s:e]]) for s, e in zip(bounds[:-1], bounds[1:])
+    ]
+    return out
+
+
+# =========================
+# 이메일 측 (사람 단위, 청크 스트리밍 합계)
+# =========================
+def email_stats(chunks) -> pd.DataFrame:
+    parts = []
+    for chunk in chunks:
+        cols = [c for c in METRICS if c in chunk.columns]
+        keep = ["Display Name"] + (["User Principal Name"] if "User Principal Name" in chunk.columns else [])
+        parts.append(chunk.groupby(keep, as_index=False, observed=True)[cols].sum())
+    if not parts:
+        return pd.DataFrame(columns=["Display Name", *METRICS.values()])
+    out = pd.concat(parts, ignore_index=True)
+    keep = [c for c in ["Display Name", "User Principal Name"] if c in out.columns]
+    return out.groupby(keep, as_index=False)[[c for c in METRICS if c in out.columns]].sum().rename(columns=METRICS)
+
+
+# =========================
+# 결합 + 과부하 판정
+# =========================
+def workload(portfolio: pd.DataFrame, email: pd.DataFrame, manager_col: str = "Gérant",
+             overload_index: float = OVERLOAD_INDEX) -> pd.DataFrame:
+    # Gérant 이름 ↔ 메일함 Display Name: 정확/토큰/퍼지 매칭 재사용
+    email = email.assign(_key=norm_key(email["Display Name"])).drop_duplicates("_key")
+    resolver = IdentityResolver(email)
+    keys = resolver.keys_for(pd.DataFrame({"Display Name": portfolio[manager_col]}))
+    out = portfolio.assign(_key=keys.to_numpy()).merge(
+        email.drop(columns=["User Principal Name"], errors="ignore").rename(columns={"Display Name": "Boîte e-mail"}),
+        on="_key", how="left",
+    ).drop(columns="_key")
+
+    # 지표별 중앙값 대비 비율의 평균 → 부하 지수
+    cols = [c for c in LOAD_COLUMNS if c in out.columns]
+    values = out[cols].astype(float)
+    ratios = values / values.where(values > 0).median()
+    out["Indice de charge"] = ratios.replace([np.inf, -np.inf], np.nan).mean(axis=1)
+    out["Surcharge"] = out["Indice de charge"] >= overload_index
+    return out.sort_values("Indice de charge", ascending=False, ignore_index=True)
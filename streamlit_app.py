@@ -1,34 +1,83 @@
-import io
+import os
+import time
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
 import pydeck as pdk
 
+from rilsa.address import address_key_series, lookup_stats
+from rilsa.coords import DEFAULT_COORDS_CSV_PATH, PRECISION_COLUMN, CoordinateStore
+from rilsa.diff import ADDED, CHANGE_COLORS, CHANGE_TYPES, assign_change_colors, diff_portfolios
+from rilsa.export import EXPORT_FORMATS, GEOCODE_STATUS_COLUMN, build_export, export_key
+from rilsa.filters import FilterEngine
+from rilsa.geocoding import DEFAULT_GEOCODE_CACHE_PATH, GeocodeCache, Geocoder, requery_mask
+from rilsa.ingest import SOURCE_COLUMN, list_snapshots, load_portfolio, read_snapshot
+from rilsa.jobs import CANCELLED, DONE, FAILED, GeocodeJob, JobRunner
+from rilsa.localgeo import (
+    DEFAULT_LOCAL_INDEX_PATH,
+    PRECISION_ADDRESS,
+    PRECISION_LEVELS,
+    PRECISION_NPA,
+    LocalGeocoder,
+)
+from rilsa.maplayers import (
+    COLOR_COLUMNS,
+    FILL_COLOR_ACCESSOR,
+    POINT_POSITION_ACCESSOR,
+    aggregate_points,
+    assign_colors,
+    build_cmap,
+    cell_size_for_zoom,
+    compact_details,
+    point_payload,
+    use_clusters,
+)
+from rilsa.preprocess import preprocess
+from rilsa.spatial import SpatialIndex
+from rilsa.tours import MAX_TOUR_STOPS, plan_tour, tour_path
+from rilsa.tracing import Tracer, frame_bytes, recent_runs
+
 # =========================
 # 기본 데이터 경로(원하는 경로로 바꿔도 됨)
 # =========================
 DEFAULT_XLSX_PATH = "KPI_-_Repartition_portefeuille-20250716.xlsx"        # 기본 엑셀
-DEFAULT_COORDS_CSV_PATH = "rilsa_coords.csv" # 기본 좌표 CSV
 DEFAULT_SHEET_NAME = None  # None이면 첫 시트
 
 st.set_page_config(page_title="RILSA map", layout="wide")
 st.title("RILSA map")
 
+# 단계별 측정 (재실행마다 새로 만들고 끝에서 로그 파일에 기록)
+tracer = Tracer("streamlit_app")
+debug_mode = st.sidebar.checkbox("🔧 Mode debug (temps par étape)", key="debug_trace")
+debug_box = st.sidebar.container()
+
 # =========================
 # Tooltip HTML (Nom : Valeur)
 # =========================
+# 개별 점에는 id 만 전송 — 상세는 선택 시 서버에서 조회
 TOOLTIP_HTML = """
 <div style="font-family: ui-sans-serif,system-ui; font-size:12px; line-height:1.25;">
-  <div><b>Gérant :</b> {Gérant}</div>
-  <div><b>Gérant group :</b> {Gérant group}</div>
-  <div><b>Type :</b> {Type}</div>
-  <div><b>Adresse :</b> {adresse}</div>
+  <div><b>Immeuble #{id}</b> — cliquez pour afficher le détail</div>
+</div>
+"""
+DETAIL_COLUMNS = ["Référence","Gérant","Gérant group","Type","adresse",PRECISION_COLUMN,"Nombre total d'appartements","Nombre total d'entreprises","Propriétaire"]
+POINTS_LAYER_ID = "immeubles"
+
+# 집계 모드 툴팁 (격자 칸 단위)
+CLUSTER_TOOLTIP_HTML = """
+<div style="font-family: ui-sans-serif,system-ui; font-size:12px; line-height:1.25;">
+  <div><b>Immeubles :</b> {count}</div>
+  <div><b>Catégorie dominante :</b> {dominant}</div>
   <div><b>Nombre total d'appartements :</b> {Nombre total d'appartements}</div>
   <div><b>Nombre total d'entreprises :</b> {Nombre total d'entreprises}</div>
-  <div><b>Propriétaire :</b> {Propriétaire}</div>
 </div>
 """
+DIFF_RADIUS = 350
+TOUR_COLOR = [20, 20, 20, 200]
+TOUR_DIMENSIONS = ["Gérant", "Gérant group"]
+TOOLTIP_STYLE = {"backgroundColor":"rgba(255,255,255,0.95)", "color":"black"}
 
 # =========================
 # 레전드(표) 렌더러
@@ -65,47 +114,34 @@ def multiselect_with_select_all(label: str, options: list, key: str):
     return chosen
 
 # =========================
-# 색상 팔레트 + 색상 적용(반투명)
-# =========================
-PALETTE = [
-    [230, 25, 75], [60, 180, 75], [0, 130, 200], [245, 130, 48], [145, 30, 180],
-    [70, 240, 240], [240, 50, 230], [210, 245, 60], [250, 190, 190], [170, 110, 40],
-]
-
-def assign_colors(df_points, color_key, palette=PALETTE, alpha=120):
-    if (not color_key) or (color_key not in df_points.columns):
-        df_points["color"] = [[0, 0, 200, alpha]] * len(df_points)
-        return [], {}
-    keys = sorted(df_points[color_key].astype(str).unique().tolist())
-    cmap = {k: palette[i % len(palette)] + [alpha] for i, k in enumerate(keys)}
-    df_points["color"] = df_points[color_key].astype(str).map(cmap)
-    return keys, cmap
-
-# =========================
-# 분류/그룹 유틸
+# 기타 유틸
 # =========================
-def classify_type_from_ref(ref):
-    if pd.isna(ref):
-        return "Inconnu"
-    ref = int(ref)
-    if 100000 <= ref <= 499000:
-        return "Immeuble"
-    elif 500000 <= ref <= 599000:
-        return "Lot isolé"
-    elif 800000 <= ref <= 950000:
-        return "PPE"
-    else:
-        return "Autre"
-
-def compute_gerant_group(name):
-    if pd.isna(name):
+def parse_latlon(text: str):
+    # "46.52, 6.63" → (46.52, 6.63), 아니면 None
+    parts = [p.strip() for p in text.replace(";", ",").split(",")]
+    if len(parts) != 2:
         return None
-    n = str(name).strip()
-    if n in {"NIGGLI Lucy", "BENISTANT Audrey"}:
-        return "Nyon"
-    if n in {"CURCHOD Merry", "DE PREUX Joanna"}:
-        return "Montreux"
-    return n
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+def finish_trace(**attrs):
+    # st.stop() 전에도 호출 → 중단된 실행도 기록
+    entry = tracer.finish(**attrs)
+    if not debug_mode or entry is None:
+        return
+    with debug_box:
+        spans = pd.DataFrame(entry["spans"])
+        spans["stage"] = ["· " * d + s for d, s in zip(spans["depth"], spans["stage"])]
+        first = [c for c in ["stage", "ms", "rows", "bytes", "cache"] if c in spans.columns]
+        spans = spans[first + [c for c in spans.columns if c not in first and c != "depth"]]
+        st.dataframe(spans, use_container_width=True, hide_index=True)
+        totals = pd.Series([r["total_ms"] for r in recent_runs(tracer.log_path, tracer.page)] or [entry["total_ms"]])
+        st.caption(
+            f"Exécution : {entry['total_ms']:.0f} ms · {len(totals)} dernières : "
+            f"p50 {totals.quantile(0.5):.0f} ms, p95 {totals.quantile(0.95):.0f} ms — journal : {tracer.log_path or 'désactivé'}"
+        )
 
 def safe_mean(series, default):
     try:
@@ -115,166 +151,300 @@ def safe_mean(series, default):
         return default
 
 # =========================
-# Google Geocoding
+# 지오코딩 (로컬 주소 색인 → SQLite 캐시 + 병렬 Google 요청)
 # =========================
-def gmaps_geocode_one(address: str, key: str):
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"address": address, "key": key, "region": "ch", "language": "fr"}
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        data = r.json()
-        if data.get("status") == "OK" and data.get("results"):
-            loc = data["results"][0]["geometry"]["location"]
-            return (loc["lat"], loc["lng"])
-        else:
-            return (None, None)
-    except Exception:
-        return (None, None)
+@st.cache_resource(show_spinner=False)
+def get_local_geocoder():
+    return LocalGeocoder(DEFAULT_LOCAL_INDEX_PATH) if os.path.exists(DEFAULT_LOCAL_INDEX_PATH) else None
+
+@st.cache_resource(show_spinner=False)
+def get_geocode_cache():
+    return GeocodeCache(DEFAULT_GEOCODE_CACHE_PATH)
+
+@st.cache_resource(show_spinner=False)
+def get_geocoder(key: str, min_precision: str):
+    return Geocoder(key, get_geocode_cache(), local=get_local_geocoder(), min_precision=min_precision)
+
+# 백그라운드 작업 실행기 (세션·재실행 간 공유, 동시에 한 작업만)
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    return JobRunner()
 
-@st.cache_data(show_spinner=False)
-def gmaps_geocode_batch(addresses: tuple, key: str):
-    out = {}
-    progress = st.progress(0)
-    total = len(addresses)
-    for i, addr in enumerate(addresses, start=1):
-        out[addr] = gmaps_geocode_one(addr, key)
-        progress.progress(i/total)
-    return out
+JOB_POLL_SECONDS = 2      # 진행 표시 갱신 주기
+MAP_REFRESH_SECONDS = 10  # 새 좌표가 있을 때 지도 전체 재실행 최소 간격
 
 # =========================
 # 업로드 / 기본 데이터 선택
 # =========================
-uploaded_file = st.file_uploader("Téléversez un fichier Excel (.xlsx)", type=["xlsx"])
-use_default = uploaded_file
+uploaded_files = st.file_uploader("Téléversez un ou plusieurs fichiers Excel (.xlsx)", type=["xlsx"], accept_multiple_files=True)
 
 # =========================
-# 데이터 로딩 (업로드 또는 기본)
+# 데이터 로딩 (업로드 또는 기본) — 문서별 Parquet 스냅샷 재사용, 새 문서만 병렬 변환
 # =========================
 df = None
 source_desc = ""
 try:
-    if not use_default and uploaded_file is not None:
-        xls = pd.ExcelFile(uploaded_file, engine="openpyxl")
-        sheet = st.selectbox("Choisissez une feuille", xls.sheet_names, index=0)
-        df = pd.read_excel(xls, sheet_name=sheet, engine="openpyxl", skiprows=4)
-        source_desc = f"Fichier chargé : {uploaded_file.name} / Feuille : {sheet}"
-    else:
-        xls = pd.ExcelFile(DEFAULT_XLSX_PATH, engine="openpyxl")
-        sheet_names = xls.sheet_names
-        sheet = DEFAULT_SHEET_NAME if (DEFAULT_SHEET_NAME in sheet_names) else sheet_names[0]
-        df = pd.read_excel(xls, sheet_name=sheet, engine="openpyxl", skiprows=4)
-        source_desc = f"Données par défaut : {DEFAULT_XLSX_PATH} / Feuille : {sheet}"
+    with tracer.span("load") as sp:
+        if uploaded_files:
+            sources = [(f.name, f) for f in uploaded_files]
+            df, load_info = load_portfolio(sources)
+            sheet_options = [f"{name} / {sheet}" for name, names in load_info["sheet_names"].items() for sheet in names]
+            if len(sheet_options) > len(sources):
+                chosen = st.multiselect("Choisissez les feuilles", sheet_options, default=[p["source"] for p in load_info["parts"]])
+                if chosen and chosen != [p["source"] for p in load_info["parts"]]:
+                    wanted = [tuple(c.split(" / ", 1)) for c in chosen]
+                    df, load_info = load_portfolio(sources, sheets=wanted)
+            source_desc = "Fichiers chargés : " + ", ".join(p["source"] for p in load_info["parts"])
+        else:
+            sheets = [(DEFAULT_XLSX_PATH, DEFAULT_SHEET_NAME)] if DEFAULT_SHEET_NAME else None
+            df, load_info = load_portfolio([(DEFAULT_XLSX_PATH, DEFAULT_XLSX_PATH)], sheets=sheets)
+            source_desc = f"Données par défaut : {DEFAULT_XLSX_PATH} / Feuille : {load_info['sheet']}"
+        sp.update(rows=len(df), bytes=load_info["bytes"], cache="hit" if load_info["cache_hit"] else "miss")
+    if df.empty:
+        raise ValueError("aucune feuille sélectionnée")
 except Exception as e:
     st.error(f"Impossible de charger le fichier Excel: {e}")
+    finish_trace()
     st.stop()
 
 # =========================
-# 전처리
+# 전처리 (데이터셋 버전당 1회, 결과는 읽기 전용으로 공유)
 # =========================
-# 1) Support User 제거
-if "Gérant" in df.columns:
-    df["Gérant"] = df["Gérant"].astype(str)
-    df = df[df["Gérant"].str.strip() != "REM4you (Support User)"].reset_index(drop=True)
+@st.cache_resource(show_spinner=False)
+def preprocess_dataset(dataset_key: str, _df):
+    tracer.miss()
+    return preprocess(_df)
 
-# 2) Référence → Type
-if "Référence" in df.columns:
-    df["Référence"] = pd.to_numeric(df["Référence"].astype(str).str.replace(r"[^\d]", "", regex=True), errors="coerce")
-    df["Type"] = df["Référence"].apply(classify_type_from_ref)
-else:
-    st.warning("⚠️ Colonne 'Référence' absente : 'Type' ne sera pas créé.")
+with tracer.span("preprocess", cached=True) as sp:
+    df, prep_warnings = preprocess_dataset(f"{load_info['hash']}:{load_info['sheet']}", df)
+    sp.update(rows=len(df), bytes=frame_bytes(df))
+for w in prep_warnings:
+    st.warning(w)
 
-# 3) Gérant group
-if "Gérant" in df.columns:
-    df["Gérant group"] = df["Gérant"].apply(compute_gerant_group)
-else:
-    st.warning("⚠️ Colonne 'Gérant' introuvable — impossible de créer 'Gérant group'.")
+# =========================
+# 좌표 저장소 (1회 로드, 인덱스 조회로 lat/lon 채움)
+# =========================
+@st.cache_resource(show_spinner=False)
+def get_coord_store():
+    return CoordinateStore(DEFAULT_COORDS_CSV_PATH)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def attach_coords(dataset_key: str, store_version: int, _df, _store):
+    tracer.miss()
+    return _store.fill(_df)
+
+coord_store = get_coord_store()
+coord_store.refresh()  # rebuild_coords 가 파일을 교체했으면 다시 읽음
+if not coord_store.exists:
+    st.warning(f"CSV lat/lon par défaut introuvable: {DEFAULT_COORDS_CSV_PATH}")
+# 지도에 반영된 저장소 버전 (백그라운드 지오코딩 진행 패널이 비교)
+st.session_state["map_store_version"] = coord_store.version
+with tracer.span("merge", cached=True) as sp:
+    df = attach_coords(f"{load_info['hash']}:{load_info['sheet']}", st.session_state["map_store_version"], df, coord_store)
+    sp.update(rows=len(df), geocoded=int(df["latitude"].notna().sum()), store_rows=len(coord_store))
 
 st.success(source_desc)
+load_timings = " · ".join(f"{k} {v*1000:.0f} ms" for k, v in load_info["timings"].items())
+n_parsed = sum(not p["cache_hit"] for p in load_info["parts"])
+load_mode = "snapshot Parquet en cache" if load_info["cache_hit"] else f"conversion XLSX → Parquet de {n_parsed} feuille(s)"
+st.caption(f"Chargement ({load_mode}, {len(load_info['parts'])} source(s), {len(df)} lignes) : {load_timings}")
 
 # =========================
-# 필터
+# 필터 (차원별 비트맵 — 데이터셋당 1회 생성)
 # =========================
+FILTER_KEYS = {
+    "Gérant": "gerant",
+    "Gérant group": "gerant_group",
+    "Type": "type",
+    "Canton": "canton",
+    "Lieu": "lieu",
+    SOURCE_COLUMN: "source",
+}
+
+@st.cache_resource(show_spinner=False)
+def get_filter_engine(dataset_key: str, _df):
+    tracer.miss()
+    return FilterEngine(_df, dimensions=list(FILTER_KEYS))
+
+with tracer.span("filter_index", cached=True):
+    filter_engine = get_filter_engine(f"{load_info['hash']}:{load_info['sheet']}", df)
+
 st.sidebar.header("Filtres")
+selections = {}
 with st.sidebar:
-    if "Gérant" in df.columns:
-        gerant_opts = sorted(df["Gérant"].dropna().astype(str).unique().tolist())
-        gerant_sel = multiselect_with_select_all("Gérant", gerant_opts, key="gerant")
-    else:
-        gerant_sel = None
-        st.info("Colonne 'Gérant' introuvable — filtre désactivé.")
+    for dim, key in FILTER_KEYS.items():
+        if dim in filter_engine:
+            selections[dim] = multiselect_with_select_all(dim, filter_engine.options(dim), key=key)
+        else:
+            st.info(f"Colonne '{dim}' introuvable — filtre désactivé.")
+
+    st.header("Filtre spatial")
+    spatial_mode = st.radio("Requête", ["Aucune", "Rayon", "Plus proches", "Polygone"], horizontal=True, key="spatial_mode")
+    spatial_center = spatial_km = spatial_k = spatial_polygon = None
+    if spatial_mode in ("Rayon", "Plus proches"):
+        spatial_center = st.text_input("Centre (adresse du portefeuille ou « lat, lon »)", key="spatial_center")
+        if spatial_mode == "Rayon":
+            spatial_km = st.number_input("Rayon (km)", 0.1, 200.0, 2.0, 0.5, key="spatial_km")
+        else:
+            spatial_k = st.number_input("Nombre d'immeubles", 1, 5000, 20, key="spatial_k")
+    elif spatial_mode == "Polygone":
+        spatial_polygon = st.file_uploader("Polygone GeoJSON (commune, secteur…)", type=["geojson", "json"], key="spatial_polygon")
+
+    st.header("Carte")
+    map_mode = st.radio("Mode d'affichage", ["Auto", "Points", "Agrégé"], horizontal=True, key="map_mode")
+    map_zoom = st.slider("Zoom initial", 6, 15, 9, key="map_zoom")
+
+    st.header("Tournée")
+    tour_dims = [d for d in TOUR_DIMENSIONS if d in filter_engine]
+    tour_dim = st.radio("Planifier par", ["Aucune"] + tour_dims, horizontal=True, key="tour_dim")
+    tour_value = None
+    if tour_dim != "Aucune":
+        tour_value = st.selectbox(tour_dim, filter_engine.options(tour_dim), key="tour_value")
+
+    st.header("Comparaison")
+    current_hashes = {p["hash"] for p in load_info["parts"]}
+    previous = {s["hash"]: s for s in list_snapshots() if s["hash"] not in current_hashes}
+    diff_hash = st.selectbox(
+        "Comparer avec un export précédent",
+        [None] + list(previous),
+        format_func=lambda h: "Aucun" if h is None else f"{previous[h]['name']}" + (f" ({previous[h]['date']})" if previous[h]["date"] else ""),
+        key="diff_hash",
+    )
+    if not previous:
+        st.caption("Aucun autre classeur en cache — chargez d'abord l'export précédent.")
 
-    if "Type" in df.columns:
-        type_opts = sorted(df["Type"].dropna().astype(str).unique().tolist())
-        type_sel = multiselect_with_select_all("Type", type_opts, key="type")
-    else:
-        type_sel = None
-        st.info("Colonne 'Type' introuvable — filtre désactivé.")
+# =========================
+# 공간 인덱스 (좌표가 바뀔 때만 재생성, 질의는 격자 셀 범위만 탐색)
+# =========================
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_spatial_index(dataset_key: str, store_version: int, _df):
+    tracer.miss()
+    return SpatialIndex(_df["latitude"], _df["longitude"])
+
+def resolve_center(text: str):
+    latlon = parse_latlon(text)
+    if latlon is not None:
+        return latlon, text
+    hits = df[df["adresse"].str.contains(text, case=False, regex=False, na=False) & df["latitude"].notna()]
+    if hits.empty:
+        return None, None
+    return (float(hits["latitude"].iloc[0]), float(hits["longitude"].iloc[0])), hits["adresse"].iloc[0]
+
+# 필터 적용 (비트맵 AND/OR → 불리언 마스크, 프레임 복사 없음)
+with tracer.span("filter") as sp:
+    mask = filter_engine.mask(selections)
+    if spatial_mode != "Aucune":
+        with tracer.span("spatial_index", cached=True):
+            spatial_index = get_spatial_index(f"{load_info['hash']}:{load_info['sheet']}", coord_store.version, df)
+        rows = None
+        t_query = time.perf_counter()
+        if spatial_mode == "Polygone" and spatial_polygon is not None:
+            try:
+                rows = spatial_index.polygon(spatial_polygon.getvalue())
+            except (ValueError, KeyError) as e:
+                st.sidebar.error(f"GeoJSON invalide : {e}")
+        elif spatial_center:
+            center, center_label = resolve_center(spatial_center)
+            if center is None:
+                st.sidebar.warning("Centre introuvable parmi les immeubles géocodés.")
+            elif spatial_mode == "Rayon":
+                rows = spatial_index.radius(*center, spatial_km)
+            else:
+                rows = spatial_index.nearest(*center, int(spatial_k))
+            if center is not None:
+                st.sidebar.caption(f"Centre : {center_label} ({center[0]:.5f}, {center[1]:.5f})")
+        if rows is not None:
+            mask &= spatial_index.mask(rows)
+            st.sidebar.caption(
+                f"{len(rows)} immeubles trouvés sur {len(spatial_index)} géocodés "
+                f"en {(time.perf_counter() - t_query) * 1000:.1f} ms"
+            )
+    df_filtered = df[mask]
+    sp.update(rows=len(df_filtered), bytes=frame_bytes(df_filtered))
 
-# 필터 적용
-df_filtered = df.copy()
-if gerant_sel is not None:
-    df_filtered = df_filtered[df_filtered["Gérant"].astype(str).isin(gerant_sel)]
-if type_sel is not None and "Type" in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered["Type"].astype(str).isin(type_sel)]
+# =========================
+# 스냅샷 비교 (Référence 해시 조인 — 이전 스냅샷은 Parquet 캐시에서 읽음)
+# =========================
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_snapshot_diff(dataset_key: str, old_hash: str, store_version: int, _df, _store):
+    tracer.miss()
+    raw_old, _ = read_snapshot(old_hash)
+    old, _ = preprocess(raw_old)
+    return diff_portfolios(_store.fill(old), _df)
+
+changes = None
+if diff_hash is not None:
+    with tracer.span("diff", cached=True) as sp:
+        changes, diff_summary = get_snapshot_diff(f"{load_info['hash']}:{load_info['sheet']}", diff_hash, coord_store.version, df, coord_store)
+        sp.update(rows=len(changes))
+    st.sidebar.caption(" · ".join(f"{k} : {v}" for k, v in diff_summary.items()) + f" — {sp['ms']:.0f} ms")
 
 #st.subheader("Tableau filtré")
 #st.dataframe(df_filtered, use_container_width=True)
 
 # =========================
-# 주소 생성
+# 주소 확인 (전처리에서 생성됨)
 # =========================
 required_cols = ["Désignation", "NPA", "Lieu", "Canton"]
 missing = [c for c in required_cols if c not in df_filtered.columns]
 if missing:
     st.error(f"Colonnes manquantes pour construire l'adresse : {', '.join(missing)}")
+    finish_trace()
     st.stop()
 if df_filtered.empty:
     st.info("Aucune ligne après filtrage.")
+    finish_trace()
     st.stop()
 
-df_filtered["adresse"] = (
-    df_filtered["Désignation"].astype(str).str.strip() + ", " +
-    df_filtered["NPA"].astype(str).str.strip() + " " +
-    df_filtered["Lieu"].astype(str).str.strip() + ", " +
-    df_filtered["Canton"].astype(str).str.strip() + ", Suisse"
-)
+# =========================
+# 색상표 (전체 데이터셋 기준 — 재실행/필터 변경에도 고정)
+# =========================
+@st.cache_resource(show_spinner=False)
+def get_color_map(dataset_key: str, color_key, _df):
+    if not color_key:
+        return {}
+    return build_cmap(sorted(_df[color_key].dropna().astype(str).unique().tolist()))
 
-# 좌표 컬럼 보장
-if "latitude" not in df_filtered.columns:
-    df_filtered["latitude"] = np.nan
-if "longitude" not in df_filtered.columns:
-    df_filtered["longitude"] = np.nan
+# =========================
+# 건물 상세 (id → 조회표, 데이터셋/좌표 버전당 1회)
+# =========================
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_details(dataset_key: str, store_version: int, _df):
+    tracer.miss()
+    return compact_details(_df, DETAIL_COLUMNS)
+
+def render_details(ids):
+    details = get_details(f"{load_info['hash']}:{load_info['sheet']}", coord_store.version, df)
+    rows = details.reindex([i for i in ids if i in details.index])
+    if changes is not None and "Référence" in rows.columns:
+        # 비교 모드: 변경 유형 / 이전 담당자 함께 표시
+        cols = [c for c in ["Référence", "Changement", "Gérant (avant)"] if c in changes.columns]
+        rows = rows.merge(changes[cols], on="Référence", how="left").set_axis(rows.index)
+    st.markdown(f"#### Immeubles sélectionnés ({len(rows)})")
+    st.dataframe(rows, use_container_width=True)
 
 # =========================
-# 기본 좌표 CSV 자동 병합
+# 투어 (같은 좌표는 한 정류장, 좌표가 같으면 캐시 재사용)
 # =========================
-try:
-    default_coords = pd.read_csv(DEFAULT_COORDS_CSV_PATH)
-    merged = False
-    if {"adresse","latitude","longitude"}.issubset(default_coords.columns):
-        df_filtered = df_filtered.merge(
-            default_coords[["adresse","latitude","longitude"]],
-            on="adresse", how="left", suffixes=("", "_def")
-        )
-        if "latitude_def" in df_filtered.columns and "longitude_def" in df_filtered.columns:
-            df_filtered["latitude"]  = df_filtered["latitude"].fillna(df_filtered["latitude_def"])
-            df_filtered["longitude"] = df_filtered["longitude"].fillna(df_filtered["longitude_def"])
-            df_filtered.drop(columns=["latitude_def","longitude_def"], inplace=True)
-        merged = True
-    if (not merged) and {"Référence","latitude","longitude"}.issubset(default_coords.columns) and "Référence" in df_filtered.columns:
-        df_filtered = df_filtered.merge(
-            default_coords[["Référence","latitude","longitude"]],
-            on="Référence", how="left", suffixes=("", "_def")
-        )
-        if "latitude_def" in df_filtered.columns and "longitude_def" in df_filtered.columns:
-            df_filtered["latitude"]  = df_filtered["latitude"].fillna(df_filtered["latitude_def"])
-            df_filtered["longitude"] = df_filtered["longitude"].fillna(df_filtered["longitude_def"])
-            df_filtered.drop(columns=["latitude_def","longitude_def"], inplace=True)
-        merged = True
-except FileNotFoundError:
-    st.warning(f"CSV lat/lon par défaut introuvable: {DEFAULT_COORDS_CSV_PATH}")
-except Exception as e:
-    st.warning(f"Impossible de fusionner le CSV par défaut: {e}")
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_tour(lat: np.ndarray, lon: np.ndarray):
+    return plan_tour(lat, lon)
+
+def build_tour(points, dim, value):
+    stops = points[points[dim].astype(str) == value].drop_duplicates(subset=["latitude", "longitude"])
+    if len(stops) < 2:
+        st.sidebar.info("Moins de deux arrêts géocodés — pas de tournée.")
+        return None
+    if len(stops) > MAX_TOUR_STOPS:
+        st.sidebar.warning(f"{len(stops)} arrêts — limitez la sélection à {MAX_TOUR_STOPS} (filtres ou filtre spatial).")
+        return None
+    lat, lon = stops["latitude"].to_numpy(float), stops["longitude"].to_numpy(float)
+    tour = cached_tour(lat, lon)
+    st.sidebar.caption(
+        f"{len(stops)} arrêts — {tour['km']:.1f} km à vol d'oiseau "
+        f"(plus proche voisin : {tour['km_nearest_neighbour']:.1f} km) · {tour['seconds']*1000:.0f} ms"
+    )
+    return stops.iloc[tour["order"]], tour_path(lat, lon, tour["order"])
 
 # =========================
 # 최종 지도 + 레전드
@@ -283,87 +453,245 @@ plotted_final = df_filtered.dropna(subset=["latitude","longitude"]).copy()
 st.markdown("### Carte (mise à jour)")
 if not plotted_final.empty:
     color_key = "Gérant group" if "Gérant group" in plotted_final.columns else ("Gérant" if "Gérant" in plotted_final.columns else None)
-    keys_final, cmap_final = assign_colors(plotted_final, color_key)
-
-    # 툴팁 필드 보정
-    for c in ["Gérant","Gérant group","Type","adresse","Nombre total d'appartements","Nombre total d'entreprises","Propriétaire"]:
-        if c not in plotted_final.columns:
-            plotted_final[c] = ""
+    with tracer.span("colour") as sp:
+        cmap_final = get_color_map(f"{load_info['hash']}:{load_info['sheet']}", color_key, df)
+        view_state2 = pdk.ViewState(
+            latitude=safe_mean(plotted_final["latitude"], 46.8182),
+            longitude=safe_mean(plotted_final["longitude"], 8.2275),
+            zoom=map_zoom
+        )
 
-    view_state2 = pdk.ViewState(
-        latitude=safe_mean(plotted_final["latitude"], 46.8182),
-        longitude=safe_mean(plotted_final["longitude"], 8.2275),
-        zoom=9
-    )
-    layer2 = pdk.Layer(
-        "ScatterplotLayer",
-        data=plotted_final,
-        get_position='[longitude, latitude]',
-        get_fill_color="color",
-        get_radius=200,      # 점 크기 — 필요시 조절
-        pickable=True,
-    )
-    st.pydeck_chart(pdk.Deck(
-        layers=[layer2],
+        clustered = use_clusters(len(plotted_final), map_zoom, map_mode)
+        if clustered:
+            # 서버 측 격자 집계 → 칸 단위 데이터만 전송
+            agg = aggregate_points(
+                plotted_final, cell_size_for_zoom(map_zoom), color_key,
+                sum_cols=["Nombre total d'appartements", "Nombre total d'entreprises"],
+            )
+            agg["dominant"] = agg[color_key] if color_key else ""
+            keys_final, _ = assign_colors(agg, color_key, cmap_final)
+            layer2 = pdk.Layer(
+                "ScatterplotLayer",
+                data=agg,
+                id="cellules",
+                get_position='[longitude, latitude]',
+                get_fill_color=FILL_COLOR_ACCESSOR,
+                get_radius="radius",
+                pickable=True,
+            )
+            tooltip_html = CLUSTER_TOOLTIP_HTML
+            st.caption(f"{len(plotted_final)} immeubles regroupés en {len(agg)} cellules.")
+        else:
+            keys_final, _ = assign_colors(plotted_final, color_key, cmap_final)
+
+            # id + 위치 + 색상만 전송 (상세는 아래 선택 패널에서 id 로 조회)
+            points, fill_accessor = point_payload(plotted_final)
+            layer2 = pdk.Layer(
+                "ScatterplotLayer",
+                data=points,
+                id=POINTS_LAYER_ID,
+                get_position=POINT_POSITION_ACCESSOR,
+                get_fill_color=fill_accessor,
+                get_radius=200,      # 점 크기 — 필요시 조절
+                pickable=True,
+            )
+            tooltip_html = TOOLTIP_HTML
+        sp.update(rows=len(layer2.data), clusters=clustered)
+
+    layers = [layer2]
+    if changes is not None:
+        # 변경 표시는 위치 + 색상만 (상세는 선택 패널 / 변경 표)
+        diff_points = changes.dropna(subset=["latitude", "longitude"])[["longitude", "latitude", "Changement"]].copy()
+        assign_change_colors(diff_points)
+        layers.append(pdk.Layer(
+            "ScatterplotLayer",
+            data=diff_points[["longitude", "latitude"] + COLOR_COLUMNS].round({"longitude": 5, "latitude": 5}),
+            get_position='[longitude, latitude]',
+            get_line_color=FILL_COLOR_ACCESSOR,
+            get_radius=DIFF_RADIUS,
+            filled=False,
+            stroked=True,
+            line_width_min_pixels=3,
+        ))
+    with tracer.span("tour"):
+        tour = build_tour(plotted_final, tour_dim, tour_value) if tour_value is not None else None
+    if tour is not None:
+        tour_stops, path = tour
+        layers.append(pdk.Layer(
+            "PathLayer",
+            data=[{"path": path}],
+            get_path="path",
+            get_color=TOUR_COLOR,
+            width_min_pixels=3,
+        ))
+
+    deck = pdk.Deck(
+        layers=layers,
         initial_view_state=view_state2,
-        tooltip={"html": TOOLTIP_HTML, "style": {"backgroundColor":"rgba(255,255,255,0.95)", "color":"black"}}
-    ))
+        tooltip={"html": tooltip_html, "style": TOOLTIP_STYLE}
+    )
+    if debug_mode:
+        # 페이로드 크기 (직렬화를 한 번 더 하므로 디버그 모드에서만)
+        with tracer.span("serialize") as sp:
+            sp["bytes"] = len(deck.to_json())
+    with tracer.span("render", rows=len(layer2.data), layers=len(layers)):
+        map_event = st.pydeck_chart(deck, on_select="rerun", selection_mode="multi-object", key="map")
 
     legend_title_final = color_key if color_key else "Catégorie"
     render_table_legend(keys_final, cmap_final, f"Légende — {legend_title_final}", cols_per_row=4)
+    if changes is not None:
+        render_table_legend(CHANGE_TYPES, CHANGE_COLORS, "Changements", cols_per_row=4)
+
+    selected_ids = [o["id"] for o in map_event.selection.get("objects", {}).get(POINTS_LAYER_ID, []) if "id" in o]
+    if selected_ids:
+        render_details(selected_ids)
+
+    if tour is not None:
+        with st.expander(f"🧭 Ordre de visite — {tour_value} ({len(tour_stops)} arrêts)"):
+            st.dataframe(
+                tour_stops[[c for c in ["Référence", "adresse", "Gérant", "Type"] if c in tour_stops.columns]]
+                .assign(**{"Ordre": range(1, len(tour_stops) + 1)}).set_index("Ordre"),
+                use_container_width=True,
+            )
 else:
     st.info("Aucun point avec coordonnées pour l’instant. Lancez le géocodage Google ou vérifiez vos filtres.")
 
+if changes is not None:
+    with st.expander(f"🔀 Changements depuis {previous[diff_hash]['name']} ({len(changes)})"):
+        cols = st.columns(len(diff_summary))
+        for col, (k, v) in zip(cols, diff_summary.items()):
+            col.metric(k, v)
+        st.dataframe(changes.drop(columns=["latitude", "longitude"]), use_container_width=True, hide_index=True)
+
 # =========================
-# Google 지오코딩 (결측만)
+# 지오코딩 (결측만 — 로컬 주소 색인 우선, 나머지만 Google)
 # =========================
-with st.expander("📍 Géocodage Google Maps (compléter les manquants)", expanded=False):
-    st.subheader("Géocodage Google Maps (compléter les manquants)")
+with st.expander("📍 Géocodage (index local + Google Maps, compléter les manquants)", expanded=False):
+    st.subheader("Géocodage (index local + Google Maps, compléter les manquants)")
+    local_geocoder = get_local_geocoder()
+    if local_geocoder is not None and local_geocoder.stale:
+        st.warning(f"Index local ({DEFAULT_LOCAL_INDEX_PATH}) créé avec un ancien format de clé — réimportez le registre avec `python import_addresses.py`.")
+    elif local_geocoder is not None:
+        st.caption(f"Index d'adresses local : {len(local_geocoder)} adresses — Google seulement pour le reste.")
+    else:
+        st.caption(f"Pas d'index local ({DEFAULT_LOCAL_INDEX_PATH}) — importez un registre avec `python import_addresses.py`.")
     limit = st.slider("Limiter le nombre d'adresses à géocoder maintenant", 10, 1000, 1000, 10)
 
     # API Key
     api_key = st.secrets.get("GOOGLE_MAPS_API_KEY", None)
     if not api_key:
         api_key = st.text_input("Entrez votre Google Maps API Key", type="password")
+    # 키가 있으면 주소 수준까지 — 도로/NPA 중심 좌표는 임시로 보고 다시 조회
+    min_precision = st.selectbox(
+        "Précision minimale acceptée (sinon Google)", PRECISION_LEVELS,
+        index=PRECISION_LEVELS.index(PRECISION_ADDRESS if api_key else PRECISION_NPA), disabled=not api_key,
+    )
+    # Google 에 이미 보낸 키는 제외 (같은 중심 좌표가 캐시에서 다시 돌아올 뿐)
+    requery = requery_mask(df_filtered, get_geocode_cache(), min_precision) if api_key else False
 
     need_geo = df_filtered[
         df_filtered["adresse"].notna() &
         (
             ("latitude" not in df_filtered.columns) |
             ("longitude" not in df_filtered.columns) |
-            df_filtered["latitude"].isna() | df_filtered["longitude"].isna()
+            df_filtered["latitude"].isna() | df_filtered["longitude"].isna() | requery
         )
     ].copy()
+    if changes is not None and st.checkbox("Seulement les immeubles ajoutés depuis l'export précédent", value=True):
+        # 나머지는 이전 실행에서 이미 좌표를 얻었거나 시도했음
+        need_geo = need_geo[need_geo["Référence"].isin(changes.loc[changes["Changement"] == ADDED, "Référence"])]
 
-    to_geocode = need_geo["adresse"].dropna().unique().tolist()[:limit]
+    # 정규 주소 키 기준 중복 제거 → 변형 주소마다 유료 조회하지 않음
+    need_addr = need_geo["adresse"].dropna()
+    n_to_geocode = min(int((~address_key_series(need_addr).duplicated()).sum()), limit)
+    lookups = lookup_stats(need_addr)
+    job_runner = get_job_runner()
 
     col1, col2 = st.columns(2)
     with col1:
-        st.write(f"Adresses sans coordonnées (sélection) : **{len(to_geocode)}**")
+        st.write(f"Adresses sans coordonnées ou à préciser (sélection) : **{n_to_geocode}**")
+        st.caption(f"{lookups['distinctes (brutes)']} variantes d'adresse → {lookups['distinctes (clés)']} recherches distinctes")
     with col2:
-        start_geo = st.button("🚀 Lancer le géocodage Google")
+        job_busy = job_runner.job is not None and job_runner.job.running
+        start_geo = st.button("🚀 Lancer le géocodage", disabled=job_busy)
+        if job_runner.job is not None and job_runner.job.state in (CANCELLED, FAILED):
+            st.caption("Relancer reprend où le travail s'est arrêté : les lots terminés sont déjà enregistrés.")
 
     if start_geo:
-        if not api_key:
-            st.error("Veuillez saisir votre **Google Maps API Key**.")
+        if not api_key and local_geocoder is None:
+            st.error("Veuillez saisir votre **Google Maps API Key** ou importer un index d'adresses local.")
+            finish_trace()
             st.stop()
-        mapping = gmaps_geocode_batch(tuple(to_geocode), api_key)
-        mask_map = df_filtered["adresse"].isin(mapping.keys())
-        df_filtered.loc[mask_map, "latitude"]  = df_filtered.loc[mask_map, "adresse"].map(lambda a: mapping.get(a,(None,None))[0])
-        df_filtered.loc[mask_map, "longitude"] = df_filtered.loc[mask_map, "adresse"].map(lambda a: mapping.get(a,(None,None))[1])
-        st.success("Géocodage Google terminé pour le lot courant.")
-
-# 좌표 CSV 다운로드
-    save_cols = [c for c in [
-        "Référence","Gérant","Gérant group","Type",
-        "Désignation","NPA","Lieu","Canton",
-        "adresse","latitude","longitude",
-        "Nombre total d'appartements","Nombre total d'entreprises","Propriétaire"
-    ] if c in plotted_final.columns]
-    export_df = plotted_final[save_cols].copy()
+        # 결과는 배치마다 좌표 저장소에 기록 → 중단돼도 다음 실행은 남은 주소만
+        job = GeocodeJob(get_geocoder(api_key, min_precision), coord_store, need_geo, limit=limit)
+        with tracer.span("geocode", addresses=job.total):
+            submitted = job_runner.submit(job)
+        if submitted:
+            finish_trace()
+            st.rerun()
+        st.warning("Un géocodage est déjà en cours.")
+
+    # 진행 패널: 작업 중에만 주기적으로 갱신, 새 좌표가 쌓이면 지도를 다시 그림
+    @st.fragment(run_every=JOB_POLL_SECONDS if job_runner.job is not None and job_runner.job.running else None)
+    def geocode_job_panel():
+        job = job_runner.job
+        if job is None:
+            return
+        p = job.progress()
+        st.progress(p["done"] / p["total"] if p["total"] else 1.0, text=f"{p['done']} / {p['total']} adresses — {p['state']}")
+        eta = f", reste ~{p['eta']:.0f} s" if p["eta"] is not None else ""
+        st.caption(
+            f"{p['rate']:.1f} adresses/s{eta} · {p['saved']} lignes enregistrées · {p['cache_hits']} en cache, "
+            f"{p['local']} index local, {p['api_calls']} appels API, {p['elapsed']:.1f} s"
+            + (" · précision : " + ", ".join(f"{k} {v}" for k, v in p["precision"].items()) if p["precision"] else "")
+        )
+        if p["state"] == FAILED:
+            st.error(f"Le géocodage a échoué : {p['error']}")
+        elif p["state"] == DONE:
+            st.success(f"Géocodage terminé — {p['saved']} lignes ajoutées à {DEFAULT_COORDS_CSV_PATH}.")
+        if job.running and st.button("⏹️ Annuler", key="cancel_geo"):
+            job.cancel()
+
+        # 저장소 버전이 바뀌었으면 전체 재실행 → 캐시 키가 바뀌어 새 점이 지도에 나타남
+        seen = st.session_state.get("map_store_version", coord_store.version)
+        last = st.session_state.get("map_refreshed_at", 0.0)
+        if coord_store.version != seen and (not job.running or time.time() - last >= MAP_REFRESH_SECONDS):
+            st.session_state["map_refreshed_at"] = time.time()
+            st.rerun()
+        elif not job.running and st.session_state.get("job_polling"):
+            # 마지막 갱신 후 폴링 중지
+            st.session_state["job_polling"] = False
+            st.rerun()
+        st.session_state["job_polling"] = job.running
+
+    geocode_job_panel()
+
+# =========================
+# 내보내기 (클릭할 때만 생성 — 필터 상태별 디스크 캐시, 청크 단위 기록)
+# =========================
+with st.expander("⬇️ Exporter le portefeuille filtré", expanded=False):
+    n_geocoded = int(df_filtered["latitude"].notna().sum())
+    st.caption(
+        f"{len(df_filtered)} immeubles, dont {n_geocoded} géocodés — colonnes « {PRECISION_COLUMN} » "
+        f"et « {GEOCODE_STATUS_COLUMN} » incluses."
+    )
+    export_fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_fmt")
+    ext, mime = EXPORT_FORMATS[export_fmt]
+    # 값 고정: 콜백은 클릭 시 별도 스레드에서 실행됨
+    export_rows, export_coords_stamp = df_filtered, coord_store.stamp
+
+    def export_portfolio():
+        key = export_key(f"{load_info['hash']}:{load_info['sheet']}", export_coords_stamp, export_rows.index, export_fmt)
+        # Streamlit 은 반환값(바이트든 파일 핸들이든)을 통째로 읽어 메모리 미디어 저장소에 보관함
+        # → 파일 전체가 메모리에 올라감. 핸들을 넘겨도 이득이 없고 닫히지도 않으므로 바이트로 반환
+        return Path(build_export(export_rows, export_fmt, key)).read_bytes()
+
     st.download_button(
-        label="⬇️ Télécharger CSV (lat/lon inclus)",
-        data=export_df.to_csv(index=False).encode("utf-8"),
-        file_name="rilsa_coords.csv",
-        mime="text/csv"
-    )
\ No newline at end of file
+        label=f"⬇️ Télécharger {export_fmt}",
+        data=export_portfolio,
+        file_name=f"rilsa_portefeuille.{ext}",
+        mime=mime,
+        on_click="ignore",
+    )
+
+finish_trace(rows=len(df), rows_filtered=len(df_filtered), rows_plotted=len(plotted_final))
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from rilsa.address import address_key_series, parse_designation
+
+
+def keys(*addresses):
+    return address_key_series(pd.Series(list(addresses), dtype=object)).tolist()
+
+
+@pytest.mark.parametrize("a, b", [
+    # 날짜 도로명: 앞의 숫자는 번지가 아님
+    ("Avenue du 14-Avril 3, 1020 Renens", "Avenue du 14-Avril 27, 1020 Renens"),
+    ("Rue du 31-Décembre 10, 1207 Genève", "Rue du 31-Décembre 42, 1207 Genève"),
+    ("14 Avril 27-29, 1020 Renens", "14 Avril 3, 1020 Renens"),
+    # 도로 유형은 키에 남음
+    ("Rue de Lausanne 10, 1004 Lausanne", "Avenue de Lausanne 10, 1004 Lausanne"),
+    ("Place de la Gare 1, 1003 Lausanne", "Rue de la Gare 1, 1003 Lausanne"),
+    ("Chemin des Cèdres 9, 1000 Lausanne", "Chemin des Cèdres 9bis, 1000 Lausanne"),
+])
+def test_distinct_buildings_get_distinct_keys(a, b):
+    ka, kb = keys(a, b)
+    assert ka != kb
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Av. Vinet 33, 1004 Lausanne", "Avenue Vinet 33, 1004 Lausanne"),
+    ("Avenue  Vinet 33 , 1004 Lausanne", "avenue vinet 33, 1004 Lausanne"),
+    ("Rue de la Gare 1, 1003 Lausanne", "Rue la Gare 1, 1003 Lausanne"),
+    ("Dapples 44-46, 1006 Lausanne", "Dapples 44, 1006 Lausanne"),
+])
+def test_spelling_variants_share_a_key(a, b):
+    ka, kb = keys(a, b)
+    assert ka == kb
+
+
+def test_numeric_street_name_keeps_house_number():
+    parts = parse_designation(pd.Series(["14 Avril 27-29", "Avenue du 14-Avril 3", "Rue du 1er-Mars 5", "Vignes 13 D"]))
+    assert parts["number"].tolist() == ["27", "3", "5", "13"]
+    assert parts["suffix"].tolist() == ["", "", "", "d"]
+    assert keys("14 Avril 27-29, 1020 Renens") == ["14 avril 27|1020"]
+
+
+def test_empty_address_has_empty_key():
+    assert keys(None, "", "  ") == ["", "", ""]
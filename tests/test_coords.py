@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from rilsa.coords import PRECISION_COLUMN, CoordinateStore, write_coords_csv
+
+# 같은 정규 주소 키 ("casino 45|1820") 를 쓰는 두 건물 — 주차장 행이 나중에 기록됨
+COORDS = pd.DataFrame({
+    "Référence": [115800, 116000],
+    "adresse": ["Casino 45, 1820 Montreux", "Casino 45 (parking/vitrines), 1820 Montreux"],
+    "latitude": [46.4304, 46.4650],
+    "longitude": [6.9113, 6.9400],
+    PRECISION_COLUMN: ["adresse", "adresse"],
+})
+
+
+def store_with(tmp_path, coords=COORDS):
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(coords, path)
+    return CoordinateStore(path)
+
+
+def test_reference_match_wins_over_address_key(tmp_path):
+    store = store_with(tmp_path)
+    lat, lon, _ = store.lookup(COORDS[["Référence", "adresse"]])
+    assert lat.tolist() == [46.4304, 46.4650]
+    assert lon.tolist() == [6.9113, 6.9400]
+
+def test_address_key_fills_rows_without_reference_match(tmp_path):
+    store = store_with(tmp_path)
+    df = pd.DataFrame({"Référence": [999, np.nan], "adresse": ["Casino  45, 1820 Montreux", "Rue Inconnue 1, 1000 Lausanne"]})
+    lat, _, precision = store.lookup(df)
+    assert lat[0] in (46.4304, 46.4650)
+    assert precision[0] == "adresse"
+    assert np.isnan(lat[1]) and precision[1] is None
+
+def test_fill_keeps_existing_coordinates(tmp_path):
+    store = store_with(tmp_path)
+    df = pd.DataFrame({
+        "Référence": [115800, 116000], "adresse": COORDS["adresse"],
+        "latitude": [1.0, np.nan], "longitude": [2.0, np.nan], PRECISION_COLUMN: ["npa", None],
+    })
+    out = store.fill(df)
+    assert out["latitude"].tolist() == [1.0, 46.4650]
+    assert out[PRECISION_COLUMN].tolist() == ["npa", "adresse"]
+
+def test_added_rows_are_found_by_reference(tmp_path):
+    store = store_with(tmp_path, COORDS.iloc[:1])
+    store.add(COORDS.iloc[1:])
+    lat, _, _ = CoordinateStore(store.path).lookup(COORDS[["Référence", "adresse"]])
+    assert lat.tolist() == [46.4304, 46.4650]
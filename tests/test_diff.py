@@ -0,0 +1,51 @@
+import pandas as pd
+
+from rilsa.diff import ADDED, REASSIGNED, REMOVED, UNITS_CHANGED, diff_portfolios
+
+APTS, SHOPS = "Nombre total d'appartements", "Nombre total d'entreprises"
+
+
+def snapshot(rows):
+    return pd.DataFrame(rows, columns=["Référence", "Gérant", APTS, SHOPS, "adresse"])
+
+
+OLD = snapshot([
+    (1, "A", 10, 0, "Rue 1"),
+    (2, "A", 5, 1, "Rue 2"),
+    (3, "B", 8, 0, "Rue 3"),
+    (4, "B", 3, 0, "Rue 4"),
+    (5, "C", 2, 2, "Rue 5"),
+])
+NEW = snapshot([
+    (1, "A", 10.0, 0, "Rue 1"),  # int → float: inchangé
+    (2, "B", 5, 1, "Rue 2"),     # réattribué
+    (3, "C", 9, 0, "Rue 3"),     # réattribué + unités → compté une seule fois (réattribué)
+    (4, "B", 4, 0, "Rue 4"),     # unités
+    (6, "A", 1, 0, "Rue 6"),     # ajouté
+])
+
+
+def test_summary_counts_match_listed_rows():
+    changes, summary = diff_portfolios(OLD, NEW)
+    listed = changes["Changement"].value_counts()
+    for change in (ADDED, REMOVED, REASSIGNED, UNITS_CHANGED):
+        assert summary[change] == listed.get(change, 0), change
+    assert summary == {ADDED: 1, REMOVED: 1, REASSIGNED: 2, UNITS_CHANGED: 1, "inchangés": 1}
+
+def test_each_reference_is_listed_once():
+    changes, _ = diff_portfolios(OLD, NEW)
+    assert changes["Référence"].is_unique
+    assert changes.set_index("Référence")["Changement"].to_dict() == {
+        6: ADDED, 5: REMOVED, 2: REASSIGNED, 3: REASSIGNED, 4: UNITS_CHANGED,
+    }
+
+def test_previous_values_are_kept():
+    changes, _ = diff_portfolios(OLD, NEW)
+    row = changes.set_index("Référence").loc[3]
+    assert row["Gérant (avant)"] == "B"
+    assert row[f"{APTS} (avant)"] == 8
+
+def test_identical_snapshots_have_no_changes():
+    changes, summary = diff_portfolios(OLD, OLD.copy())
+    assert changes.empty
+    assert summary["inchangés"] == len(OLD)
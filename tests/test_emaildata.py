@@ -0,0 +1,70 @@
+import pandas as pd
+
+from rilsa.emaildata import EmailCube, drop_ungrouped, load_grouped_report, merge_groups, to_long
+
+GROUPS = pd.DataFrame({
+    "Display Name": ["Lucy Niggli", "Rodolph Huber", "Merry Curchod", "Anna Compta", "Lucy Niggli"],
+    "Group": ["Nyon", "Lausanne", "Direction", "Compta", "Doublon"],
+})
+REPORT = pd.DataFrame({
+    "Report Refresh Date": ["2026-10-01"] * 6,
+    "User Principal Name": ["lucy@x.ch", "rodolph@x.ch", "merry@x.ch", "anna@x.ch", "inconnu@x.ch", "lucy@x.ch"],
+    "Display Name": [" lucy niggli", "Rodolph Huber", "Merry Curchod", "Anna Compta", "Inconnu", "Lucy Niggli "],
+    "Report Period": [7] * 6,
+    "Send Count": [10, 20, 30, 40, 50, 1],
+    "Receive Count": [100, 200, 300, 400, 500, 2],
+    "Read Count": [1, 2, 3, 4, 5, 6],
+})
+
+
+def merged():
+    return drop_ungrouped(merge_groups(REPORT, GROUPS))
+
+
+# =========================
+# 병합 (이름 정규화, 첫 그룹 우선, Compta/그룹 없음 제거)
+# =========================
+def test_merge_normalises_names_and_drops_ungrouped():
+    m = merged()
+    assert m["Display Name_csv"].tolist() == [" lucy niggli", "Rodolph Huber", "Merry Curchod", "Lucy Niggli "]
+    assert m["Group"].tolist() == ["Nyon", "Lausanne", "Direction", "Nyon"]
+
+
+# =========================
+# 큐브 슬라이스 = 원본 groupby
+# =========================
+def test_cube_by_person_matches_groupby():
+    m = merged()
+    cube = EmailCube(m)
+    got = cube.by_person(metrics=["reçu", "envoyé", "lu"]).set_index("Display Name_csv")
+    expected = m.groupby("Display Name_csv")[["Receive Count", "Send Count", "Read Count"]].sum()
+    assert got.loc[expected.index].to_numpy().tolist() == expected.to_numpy().tolist()
+    assert cube.persons() == sorted(expected.index)
+    assert cube.by_person(persons=["Rodolph Huber"])["envoyé"].tolist() == [20]
+
+def test_cube_by_group_excludes_groups():
+    cube = EmailCube(merged())
+    assert cube.groups() == ["Lausanne", "Nyon"]
+    got = cube.by_group()
+    assert dict(zip(got["Group"], got["envoyé"])) == {"Lausanne": 20, "Nyon": 11}
+    assert cube.by_group(groups=["Nyon"], metrics=["reçu"])["reçu"].tolist() == [102]
+    assert cube.by_group(exclude=[])["Group"].tolist() == ["Direction", "Lausanne", "Nyon"]
+
+def test_to_long():
+    long = to_long(EmailCube(merged()).by_group(), "Group")
+    assert long.columns.tolist() == ["Group", "Type", "Nombre"]
+    assert len(long) == 4
+
+
+# =========================
+# 청크 로더 = 한 번에 병합
+# =========================
+def test_chunked_report_matches_single_merge():
+    source = REPORT.assign(Extra="x").to_csv(index=False).encode()
+    got = load_grouped_report(source, GROUPS, chunksize=2)
+    expected = merged().reset_index(drop=True)
+    assert "Extra" not in got.columns
+    assert got["Display Name_csv"].astype(str).tolist() == expected["Display Name_csv"].tolist()
+    assert got["Group"].astype(str).tolist() == expected["Group"].tolist()
+    assert got["Send Count"].dtype == "int32"
+    assert got["Send Count"].tolist() == expected["Send Count"].tolist()
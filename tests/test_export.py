@@ -0,0 +1,63 @@
+import pandas as pd
+
+from rilsa.coords import CoordinateStore, write_coords_csv
+from rilsa.export import build_export, export_key
+
+ROWS = pd.DataFrame({
+    "Référence": [1, 2],
+    "adresse": ["Avenue Vinet 33, 1004 Lausanne", "Rue de Bourg 1, 1003 Lausanne"],
+    "latitude": [46.52, 46.51],
+    "longitude": [6.62, 6.63],
+})
+
+
+def key_for(store, fmt="CSV"):
+    return export_key("dataset", store.stamp, ROWS.index, fmt)
+
+
+def test_restart_reuses_the_export_for_the_same_file(tmp_path):
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(ROWS, path)
+    # 재시작 = 새 저장소 인스턴스 (메모리 버전은 0 부터)
+    assert key_for(CoordinateStore(path)) == key_for(CoordinateStore(path))
+
+def test_new_coordinates_change_the_key(tmp_path):
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(ROWS.iloc[:1], path)
+    store = CoordinateStore(path)
+    before = key_for(store)
+    store.add(ROWS.iloc[1:])
+    assert key_for(store) != before
+    assert key_for(CoordinateStore(path)) == key_for(store)
+
+def test_rebuild_changes_the_key(tmp_path):
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(ROWS, path)
+    store = CoordinateStore(path)
+    before = key_for(store)
+    # 야간 rebuild_coords: 같은 크기의 파일이라도 os.replace → 새 inode
+    write_coords_csv(ROWS.assign(latitude=[46.53, 46.54]), path)
+    assert store.refresh()
+    assert key_for(store) != before
+
+def test_format_and_rows_are_part_of_the_key(tmp_path):
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(ROWS, path)
+    store = CoordinateStore(path)
+    assert key_for(store, "CSV") != key_for(store, "Parquet")
+    assert export_key("dataset", store.stamp, ROWS.index[:1], "CSV") != key_for(store)
+
+def test_cached_export_is_reused_and_stale_one_is_not(tmp_path):
+    export_dir = str(tmp_path / "exports")
+    path = str(tmp_path / "coords.csv")
+    write_coords_csv(ROWS, path)
+    store = CoordinateStore(path)
+    first = build_export(ROWS, "CSV", key_for(store), export_dir)
+    assert build_export(ROWS.assign(latitude=0.0), "CSV", key_for(store), export_dir) == first
+    assert pd.read_csv(first)["latitude"].tolist() == [46.52, 46.51]
+
+    write_coords_csv(ROWS.assign(latitude=[46.53, 46.54]), path)
+    store.refresh()
+    fresh = build_export(ROWS.assign(latitude=[46.53, 46.54]), "CSV", key_for(store), export_dir)
+    assert fresh != first
+    assert pd.read_csv(fresh)["latitude"].tolist() == [46.53, 46.54]
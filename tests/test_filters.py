@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rilsa.filters import FilterEngine
+
+rng = np.random.default_rng(0)
+DF = pd.DataFrame({
+    "Lieu": rng.choice(["Lausanne", "Pully", "Nyon", "Sion", None], 5_000),
+    "Canton": rng.choice(["VD", "GE", "VS"], 5_000),
+    "Type": rng.choice(["PPE", "Gérance"], 5_000),
+})
+
+
+@pytest.mark.parametrize("selections", [
+    {},
+    {"Lieu": ["Pully"]},
+    {"Lieu": ["Pully", "Nyon", "Inconnu"], "Canton": ["VD"]},
+    {"Lieu": [], "Canton": None},
+    {"Lieu": ["Lausanne", "Pully", "Nyon", "Sion"], "Type": ["PPE"]},
+])
+def test_mask_matches_isin(selections):
+    expected = np.ones(len(DF), dtype=bool)
+    engine = FilterEngine(DF, dimensions=list(DF.columns))
+    for dim, selected in selections.items():
+        # 전체 선택은 필터 없음 (결측 행도 유지)
+        if selected is not None and not set(selected) >= set(engine.options(dim)):
+            expected &= DF[dim].isin(selected).to_numpy()
+    mask = engine.mask(selections)
+    assert mask.dtype == bool
+    assert (mask == expected).all()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import rebuild_coords
+from rilsa.geocoding import GeocodeCache, Geocoder
+
+WORKBOOK = Path(__file__).resolve().parent.parent / "KPI_-_Repartition_portefeuille-20250716.xlsx"
+
+
+# =========================
+# 로컬 스텁 지오코더 (Google Geocoding API 응답 형식)
+# =========================
+class StubGeocoder:
+    def __init__(self):
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                address = parse_qs(urlparse(self.path).query)["address"][0]
+                with stub._lock:
+                    stub.requests[address] += 1
+                    n = stub.requests[address]
+                status, body = stub.respond(address, n)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/geocode/json"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @staticmethod
+    def respond(address: str, n: int):
+        # "nowhere" → ZERO_RESULTS, "flaky" → 첫 요청 OVER_QUERY_LIMIT, "busy" → 첫 요청 HTTP 503, "down" → 항상 503
+        if "down" in address or ("busy" in address and n == 1):
+            return 503, {}
+        if "flaky" in address and n == 1:
+            return 200, {"status": "OVER_QUERY_LIMIT", "results": []}
+        h = int(hashlib.md5(address.encode()).hexdigest(), 16)
+        if "nowhere" in address or h % 10 == 0:
+            return 200, {"status": "ZERO_RESULTS", "results": []}
+        location = {"lat": 46 + (h % 1000) / 1000, "lng": 6 + (h // 1000 % 1000) / 1000}
+        return 200, {"status": "OK", "results": [{"geometry": {"location_type": "ROOFTOP", "location": location}}]}
+
+    @property
+    def total(self) -> int:
+        return sum(self.requests.values())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubGeocoder() as s:
+        yield s
+
+
+def make_geocoder(stub, tmp_path, **kwargs):
+    kwargs = {"rate": 0, "backoff": 0.01, **kwargs}
+    return Geocoder("test", GeocodeCache(str(tmp_path / "cache.sqlite")), url=stub.url, **kwargs)
+
+
+# =========================
+# 캐시
+# =========================
+def test_rerun_is_served_from_cache(stub, tmp_path):
+    addresses = [f"Avenue Vinet {i}, 1004 Lausanne" for i in range(1, 6) if i != 3]
+    first = make_geocoder(stub, tmp_path).geocode_many(addresses)
+    assert stub.total == len(addresses)
+
+    # 새 프로세스와 같은 조건: 캐시 파일만 공유
+    geocoder = make_geocoder(stub, tmp_path)
+    again = geocoder.geocode_many(addresses)
+    assert stub.total == len(addresses)
+    assert geocoder.last_run["api_calls"] == 0
+    assert geocoder.last_run["cache_hits"] == len(addresses)
+    assert again == first
+
+def test_spelling_variants_share_one_request(stub, tmp_path):
+    geocoder = make_geocoder(stub, tmp_path)
+    out = geocoder.geocode_many(["Av. Vinet 33, 1004 Lausanne", "Avenue  Vinet 33, 1004 Lausanne"])
+    assert stub.total == 1
+    assert len(set(out.values())) == 1
+
+def test_only_new_addresses_are_fetched(stub, tmp_path):
+    geocoder = make_geocoder(stub, tmp_path)
+    geocoder.geocode_many(["Rue de Bourg 1, 1003 Lausanne", "Rue de Bourg 2, 1003 Lausanne"])
+    geocoder.geocode_many(["Rue de Bourg 1, 1003 Lausanne", "Rue de Bourg 2, 1003 Lausanne", "Rue de Bourg 4, 1003 Lausanne"])
+    assert geocoder.last_run["api_calls"] == 1
+    assert stub.requests["Rue de Bourg 4, 1003 Lausanne"] == 1
+
+def test_zero_results_is_cached_negatively(stub, tmp_path):
+    geocoder = make_geocoder(stub, tmp_path)
+    out = geocoder.geocode_many(["Chemin nowhere 1, 1000 Lausanne"])
+    assert out["Chemin nowhere 1, 1000 Lausanne"] == (None, None, None)
+    geocoder.geocode_many(["Chemin nowhere 1, 1000 Lausanne"])
+    assert stub.total == 1
+    # 유효기간이 지난 음성 캐시는 다시 조회 대상
+    assert geocoder.cache.get_many(["chemin nowhere 1|1000"], negative_ttl=-1) == {}
+
+
+# =========================
+# 재시도 / 백오프
+# =========================
+def test_retries_transient_statuses_with_backoff(stub, tmp_path):
+    geocoder = make_geocoder(stub, tmp_path, backoff=0.05)
+    t0 = time.perf_counter()
+    out = geocoder.geocode_many(["Rue flaky 1, 1003 Lausanne", "Rue busy 2, 1003 Lausanne"])
+    assert all(lat is not None for lat, _, _ in out.values())
+    assert stub.requests["Rue flaky 1, 1003 Lausanne"] == 2
+    assert stub.requests["Rue busy 2, 1003 Lausanne"] == 2
+    assert time.perf_counter() - t0 >= 0.05
+
+def test_gives_up_after_retries_and_does_not_cache_errors(stub, tmp_path):
+    geocoder = make_geocoder(stub, tmp_path, retries=2)
+    out = geocoder.geocode_many(["Rue down 1, 1003 Lausanne"])
+    assert out["Rue down 1, 1003 Lausanne"] == (None, None, None)
+    assert stub.requests["Rue down 1, 1003 Lausanne"] == 3
+    # 일시 오류는 캐시하지 않음 → 다음 실행에서 다시 시도
+    geocoder.geocode_many(["Rue down 1, 1003 Lausanne"])
+    assert stub.requests["Rue down 1, 1003 Lausanne"] == 6
+
+
+# =========================
+# rebuild_coords (cron 경로)
+# =========================
+@pytest.mark.skipif(not WORKBOOK.exists(), reason="classeur KPI absent")
+def test_rebuild_then_rerun_makes_no_network_calls(stub, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 스냅샷 캐시(.cache)도 임시 디렉터리에
+    output = tmp_path / "coords.csv"
+    argv = [
+        str(WORKBOOK), "--output", str(output), "--cache", str(tmp_path / "cache.sqlite"),
+        "--local-index", str(tmp_path / "absent.sqlite"), "--api-key", "test",
+        "--geocode-url", stub.url, "--rate", "0", "--workers", "16", "--quiet",
+    ]
+    assert rebuild_coords.main(argv) == rebuild_coords.EXIT_OK
+    first = stub.total
+    assert first > 0
+    coords = pd.read_csv(output)
+    assert coords["latitude"].notna().all()
+
+    assert rebuild_coords.main(argv) == rebuild_coords.EXIT_OK
+    assert stub.total == first
+    assert len(pd.read_csv(output)) == len(coords)
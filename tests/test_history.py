@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from rilsa.history import EmailHistory
+
+
+def report(date, rows, period=7):
+    # rows: (upn, 이름, 발신, 수신)
+    return pd.DataFrame({
+        "Report Refresh Date": [date] * len(rows),
+        "User Principal Name": [r[0] for r in rows],
+        "Display Name": [r[1] for r in rows],
+        "Report Period": [period] * len(rows),
+        "Send Count": [r[2] for r in rows],
+        "Receive Count": [r[3] for r in rows],
+    })
+
+# 2026-10-05 / 07 = W41, 2026-10-12 = W42
+W41 = report("2026-10-05", [("lucy@x.ch", "Lucy Niggli", 10, 100), ("rodolph@x.ch", "Rodolph Huber", 20, 200)])
+W41_LATER = report("2026-10-07", [("LUCY@x.ch ", "Lucy Niggli", 14, 140)])
+W42 = report("2026-10-12", [("lucy@x.ch", "Lucy Niggli", 60, 600), ("rodolph@x.ch", "Rodolph Huber", 0, 0)], period=30)
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = EmailHistory(str(tmp_path / "history.sqlite"))
+    h.ingest(W41, "a")
+    h.ingest(W42, "b")
+    return h
+
+def trend(history, by="person"):
+    return history.trend(by).set_index([{"person": "Display Name", "group": "Group"}[by], "week"])
+
+
+# =========================
+# 적재: 주 단위, 최신 보고서 우선, 같은 파일은 한 번만
+# =========================
+def test_weeks_and_duplicate_source(history):
+    assert history.weeks() == ["2026-W41", "2026-W42"]
+    assert history.ingest(W41, "a") == {"status": "déjà importé", "rows": 0}
+
+def test_latest_report_of_the_week_wins(history):
+    t = trend(history)
+    assert t.loc[("Lucy Niggli", "2026-W41"), "envoyé"] == 10
+    # UPN 정규화 + 같은 주의 더 최근 보고서가 덮어씀, 오래된 보고서는 다시 덮지 못함
+    history.ingest(W41_LATER, "c")
+    history.ingest(report("2026-10-06", [("lucy@x.ch", "Lucy Niggli", 99, 990)]), "d")
+    assert trend(history).loc[("Lucy Niggli", "2026-W41"), "envoyé"] == 14
+
+def test_trend_is_normalised_to_seven_days(history):
+    t = trend(history)
+    # 30일 기간 → 7일 평균: 60 · 7 / 30 = 14
+    assert t.loc[("Lucy Niggli", "2026-W42"), "envoyé"] == pytest.approx(14)
+    assert t.loc[("Lucy Niggli", "2026-W42"), "envoyé Δ%"] == pytest.approx(40)
+    assert pd.isna(t.loc[("Lucy Niggli", "2026-W41"), "envoyé Δ%"])
+    assert t.loc[("Rodolph Huber", "2026-W42"), "envoyé Δ%"] == pytest.approx(-100)
+
+
+# =========================
+# 그룹 귀속 / 버전
+# =========================
+def test_group_trend_follows_attribution(history):
+    assert history.trend("group").empty
+    version = history.version
+    assignments = pd.DataFrame({"upn": ["lucy@x.ch", "rodolph@x.ch"], "Group": ["Nyon", "Nyon"]})
+    assert history.set_attribution(assignments)
+    assert history.version > version
+    t = trend(history, "group")
+    assert t.loc[("Nyon", "2026-W41"), "reçu"] == 300
+    # 같은 귀속이면 다시 집계하지 않음
+    version = history.version
+    assert not history.set_attribution(assignments.iloc[::-1])
+    assert history.version == version
+
+def test_existing_history_is_aggregated_on_open(history):
+    with history._lock:
+        history._conn.execute("DELETE FROM weekly_agg")
+        history._conn.commit()
+    reopened = EmailHistory(history.path)
+    assert len(reopened.trend()) == 4
+    assert sorted(reopened.people()["Display Name"]) == ["Lucy Niggli", "Rodolph Huber"]
@@ -0,0 +1,89 @@
+import pandas as pd
+
+from rilsa.identity import PENDING, UNMATCHED, IdentityMap, IdentityResolver
+
+GROUPS = pd.DataFrame({
+    "Display Name": ["Anne MARTIN", "MARTIN Anne", "DUPONT Luc", "NIGGLI Lucy", "HUBER Rodolph"],
+    "User Principal Name": ["a.martin@rilsa.ch", "anne.martin@rilsa.ch", "l.dupont@rilsa.ch", None, "r.huber@rilsa.ch"],
+    "Group": ["SHO", "Nyon", "Montreux", "SHO", "Technique"],
+})
+
+
+def resolve(resolver, names, upns=None):
+    data = pd.DataFrame({"Display Name": names})
+    if upns is not None:
+        data["User Principal Name"] = upns
+    return resolver.keys_for(data).tolist()
+
+def status(resolver, name):
+    report = resolver.unmatched_report().set_index("Display Name")
+    return report.loc[name, "Statut"], report.loc[name, "Proposition"]
+
+
+# =========================
+# 매칭 순서
+# =========================
+def test_upn_wins_over_display_name():
+    # 표시 이름은 "MARTIN Anne" 과 정확히 같지만 UPN 은 다른 사람
+    assert resolve(IdentityResolver(GROUPS), ["MARTIN Anne"], ["A.Martin@rilsa.ch "]) == ["anne martin"]
+
+def test_exact_name_wins_over_token_order():
+    assert resolve(IdentityResolver(GROUPS), ["MARTIN Anne", "martin anne "]) == ["martin anne", "martin anne"]
+
+def test_token_order_is_matched_without_review():
+    resolver = IdentityResolver(GROUPS)
+    assert resolve(resolver, ["Rodolph Huber", "Lucy  NIGGLI"]) == ["huber rodolph", "niggli lucy"]
+    assert resolver.stats["tokens"] == 2
+
+def test_confirmed_proposal_is_applied_on_next_run(tmp_path):
+    mapping = IdentityMap(str(tmp_path / "identity.sqlite"))
+    resolver = IdentityResolver(GROUPS, mapping)
+    assert pd.isna(resolve(resolver, ["DUPOND Luc"])[0])
+    resolver.confirm(resolver.unmatched_report())
+    assert mapping.confirmed() == 1
+    assert resolve(IdentityResolver(GROUPS, mapping), ["DUPOND Luc"]) == ["dupont luc"]
+
+
+# =========================
+# 퍼지 제안 (성 유사도 게이트)
+# =========================
+def test_surname_typo_gets_a_pending_proposal():
+    resolver = IdentityResolver(GROUPS)
+    assert pd.isna(resolve(resolver, ["DUPOND Luc"])[0])
+    assert status(resolver, "DUPOND Luc") == (PENDING, "DUPONT Luc")
+
+def test_different_family_name_is_never_attributed():
+    # MARTINEZ ≠ MARTIN: 제안은 될 수 있어도 확인 전에는 귀속하지 않음
+    resolver = IdentityResolver(GROUPS)
+    assert pd.isna(resolve(resolver, ["MARTINEZ Anne"])[0])
+    assert status(resolver, "MARTINEZ Anne")[0] == PENDING
+    assert resolver.stats["pending"] == 1
+
+def test_dissimilar_surname_is_not_proposed():
+    resolver = IdentityResolver(GROUPS)
+    assert pd.isna(resolve(resolver, ["BERNARD Anne"])[0])
+    statut, proposition = status(resolver, "BERNARD Anne")
+    assert statut == UNMATCHED and pd.isna(proposition)
+
+
+# =========================
+# 청크 처리
+# =========================
+def test_each_person_is_resolved_once_across_chunks():
+    resolver = IdentityResolver(GROUPS)
+    chunk = pd.DataFrame({
+        "Display Name": ["MARTIN Anne", "Rodolph Huber", "MARTIN Anne", "DUPOND Luc"] * 3,
+        "User Principal Name": [None, "r.huber@rilsa.ch", None, None] * 3,
+    })
+    for _ in range(2):
+        keys = resolver.keys_for(chunk)
+        assert keys.index.equals(chunk.index)
+        assert keys.tolist()[:3] == ["martin anne", "huber rodolph", "martin anne"]
+    assert dict(resolver.stats) == {"exact": 1, "upn": 1, "pending": 1}
+
+def test_trigram_index_is_built_only_for_unmatched_names():
+    resolver = IdentityResolver(GROUPS)
+    resolve(resolver, ["MARTIN Anne", "Anne MARTIN"])
+    assert resolver._index is None
+    resolve(resolver, ["DUPOND Luc"])
+    assert resolver._index is not None
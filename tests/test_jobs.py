@@ -0,0 +1,65 @@
+import pandas as pd
+
+from rilsa.address import address_key_series
+from rilsa.coords import PRECISION_COLUMN, CoordinateStore
+from rilsa.geocoding import GeocodeCache, Geocoder, requery_mask
+from rilsa.jobs import DONE, GeocodeJob
+from rilsa.localgeo import PRECISION_ADDRESS, PRECISION_STREET, LocalGeocoder
+
+# 색인에는 Vinet 1 / 3 만 → 나머지 번지는 도로 중심으로 풀림
+REGISTER = pd.DataFrame({
+    "street": ["Avenue Vinet", "Avenue Vinet"], "number": ["1", "3"], "npa": ["1004", "1004"],
+    "lieu": ["Lausanne", "Lausanne"], "lat": [46.52, 46.53], "lon": [6.62, 6.63],
+})
+CENTROID_ROWS = pd.DataFrame({
+    "Référence": [1, 2, 3],
+    "adresse": ["Avenue Vinet 33, 1004 Lausanne", "Avenue Vinet 35, 1004 Lausanne", "Avenue Vinet 37, 1004 Lausanne"],
+})
+
+
+def local_index(tmp_path):
+    local = LocalGeocoder(str(tmp_path / "idx.sqlite"))
+    local.import_frame(REGISTER)
+    local.build_centroids()
+    return local
+
+def run_job(store, geocoder, rows):
+    job = GeocodeJob(geocoder, store, store.fill(rows))
+    job.start()
+    job._thread.join()
+    assert job.state == DONE, job.error
+    return job
+
+
+def test_centroid_rows_are_not_appended_again(tmp_path):
+    store = CoordinateStore(str(tmp_path / "coords.csv"))
+    geocoder = Geocoder("", GeocodeCache(str(tmp_path / "cache.sqlite")), local=local_index(tmp_path))
+    first = run_job(store, geocoder, CENTROID_ROWS)
+    assert first.stats["saved"] == 3
+    assert (store.fill(CENTROID_ROWS)[PRECISION_COLUMN] == PRECISION_STREET).all()
+    # 같은 중심 좌표가 다시 돌아와도 CSV 는 그대로
+    for _ in range(2):
+        assert run_job(store, geocoder, CENTROID_ROWS).stats["saved"] == 0
+    assert len(pd.read_csv(store.path)) == 3
+
+def test_finer_result_replaces_centroid(tmp_path):
+    store = CoordinateStore(str(tmp_path / "coords.csv"))
+    geocoder = Geocoder("", GeocodeCache(str(tmp_path / "cache.sqlite")), local=local_index(tmp_path))
+    run_job(store, geocoder, CENTROID_ROWS)
+    # Google 이 주소 수준으로 답한 키 → 캐시 적중으로 더 정밀한 좌표 저장
+    key = address_key_series(CENTROID_ROWS["adresse"]).iloc[0]
+    geocoder.cache.put_many([(key, CENTROID_ROWS["adresse"].iloc[0], "OK", 46.5, 6.6, PRECISION_ADDRESS)])
+    assert run_job(store, geocoder, CENTROID_ROWS).stats["saved"] == 1
+    filled = store.fill(CENTROID_ROWS)
+    assert filled[PRECISION_COLUMN].tolist() == [PRECISION_ADDRESS, PRECISION_STREET, PRECISION_STREET]
+
+def test_requery_skips_keys_google_already_answered(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    df = CENTROID_ROWS.assign(**{PRECISION_COLUMN: [PRECISION_STREET, PRECISION_STREET, PRECISION_ADDRESS]})
+    assert requery_mask(df, cache, PRECISION_ADDRESS).tolist() == [True, True, False]
+    keys = address_key_series(df["adresse"])
+    cache.put_many([
+        (keys[0], df["adresse"][0], "OK", 46.5, 6.6, PRECISION_STREET),
+        (keys[1], df["adresse"][1], "ZERO_RESULTS", None, None, None),
+    ])
+    assert requery_mask(df, cache, PRECISION_ADDRESS).tolist() == [False, False, False]
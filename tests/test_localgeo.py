@@ -0,0 +1,101 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rilsa.address import address_key_series
+from rilsa.localgeo import PRECISION_ADDRESS, PRECISION_NPA, PRECISION_STREET, LocalGeocoder, swiss_to_wgs84
+
+# Rue / Avenue de Lausanne 10 은 같은 NPA 의 다른 건물
+REGISTER = pd.DataFrame({
+    "street": ["Rue de Lausanne", "Avenue de Lausanne", "Avenue Vinet", "Avenue Vinet", "Rue de Bourg"],
+    "number": ["10", "10", "1", "3", ""],
+    "npa": ["1004", "1004", "1004", "1004", "1003"],
+    "lieu": ["Lausanne"] * 5,
+    "lat": [46.520, 46.530, 46.524, 46.526, 46.519],
+    "lon": [6.620, 6.630, 6.624, 6.626, 6.633],
+})
+
+
+@pytest.fixture
+def local(tmp_path):
+    geocoder = LocalGeocoder(str(tmp_path / "idx.sqlite"))
+    geocoder.import_frame(REGISTER)
+    geocoder.build_centroids()
+    return geocoder
+
+def resolve(local, *addresses):
+    keys = address_key_series(pd.Series(list(addresses), dtype=object))
+    out = local.resolve_keys(keys)
+    return [out.get(k) for k in keys]
+
+
+# =========================
+# LV95 / LV03 → WGS84 (swisstopo 기준점, 근사식 ±1 m)
+# =========================
+@pytest.mark.parametrize("e, n, lat, lon", [
+    (2_600_000, 1_200_000, 46.951081, 7.438637),  # 베른 구 천문대 (원점)
+    (600_000, 200_000, 46.951081, 7.438637),      # 같은 점, LV03
+    (2_700_000, 1_100_000, 46.044130, 8.730497),  # swisstopo 예시
+])
+def test_swiss_to_wgs84(e, n, lat, lon):
+    got_lat, got_lon = swiss_to_wgs84([e], [n])
+    # 1e-5° ≈ 1 m
+    assert got_lat[0] == pytest.approx(lat, abs=2e-5)
+    assert got_lon[0] == pytest.approx(lon, abs=2e-5)
+
+def test_gwr_import_converts_lv95(tmp_path):
+    local = LocalGeocoder(str(tmp_path / "idx.sqlite"))
+    gwr = pd.DataFrame({
+        "STRNAME": ["Bundesplatz"], "DEINR": ["3"], "DPLZ4": ["3011"], "DPLZNAME": ["Bern"],
+        "DKODE": ["2600000"], "DKODN": ["1200000"],
+    })
+    assert local.import_frame(gwr, "gwr") == 1
+    lat, lon, precision = next(iter(local.resolve_keys(address_key_series(pd.Series(["Bundesplatz 3, 3011 Bern"]))).values()))
+    assert (round(lat, 4), round(lon, 4), precision) == (46.9511, 7.4386, PRECISION_ADDRESS)
+
+
+# =========================
+# 조회 순서 / 별칭
+# =========================
+def test_typed_address_resolves_exactly(local):
+    assert resolve(local, "Rue de Lausanne 10, 1004 Lausanne", "Av. de Lausanne 10, 1004 Lausanne") == [
+        (46.520, 6.620, PRECISION_ADDRESS), (46.530, 6.630, PRECISION_ADDRESS),
+    ]
+
+def test_untyped_alias_resolves_only_when_unambiguous(local):
+    vinet, lausanne = resolve(local, "Vinet 3, 1004 Lausanne", "Lausanne 10, 1004 Lausanne")
+    assert vinet == (46.526, 6.626, PRECISION_ADDRESS)
+    # "Lausanne 10" = Rue 또는 Avenue → 주소 수준으로 고르지 않음
+    assert lausanne[2] != PRECISION_ADDRESS
+
+def test_wrong_street_type_does_not_use_alias(local):
+    # 색인에는 Avenue Vinet 만 → "Rue Vinet 1" 은 Avenue 로 풀리면 안 됨
+    (lat, lon, precision), = resolve(local, "Rue Vinet 1, 1004 Lausanne")
+    assert precision == PRECISION_NPA
+
+def test_falls_back_to_street_then_npa_centroid(local):
+    street, npa, no_number_only, unknown = resolve(
+        local, "Avenue Vinet 99, 1004 Lausanne", "Chemin Inconnu 5, 1004 Lausanne",
+        "Chemin Inconnu 5, 1003 Lausanne", "Rue X 1, 9999 Nulle-part",
+    )
+    assert street == (pytest.approx(46.525), pytest.approx(6.625), PRECISION_STREET)
+    assert npa == (pytest.approx(46.525), pytest.approx(6.625), PRECISION_NPA)
+    # 1003 에는 번호 없는 입구(Rue de Bourg)뿐 → 색인에 들어가지 않아 중심 좌표도 없음
+    assert no_number_only is None
+    assert unknown is None
+
+def test_stale_index_is_not_used(tmp_path):
+    path = str(tmp_path / "idx.sqlite")
+    LocalGeocoder(path).import_frame(REGISTER)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    local = LocalGeocoder(path)
+    assert local.stale
+    assert local.resolve_keys(address_key_series(pd.Series(["Avenue Vinet 1, 1004 Lausanne"]))) == {}
+    local.import_frame(REGISTER)
+    assert not local.stale and len(local) == 4
+    assert np.isfinite(local.resolve_keys(["avenue vinet 1|1004"])["avenue vinet 1|1004"][0])
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rilsa.maplayers import (
+    MISSING_COLOR, aggregate_points, assign_colors, build_cmap, cell_size_for_zoom, point_payload, use_clusters,
+)
+
+rng = np.random.default_rng(3)
+N = 2_000
+POINTS = pd.DataFrame({
+    "latitude": rng.uniform(46.4, 46.6, N),
+    "longitude": rng.uniform(6.5, 6.8, N),
+    "Gérant": rng.choice(["HUBER", "NIGGLI", None], N),
+    "Lots": rng.integers(1, 20, N),
+})
+
+
+# =========================
+# 격자 집계
+# =========================
+def test_aggregate_matches_groupby():
+    cell = cell_size_for_zoom(10)
+    agg = aggregate_points(POINTS, cell, color_key="Gérant", sum_cols=["Lots"])
+    cells = pd.DataFrame({
+        "gy": np.floor(POINTS["latitude"] / cell), "gx": np.floor(POINTS["longitude"] / cell),
+        "latitude": POINTS["latitude"], "longitude": POINTS["longitude"], "Lots": POINTS["Lots"],
+    }).groupby(["gy", "gx"])
+    expected = cells.agg(latitude=("latitude", "mean"), longitude=("longitude", "mean"), count=("Lots", "size"), Lots=("Lots", "sum"))
+
+    assert agg["count"].sum() == N and len(agg) == len(expected)
+    got = agg.sort_values(["latitude", "longitude"]).reset_index(drop=True)
+    expected = expected.sort_values(["latitude", "longitude"]).reset_index(drop=True)
+    assert got["latitude"].to_numpy() == pytest.approx(expected["latitude"].to_numpy())
+    assert got["longitude"].to_numpy() == pytest.approx(expected["longitude"].to_numpy())
+    assert got["count"].tolist() == expected["count"].tolist()
+    assert got["Lots"].tolist() == expected["Lots"].tolist()
+
+def test_aggregate_keeps_majority_category():
+    df = pd.DataFrame({
+        "latitude": [46.5001, 46.5002, 46.5003], "longitude": [6.6001, 6.6002, 6.6003],
+        "Gérant": ["HUBER", None, "HUBER"],
+    })
+    agg = aggregate_points(df, 0.01, color_key="Gérant")
+    assert agg["count"].tolist() == [3]
+    assert agg["Gérant"].tolist() == ["HUBER"]
+
+def test_cluster_mode_switch():
+    assert use_clusters(10_000, 10)
+    assert not use_clusters(100, 10)
+    assert not use_clusters(10_000, 14)
+    assert use_clusters(10, 10, "Agrégé")
+    assert not use_clusters(10_000, 10, "Points")
+
+
+# =========================
+# 색상 / 페이로드
+# =========================
+def test_colors_are_stable_across_filters():
+    cmap = build_cmap(["HUBER", "NIGGLI"])
+    subset = POINTS[POINTS["Gérant"] == "NIGGLI"].head(5).copy()
+    keys, _ = assign_colors(subset, "Gérant", cmap)
+    assert keys == ["NIGGLI"]
+    assert subset[["color_r", "color_g", "color_b", "color_a"]].iloc[0].tolist() == cmap["NIGGLI"]
+
+def test_missing_values_get_missing_color():
+    df = POINTS.head(50).copy()
+    assign_colors(df, "Gérant")
+    missing = df[df["Gérant"].isna()]
+    assert len(missing) and (missing[["color_r", "color_g", "color_b"]].to_numpy() == MISSING_COLOR).all()
+
+def test_point_payload_carries_index_and_rounded_coords():
+    df = POINTS.head(20).copy()
+    df.index = df.index + 1000
+    assign_colors(df, None)
+    payload, accessor = point_payload(df)
+    assert payload["id"].tolist() == df.index.tolist()
+    assert payload["x"].tolist() == df["longitude"].round(5).tolist()
+    assert accessor == "[r, g, b, 120]"
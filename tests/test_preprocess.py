@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from rilsa.preprocess import SUPPORT_USER, preprocess
+
+RAW = pd.DataFrame({
+    "Référence": ["100000", "499'000", "550 100", "850000", "600000", None],
+    "Gérant": ["NIGGLI Lucy", "HUBER Rodolph", SUPPORT_USER, "CURCHOD Merry", "HUBER Rodolph", "NIGGLI Lucy"],
+    "Désignation": ["Av. Vinet 33", "Rue du Lac 1", "Ch. des Bluets 2", "Rte de Genève 4", "Place de la Gare 1", "Rue X 2"],
+    "NPA": [1004, "1009", "1020", "1260", "12", "1820"],
+    "Lieu": ["Lausanne", "Pully", "Renens", "Nyon", "Montreux", "Montreux"],
+    "Canton": ["VD"] * 6,
+})
+
+
+def test_support_user_is_dropped_and_types_follow_reference_ranges():
+    df, _ = preprocess(RAW)
+    assert SUPPORT_USER not in df["Gérant"].tolist()
+    assert df["Référence"].tolist()[:4] == [100000, 499000, 850000, 600000]
+    assert df["Type"].tolist() == ["Immeuble", "Immeuble", "PPE", "Autre", "Inconnu"]
+
+def test_gerant_group_defaults_to_the_gerant():
+    df, _ = preprocess(RAW)
+    assert df["Gérant group"].tolist() == ["Nyon", "HUBER Rodolph", "Montreux", "HUBER Rodolph", "Nyon"]
+
+def test_address_is_built_once_with_expanded_abbreviations():
+    df, warnings = preprocess(RAW)
+    assert df["adresse"].iloc[0] == "Avenue Vinet 33, 1004 Lausanne, VD, Suisse"
+    assert df["adresse"].iloc[2] == "Route de Genève 4, 1260 Nyon, VD, Suisse"
+    assert warnings == ["⚠️ 1 ligne(s) avec un NPA invalide — clé d'adresse basée sur le lieu."]
+
+def test_filter_columns_are_categorical():
+    df, _ = preprocess(RAW)
+    for c in ["Gérant", "Gérant group", "Type", "Canton", "Lieu"]:
+        assert isinstance(df[c].dtype, pd.CategoricalDtype), c
+
+def test_missing_columns_produce_warnings():
+    df, warnings = preprocess(RAW.drop(columns=["Référence", "Gérant"]))
+    assert "Type" not in df.columns and "Gérant group" not in df.columns
+    assert len(warnings) == 3
+    assert np.all(df["adresse"].notna())
@@ -0,0 +1,78 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from rilsa.spatial import SpatialIndex, haversine_km
+
+rng = np.random.default_rng(42)
+N = 3_000
+LAT = rng.uniform(46.3, 46.7, N)
+LON = rng.uniform(6.4, 7.0, N)
+LAT[::97] = np.nan  # 좌표 없는 행 — 결과는 원래 행 위치로
+INDEX = SpatialIndex(LAT, LON)
+
+# 구멍 있는 사각형 + 떨어진 삼각형
+SQUARE = [[6.5, 46.4], [6.8, 46.4], [6.8, 46.6], [6.5, 46.6], [6.5, 46.4]]
+HOLE = [[6.6, 46.45], [6.7, 46.45], [6.7, 46.55], [6.6, 46.55], [6.6, 46.45]]
+TRIANGLE = [[6.85, 46.35], [6.98, 46.35], [6.9, 46.5], [6.85, 46.35]]
+
+
+def brute_haversine(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+def brute_in_ring(x, y, ring):
+    inside = False
+    for (xa, ya), (xb, yb) in zip(ring, ring[1:] + ring[:1]):
+        if (ya > y) != (yb > y) and x < xa + (y - ya) * (xb - xa) / (yb - ya):
+            inside = not inside
+    return inside
+
+def valid_rows():
+    return [i for i in range(N) if not math.isnan(LAT[i])]
+
+
+def test_haversine_matches_scalar_formula():
+    assert haversine_km(46.52, 6.63, 46.2, 6.14) == pytest.approx(brute_haversine(46.52, 6.63, 46.2, 6.14))
+
+@pytest.mark.parametrize("lat, lon, km", [(46.52, 6.63, 2.0), (46.5, 6.7, 7.5), (46.31, 6.41, 0.5), (47.5, 8.0, 5.0)])
+def test_radius_matches_brute_force(lat, lon, km):
+    expected = {i for i in valid_rows() if brute_haversine(lat, lon, LAT[i], LON[i]) <= km}
+    assert set(INDEX.radius(lat, lon, km).tolist()) == expected
+
+@pytest.mark.parametrize("k", [1, 10, 200])
+def test_nearest_matches_brute_force(k):
+    d = {i: brute_haversine(46.52, 6.63, LAT[i], LON[i]) for i in valid_rows()}
+    got = INDEX.nearest(46.52, 6.63, k)
+    assert len(got) == k
+    # 연속 난수 좌표 → 거리 동률 없음
+    expected = sorted(d, key=d.get)[:k]
+    assert set(got.tolist()) == set(expected)
+
+def test_polygon_with_hole_and_multipolygon_match_brute_force():
+    geojson = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "MultiPolygon", "coordinates": [[SQUARE, HOLE], [TRIANGLE]]}},
+    ]}
+    expected = {
+        i for i in valid_rows()
+        if (brute_in_ring(LON[i], LAT[i], SQUARE) and not brute_in_ring(LON[i], LAT[i], HOLE))
+        or brute_in_ring(LON[i], LAT[i], TRIANGLE)
+    }
+    got = INDEX.polygon(json.dumps(geojson))
+    assert set(got.tolist()) == expected
+    assert 0 < len(expected) < len(valid_rows())
+
+def test_mask_covers_original_rows():
+    rows = INDEX.radius(46.52, 6.63, 3.0)
+    mask = INDEX.mask(rows)
+    assert len(mask) == N and mask.sum() == len(rows)
+    assert not mask[np.isnan(LAT)].any()
+
+def test_empty_index():
+    empty = SpatialIndex([np.nan], [np.nan])
+    assert len(empty.radius(46.5, 6.6, 10)) == 0
+    assert len(empty.nearest(46.5, 6.6, 5)) == 0
+    assert len(empty.polygon({"type": "Polygon", "coordinates": [SQUARE]})) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from rilsa.tours import distance_matrix, plan_tour, tour_length, tour_path
+
+rng = np.random.default_rng(7)
+
+
+@pytest.mark.parametrize("n, start", [(1, 0), (2, 1), (3, 0), (60, 0), (60, 17)])
+def test_closed_tour_visits_every_stop_once(n, start):
+    lat, lon = rng.uniform(46.4, 46.6, n), rng.uniform(6.5, 6.8, n)
+    tour = plan_tour(lat, lon, start=start)
+    order = tour["order"]
+    assert sorted(order.tolist()) == list(range(n))
+    assert order[0] == start
+    path = tour_path(lat, lon, order)
+    assert len(path) == n + 1
+    assert path[0] == path[-1] == [lon[start], lat[start]]
+
+def test_two_opt_never_lengthens_the_greedy_tour():
+    lat, lon = rng.uniform(46.4, 46.6, 120), rng.uniform(6.5, 6.8, 120)
+    tour = plan_tour(lat, lon)
+    assert tour["km"] <= tour["km_nearest_neighbour"] + 1e-9
+    assert tour["km"] == pytest.approx(tour_length(distance_matrix(lat, lon), tour["order"]))
+
+def test_convex_stops_are_visited_around_the_hull():
+    # 원 위의 점: 교차 없는 폐쇄 경로 = 원 둘레 순서 (2-opt 국소 최적 = 최적)
+    angles = rng.permutation(np.linspace(0, 2 * np.pi, 24, endpoint=False))
+    lat, lon = 46.5 + 0.05 * np.sin(angles), 6.6 + 0.07 * np.cos(angles)
+    order = plan_tour(lat, lon)["order"]
+    ranks = np.argsort(np.argsort(angles))[order]  # 방문 순서대로 본 각도 순위
+    steps = np.diff(np.append(ranks, ranks[0])) % 24
+    assert set(steps.tolist()) in ({1}, {23})
+
+def test_tour_length_of_closed_triangle():
+    dist = np.array([[0, 3, 4], [3, 0, 5], [4, 5, 0]], dtype=float)
+    assert tour_length(dist, [0, 1, 2]) == 12
+    assert tour_length(dist, [0]) == 0
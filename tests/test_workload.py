@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rilsa.spatial import KM_PER_DEG
+from rilsa.workload import email_stats, hull_area_km2, portfolio_stats, workload
+
+rng = np.random.default_rng(5)
+
+PORTFOLIO = pd.DataFrame({
+    "Gérant": ["NIGGLI Lucy", "NIGGLI Lucy", "NIGGLI Lucy", "HUBER Rodolph", "HUBER Rodolph", None],
+    "Nombre total d'appartements": [10, 5, None, 2, 3, 99],
+    "Nombre total d'entreprises": [1, 0, 2, 0, 0, 99],
+    "latitude": [46.50, 46.50, 46.52, 46.20, np.nan, 46.0],
+    "longitude": [6.60, 6.62, 6.60, 6.10, 6.10, 6.0],
+})
+EMAIL = pd.DataFrame({
+    "Display Name": ["Lucy Niggli", "Rodolph Huber", "Lucy Niggli"],
+    "User Principal Name": ["lucy@x.ch", "rodolph@x.ch", "lucy@x.ch"],
+    "Send Count": [10, 5, 30],
+    "Receive Count": [100, 50, 300],
+})
+
+
+# =========================
+# 볼록 껍질 면적
+# =========================
+def test_hull_area_of_square_with_interior_points():
+    # 위도 0 에서 0.1° × 0.1° ≈ (0.1 · KM_PER_DEG)²
+    lat = np.concatenate([[0, 0, 0.1, 0.1], rng.uniform(0, 0.1, 50)])
+    lon = np.concatenate([[0, 0.1, 0, 0.1], rng.uniform(0, 0.1, 50)])
+    assert hull_area_km2(lat - 0.05, lon) == pytest.approx((0.1 * KM_PER_DEG) ** 2, rel=1e-3)
+
+def test_hull_area_degenerate():
+    assert hull_area_km2([46.5, 46.6], [6.6, 6.7]) == 0
+    assert hull_area_km2([46.5, 46.5, 46.5], [6.6, 6.6, 6.6]) == 0
+    assert hull_area_km2([46.5, 46.6, 46.7], [6.6, 6.7, 6.8]) == pytest.approx(0, abs=1e-9)
+
+
+# =========================
+# 포트폴리오 / 이메일 집계
+# =========================
+def test_portfolio_stats_per_manager():
+    stats = portfolio_stats(PORTFOLIO).set_index("Gérant")
+    assert stats.loc["NIGGLI Lucy", ["Immeubles", "Unités gérées", "Géocodés"]].tolist() == [3, 18, 3]
+    assert stats.loc["HUBER Rodolph", ["Immeubles", "Unités gérées", "Géocodés"]].tolist() == [2, 5, 1]
+    assert stats.loc["HUBER Rodolph", "Distance moyenne au centre (km)"] == 0
+    assert stats.loc["HUBER Rodolph", "Étendue (km²)"] == 0
+    assert stats.loc["NIGGLI Lucy", "Étendue (km²)"] > 0
+
+def test_email_stats_sum_over_chunks():
+    stats = email_stats([EMAIL.iloc[:2], EMAIL.iloc[2:]]).set_index("Display Name")
+    assert stats.loc["Lucy Niggli", ["envoyé", "reçu"]].tolist() == [40, 400]
+    assert email_stats([]).columns[0] == "Display Name"
+
+
+# =========================
+# 결합 + 부하 지수
+# =========================
+def test_workload_matches_manager_to_mailbox():
+    out = workload(portfolio_stats(PORTFOLIO), email_stats([EMAIL])).set_index("Gérant")
+    assert out.loc["NIGGLI Lucy", "Boîte e-mail"] == "Lucy Niggli"
+    assert out.loc["HUBER Rodolph", "reçu"] == 50
+    # NIGGLI 는 모든 지표에서 HUBER 이상 → 부하 지수 더 높음, 첫 행
+    assert out.index[0] == "NIGGLI Lucy"
+    assert out.loc["NIGGLI Lucy", "Indice de charge"] > out.loc["HUBER Rodolph", "Indice de charge"]
+    assert out["Surcharge"].tolist() == (out["Indice de charge"] >= 1.3).tolist()